@@ -0,0 +1,230 @@
+'''
+Memory-mapped multi-timeframe bar store with on-demand resampling
+
+Reads the base-resolution bars that ohlcv_cache.py keeps in historical_data/bars
+(one typed .npy column per field, sorted by timestamp) without parsing anything:
+every column is memory-mapped, so loading a year of hourly bars for 200 symbols is a
+few hundred np.load(mmap_mode='r') calls and no copies until the data is touched.
+A series that is still being appended to (data_streams/bar_builder.py) is stored in a
+few segments, which are concatenated once per version it is loaded at.
+
+    store = BarStore()                                    # coinbase, 1h base bars
+    bars = store.bars('BTC/USD', start_ms, end_ms)        # binary-searched slice, zero copy
+    daily = store.bars('BTC/USD', timeframe='1d')         # resampled from 1h
+    df = store.frame('BTC/USD', '4h')                     # as a DataFrame (datetime index)
+
+Higher timeframes are derived from the base bars by vectorized resampling (bucket
+starts found with np.diff, then reduceat for high/low/volume) and cached on disk in
+<base folder>/derived/<timeframe>/ together with the base state they came from, in
+the same versioned layout as the base bars (see ohlcv_cache.py), so columns and state
+are always switched to together. Every cached view is keyed by the manifest version it
+was loaded from.
+When base bars are appended, only the derived buckets from the last one on are
+recomputed; any other change to the base rebuilds the derived series.
+
+Weeks start on Monday 00:00 UTC, days at 00:00 UTC, like the exchanges.
+
+The old CSV downloads go in with import_csv (or: python bar_store.py import).
+'''
+import glob
+import os
+import sys
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+from ohlcv_downloader import COLUMNS, timeframe_to_ms, is_time_frame
+from ohlcv_cache import (append_columns, cache_folder, key_folder, load_coverage, load_version, merge_intervals,
+                         read_manifest, write_columns)
+
+Bars = namedtuple('Bars', COLUMNS)
+
+WEEK_OFFSET_MS = 4 * 86400000  # 1970-01-01 was a Thursday, the first Monday is 4 days later
+
+def bucket_starts(timestamps, timeframe):
+    """Open time of the `timeframe` bucket each timestamp falls in."""
+    step = timeframe_to_ms(timeframe)
+    offset = WEEK_OFFSET_MS if timeframe.endswith('w') else 0
+    return (timestamps - offset) // step * step + offset
+
+def resample(bars, timeframe):
+    """Aggregate sorted base Bars into `timeframe` Bars (vectorized, one pass per column)."""
+    if len(bars.timestamp) == 0:
+        return Bars(np.empty(0, 'i8'), *(np.empty(0) for _ in COLUMNS[1:]))
+    buckets = bucket_starts(np.asarray(bars.timestamp), timeframe)
+    starts = np.concatenate([[0], np.flatnonzero(np.diff(buckets)) + 1])
+    ends = np.append(starts[1:], len(buckets)) - 1
+    return Bars(buckets[starts],
+                np.asarray(bars.open)[starts],
+                np.maximum.reduceat(bars.high, starts),
+                np.minimum.reduceat(bars.low, starts),
+                np.asarray(bars.close)[ends],
+                np.add.reduceat(bars.volume, starts))
+
+def concat_bars(head, tail):
+    return Bars(*(np.concatenate([a, b]) for a, b in zip(head, tail)))
+
+def slice_bars(bars, start_ms=None, end_ms=None):
+    """Bars with start_ms <= timestamp < end_ms, by binary search on the sorted timestamps."""
+    lo = np.searchsorted(bars.timestamp, start_ms) if start_ms is not None else 0
+    hi = np.searchsorted(bars.timestamp, end_ms) if end_ms is not None else len(bars.timestamp)
+    return Bars(*(column[lo:hi] for column in bars))
+
+def base_state(timestamps, version):
+    """What a derived series remembers about the base bars it was built from."""
+    n = len(timestamps)
+    return {'rows': n, 'first': int(timestamps[0]) if n else None, 'last': int(timestamps[-1]) if n else None,
+            'written': version}
+
+def version_of(folder, manifest):
+    """Changes whenever the bars are rewritten: the manifest version (or the stat of a flat layout's timestamps)."""
+    if manifest is not None:
+        return manifest['version']
+    try:
+        stat = os.stat(os.path.join(folder, 'timestamp.npy'))
+    except FileNotFoundError:
+        return None
+    return f'{stat.st_mtime_ns}:{stat.st_size}:{stat.st_ino}'
+
+def file_version(folder):
+    return version_of(folder, read_manifest(folder))
+
+class BarStore:
+    def __init__(self, root=cache_folder, exchange_id='coinbase', base_timeframe='1h'):
+        self.root = root
+        self.exchange_id = exchange_id
+        self.base_timeframe = base_timeframe
+        self.base = {}     # symbol -> (version, memory-mapped Bars)
+        self.stamps = {}   # symbol -> (version, memory-mapped timestamps), enough to check derived series
+        self.derived = {}  # (symbol, timeframe) -> (base state, Bars)
+
+    def folder(self, symbol):
+        return key_folder(self.root, self.exchange_id, symbol, self.base_timeframe)
+
+    def symbols(self):
+        """Every symbol with base bars in the store, e.g. 'BTC-USD' (folder names)."""
+        pattern = os.path.join(self.root, self.exchange_id, '*', self.base_timeframe, '%s')
+        paths = glob.glob(pattern % 'manifest.json') + glob.glob(pattern % 'timestamp.npy')
+        return sorted({path.split(os.sep)[-3] for path in paths})
+
+    def base_version(self, symbol):
+        """(version, memory-mapped base Bars), re-mapped only when a new version was written."""
+        folder = self.folder(symbol)
+        cached = self.base.get(symbol)
+        if cached is None or cached[0] != file_version(folder):
+            # keyed by the version the columns were loaded from, not the one checked above
+            manifest, columns = load_version(folder)
+            cached = self.base[symbol] = (version_of(folder, manifest), Bars(*(columns[name] for name in COLUMNS)))
+        return cached
+
+    def base_bars(self, symbol):
+        return self.base_version(symbol)[1]
+
+    def base_timestamps(self, symbol):
+        """(version, base timestamps) - all it takes to tell whether a derived series is stale."""
+        folder = self.folder(symbol)
+        version = file_version(folder)
+        cached = self.base.get(symbol)
+        if cached is not None and cached[0] == version:
+            return version, cached[1].timestamp
+        cached = self.stamps.get(symbol)
+        if cached is None or cached[0] != version:
+            manifest, columns = load_version(folder, names=['timestamp'])
+            cached = self.stamps[symbol] = (version_of(folder, manifest), columns['timestamp'])
+        return cached
+
+    def bars(self, symbol, start_ms=None, end_ms=None, timeframe=None):
+        """Bars for [start_ms, end_ms) at the base timeframe or any multiple of it."""
+        if timeframe is None or timeframe == self.base_timeframe:
+            return slice_bars(self.base_bars(symbol), start_ms, end_ms)
+        return slice_bars(self.derived_bars(symbol, timeframe), start_ms, end_ms)
+
+    def frame(self, symbol, timeframe=None, start_ms=None, end_ms=None):
+        """Bars as a DataFrame with a datetime index, like data_from_coinbase returns."""
+        bars = self.bars(symbol, start_ms, end_ms, timeframe)
+        df = pd.DataFrame({name: bars._asdict()[name] for name in COLUMNS[1:]})
+        df.index = pd.DatetimeIndex(pd.to_datetime(np.asarray(bars.timestamp), unit='ms'), name='datetime')
+        return df
+
+    def derived_folder(self, symbol, timeframe):
+        return os.path.join(self.folder(symbol), 'derived', timeframe)
+
+    def derived_bars(self, symbol, timeframe):
+        """`timeframe` Bars resampled from the base, from memory, disk, or (partly) recomputed."""
+        if timeframe_to_ms(timeframe) % timeframe_to_ms(self.base_timeframe):
+            raise ValueError(f"{timeframe} is not a multiple of the {self.base_timeframe} base bars")
+        version, timestamps = self.base_timestamps(symbol)
+        state = base_state(timestamps, version)
+        key = (symbol, timeframe)
+
+        cached = self.derived.get(key)
+        if cached is None:
+            cached = self.load_derived(symbol, timeframe)
+        if cached is not None and cached[0] == state:
+            self.derived[key] = cached
+            return cached[1]
+
+        version, base = self.base_version(symbol)
+        state = base_state(base.timestamp, version)  # the base may have moved on since the check
+        bars = self.update_derived(base, state, cached, timeframe)
+        self.save_derived(symbol, timeframe, state, bars)
+        self.derived[key] = (state, bars)
+        return bars
+
+    def update_derived(self, base, state, cached, timeframe):
+        """Recompute only the buckets from the last derived one on if the base was just appended to."""
+        if cached is not None:
+            old_state, old_bars = cached
+            appended = (old_state['rows'] and state['first'] == old_state['first']
+                        and state['rows'] > old_state['rows']
+                        and int(base.timestamp[old_state['rows'] - 1]) == old_state['last'])
+            if appended:
+                # the last derived bucket may have been partial, rebuild from its start
+                last_bucket = int(old_bars.timestamp[-1])
+                keep = len(old_bars.timestamp) - 1
+                tail = resample(slice_bars(base, last_bucket), timeframe)
+                return concat_bars(Bars(*(np.asarray(column[:keep]) for column in old_bars)), tail)
+        return resample(base, timeframe)
+
+    def load_derived(self, symbol, timeframe):
+        """(base state, Bars) saved for a derived series, None if there is none (or only an old flat one)."""
+        folder = self.derived_folder(symbol, timeframe)
+        if read_manifest(folder) is None:
+            return None
+        manifest, columns = load_version(folder)
+        return manifest['base'], Bars(*(columns[name] for name in COLUMNS))
+
+    def save_derived(self, symbol, timeframe, state, bars):
+        """Columns and the base state they came from, switched to together like the base bars."""
+        write_columns(self.derived_folder(symbol, timeframe), np.column_stack(bars), base=state)
+
+    def append(self, symbol, new_bars):
+        """Merge (n, 6) [timestamp, open, high, low, close, volume] rows into the base bars (see append_columns)."""
+        new_bars = np.asarray(new_bars, dtype=float).reshape(-1, len(COLUMNS))
+        if not len(new_bars):
+            return
+        folder = self.folder(symbol)
+        # tick/volume/dollar bars (see data_streams/bar_builder.py) have no fixed length
+        step = timeframe_to_ms(self.base_timeframe) if is_time_frame(self.base_timeframe) else 1
+        added = [[int(new_bars[:, 0].min()), int(new_bars[:, 0].max()) + step]]
+        append_columns(folder, new_bars, coverage=merge_intervals(load_coverage(folder) + added))
+
+def import_csv(store, csv_filename, symbol=None):
+    """Load an old historical_data/<BASE>-<QUOTE>-<tf>-<n>wks-data.csv download into the store."""
+    symbol = symbol or '/'.join(os.path.basename(csv_filename).split('-')[:2])
+    df = pd.read_csv(csv_filename)
+    timestamps = pd.to_datetime(df['datetime']).to_numpy('datetime64[ms]').astype('i8')
+    store.append(symbol, np.column_stack([timestamps] + [df[name].to_numpy(float) for name in COLUMNS[1:]]))
+    return symbol, len(df)
+
+if __name__ == "__main__":
+    store = BarStore()
+    if sys.argv[1:2] == ['import']:
+        folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'historical_data')
+        for path in sorted(glob.glob(os.path.join(folder, f'*-{store.base_timeframe}-*wks-data.csv'))):
+            symbol, rows = import_csv(store, path)
+            print(f"✅ {symbol}: {rows:,} bars from {os.path.basename(path)}")
+    for symbol in store.symbols():
+        bars = store.bars(symbol)
+        print(f"{symbol:<12}{len(bars.timestamp):>8,} {store.base_timeframe} bars  "
+              f"{len(store.bars(symbol, timeframe='1d').timestamp):>6,} 1d  "
+              f"{len(store.bars(symbol, timeframe='1w').timestamp):>5,} 1w")
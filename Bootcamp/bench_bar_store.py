@@ -0,0 +1,73 @@
+'''
+Benchmark: loading a year of hourly bars for many symbols - pandas CSV vs bar_store
+
+Writes synthetic symbols into a temporary folder both as the old CSV downloads and
+as bar_store columns, then times loading all of them each way, plus a 1d resample
+(first build, and again from the on-disk cache in a fresh store) and a
+binary-searched range query.
+
+run with: python bench_bar_store.py [symbols] [days]
+'''
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from bar_store import BarStore
+
+def synthetic_bars(seed, hours, start_ms=1704067200000):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.003, hours)))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    spread = np.abs(rng.normal(0, 0.002, hours)) * close
+    timestamps = start_ms + np.arange(hours, dtype='i8') * 3600000
+    return np.column_stack([timestamps, open_, np.maximum(open_, close) + spread,
+                            np.minimum(open_, close) - spread, close, rng.exponential(1000, hours)])
+
+def main(symbol_count=200, days=365):
+    folder = tempfile.mkdtemp()
+    store = BarStore(root=os.path.join(folder, 'bars'))
+    symbols = [f"SYM{i}/USD" for i in range(symbol_count)]
+    for i, symbol in enumerate(symbols):
+        bars = synthetic_bars(i, days * 24)
+        store.append(symbol, bars)
+        df = pd.DataFrame(bars[:, 1:], columns=['open', 'high', 'low', 'close', 'volume'])
+        df.index = pd.DatetimeIndex(pd.to_datetime(bars[:, 0].astype('i8'), unit='ms'), name='datetime')
+        df.to_csv(os.path.join(folder, f"{symbol.replace('/', '-')}-1h-data.csv"))
+    print(f"📊 {symbol_count} symbols x {days * 24:,} hourly bars")
+
+    start = time.perf_counter()
+    frames = [pd.read_csv(os.path.join(folder, f"{symbol.replace('/', '-')}-1h-data.csv"),
+                          index_col='datetime', parse_dates=True) for symbol in symbols]
+    print(f"{'pandas csv':<22}{time.perf_counter() - start:>9.3f}s")
+
+    store = BarStore(root=store.root)  # cold: nothing mapped yet
+    start = time.perf_counter()
+    loaded = [store.bars(symbol) for symbol in symbols]
+    print(f"{'bar_store mmap':<22}{time.perf_counter() - start:>9.3f}s")
+
+    start = time.perf_counter()
+    closes = sum(float(bars.close[-1]) for bars in loaded)
+    print(f"{'  touch last close':<22}{time.perf_counter() - start:>9.3f}s")
+
+    start = time.perf_counter()
+    for symbol in symbols:
+        store.bars(symbol, 1711929600000, 1714521600000)  # April
+    print(f"{'range query x' + str(symbol_count):<22}{time.perf_counter() - start:>9.3f}s")
+
+    start = time.perf_counter()
+    for symbol in symbols:
+        store.bars(symbol, timeframe='1d')
+    print(f"{'1d resample (build)':<22}{time.perf_counter() - start:>9.3f}s")
+
+    store = BarStore(root=store.root)
+    start = time.perf_counter()
+    for symbol in symbols:
+        store.bars(symbol, timeframe='1d')
+    print(f"{'1d resample (cached)':<22}{time.perf_counter() - start:>9.3f}s")
+
+    assert len(frames) == len(loaded) and closes
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
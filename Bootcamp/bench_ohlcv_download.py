@@ -0,0 +1,62 @@
+'''
+Benchmark: the old page-by-page OHLCV loop vs ohlcv_downloader against fake_exchange
+
+The old loop is data_from_coinbase's: one 200-bar page at a time, newest first,
+pd.concat onto the result every page, sleeping between pages. It gets the smallest
+sleep that keeps it under the fake exchange's rate limit, so the comparison is fair.
+
+run with: python bench_ohlcv_download.py [weeks] [symbols] [latency ms]
+'''
+import asyncio
+import sys
+import time
+import pandas as pd
+from fake_exchange import FakeExchange
+from ohlcv_downloader import OhlcvDownloader, COLUMNS, timeframe_to_ms
+
+LATENCY = 0.2  # a round trip to a far-away exchange
+RATE = 10
+NOW_MS = 1735689600000  # 2025-01-01, fixed so both runs fetch the same bars
+
+async def old_loop(exchange, symbol, timeframe, weeks):
+    step = timeframe_to_ms(timeframe)
+    pages = -(-weeks * 7 * 86400000 // (step * 200))
+    dataframe = pd.DataFrame()
+    for i in range(pages):
+        since = NOW_MS - step * 200 * (i + 1)
+        data = await exchange.fetch_ohlcv(symbol, timeframe, since=since, limit=200)
+        df = pd.DataFrame(data, columns=['datetime'] + COLUMNS[1:])
+        df['datetime'] = pd.to_datetime(df['datetime'], unit='ms')
+        dataframe = pd.concat([df, dataframe])
+        await asyncio.sleep(1 / RATE)
+    return dataframe
+
+async def main(weeks=100, symbol_count=1, latency_ms=None):
+    latency = LATENCY if latency_ms is None else latency_ms / 1000
+    symbols = [f"SYM{i}/USD" for i in range(symbol_count)]
+    start_ms = NOW_MS - weeks * 7 * 86400000
+    print(f"📊 {weeks} weeks of 1h bars for {symbol_count} symbol(s), "
+          f"fake exchange {latency * 1000:.0f}ms latency, {RATE} req/s")
+
+    exchange = FakeExchange(latency=latency, rate=RATE, now_ms=NOW_MS)
+    start = time.perf_counter()
+    for symbol in symbols:
+        old = await old_loop(exchange, symbol, '1h', weeks)
+    old_elapsed = time.perf_counter() - start
+    print(f"{'old loop':<12}{old_elapsed:>8.2f}s  {exchange.requests} requests  {len(old):,} bars (last symbol)")
+
+    exchange = FakeExchange(latency=latency, rate=RATE, failure_rate=0.02, now_ms=NOW_MS)
+    downloader = OhlcvDownloader(exchange, rate=RATE, log=lambda *_: None)
+    start = time.perf_counter()
+    frames = await downloader.download_many([(symbol, '1h', start_ms, NOW_MS) for symbol in symbols])
+    new_elapsed = time.perf_counter() - start
+    bars = len(frames[(symbols[-1], '1h')])
+    print(f"{'downloader':<12}{new_elapsed:>8.2f}s  {exchange.requests} requests  {bars:,} bars (last symbol), "
+          f"{exchange.rejected} rate-limited, {len(downloader.failed)} failed pages")
+    old = old[old['datetime'] >= pd.Timestamp(start_ms, unit='ms')].drop_duplicates('datetime').sort_values('datetime')
+    same = (old[COLUMNS[1:]].to_numpy() == frames[(symbols[-1], '1h')].to_numpy()).all()
+    print(f"✅ same bars as the old loop: {same}")
+    print(f"⚡ {old_elapsed / new_elapsed:.1f}x faster")
+
+if __name__ == "__main__":
+    asyncio.run(main(*(int(arg) for arg in sys.argv[1:4])))
@@ -0,0 +1,126 @@
+'''
+Checks for the on-disk bar columns (ohlcv_cache.py, bar_store.py)
+
+Rewrites a key over and over in one thread while another loads it, and checks that
+every load sees the columns of a single version; that a write which crashed before
+its switch leaves the derived series and the other stores' views alone, and that
+columns of different lengths are rejected; that appends and revisions only add a
+few segments and give the same bars as merging everything; then that a folder in
+the older flat layout is still read and is converted by its next write.
+
+Exits non-zero on any failure.
+
+run with: python check_bar_store.py
+'''
+import json
+import os
+import sys
+import tempfile
+import threading
+import numpy as np
+from bar_store import BarStore
+from ohlcv_cache import load_columns, load_coverage, new_segment, read_manifest, write_columns
+from ohlcv_downloader import COLUMNS, assemble
+
+HOUR = 3600000
+
+def check(name, ok, detail=''):
+    print(f"{'✅' if ok else '❌'} {name}" + (f"  ({detail})" if detail and not ok else ''))
+    return ok
+
+def hourly(start, count, value=1.0):
+    return np.column_stack([(start + np.arange(count)) * HOUR] + [np.full(count, value)] * (len(COLUMNS) - 1))
+
+def check_concurrent_writes(folder):
+    stop = threading.Event()
+    writes = []
+
+    def writer():
+        count = 10
+        while not stop.is_set():
+            count = 10 if count > 500 else count + 7
+            write_columns(folder, hourly(0, count), coverage=[[0, count * HOUR]])
+            writes.append(count)
+
+    thread = threading.Thread(target=writer, daemon=True)
+    thread.start()
+    torn = 0
+    try:
+        for _ in range(1000):
+            columns = load_columns(folder)
+            torn += len({len(column) for column in columns.values()}) > 1
+    finally:
+        stop.set()
+        thread.join()
+    return check("loads during writes see one version", torn == 0 and len(writes) > 10, f"{torn} torn loads, {len(writes)} writes")
+
+def check_versions(root):
+    writer, reader = BarStore(root=root), BarStore(root=root)
+    writer.append('ETH/USD', hourly(0, 48))
+    ok = check("derived series built", list(reader.bars('ETH/USD', timeframe='1d').close) == [1.0, 1.0])
+    writer.append('ETH/USD', hourly(48, 24, 2.0))
+    ok &= check("another store's write is seen", list(reader.bars('ETH/USD', timeframe='1d').close) == [1.0, 1.0, 2.0])
+
+    # a save of the derived series that died before switching its manifest
+    folder = reader.derived_folder('ETH/USD', '1d')
+    new_segment(folder, read_manifest(folder)['version'] + 1, hourly(0, 5, 9.0))
+    fresh = BarStore(root=root)
+    ok &= check("crashed write is ignored", fresh.load_derived('ETH/USD', '1d') is not None
+                and list(fresh.bars('ETH/USD', timeframe='1d').close) == [1.0, 1.0, 2.0])
+
+    segment = os.path.join(folder, read_manifest(folder)['segments'][0])
+    np.save(os.path.join(segment, 'close.npy'), np.ones(2))
+    try:
+        BarStore(root=root).load_derived('ETH/USD', '1d')
+        rejected = False
+    except ValueError:
+        rejected = True
+    return ok & check("columns of different lengths are rejected", rejected)
+
+def check_appends(root):
+    store = BarStore(root=root)
+    rng = np.random.default_rng(0)
+    everything = []
+    for batch in range(200):
+        bars = hourly(batch * 10, 10, batch)
+        bars[:, 4] = rng.random(10)
+        if batch % 5 == 0:
+            bars[0, 0] -= HOUR  # revises the last bar written
+        store.append('SOL/USD', bars)
+        everything.append(bars)
+    expected = assemble(everything)
+    stored = store.bars('SOL/USD')
+    segments = read_manifest(store.folder('SOL/USD'))['segments']
+    ok = check("appends give the same bars as one merge",
+               np.array_equal(np.column_stack(stored), expected), f"{len(stored.timestamp)} vs {len(expected)}")
+    return ok & check("appends keep few segments", len(segments) <= 12, segments)
+
+def check_flat_layout(root):
+    store = BarStore(root=root)
+    folder = store.folder('BTC/USD')
+    os.makedirs(folder)
+    bars = hourly(0, 48)
+    for i, name in enumerate(COLUMNS):
+        np.save(os.path.join(folder, f'{name}.npy'), bars[:, i].astype('i8' if name == 'timestamp' else 'f8'))
+    with open(os.path.join(folder, 'coverage.json'), 'w') as f:
+        json.dump({'intervals': [[0, 48 * HOUR]]}, f)
+
+    ok = check("flat layout is read", store.symbols() == ['BTC-USD'] and len(store.bars('BTC/USD').close) == 48)
+    store.append('BTC/USD', hourly(48, 1, 2.0))
+    ok &= check("flat layout is converted on write",
+                read_manifest(folder) is not None and not os.path.exists(os.path.join(folder, 'timestamp.npy')),
+                sorted(os.listdir(folder)))
+    ok &= check("converted key keeps its bars and coverage",
+                list(store.bars('BTC/USD', timeframe='1d').close) == [1.0, 1.0, 2.0] and load_coverage(folder) == [[0, 49 * HOUR]])
+    return ok
+
+def main():
+    with tempfile.TemporaryDirectory() as root:
+        ok = check_concurrent_writes(os.path.join(root, 'key'))
+        ok &= check_versions(os.path.join(root, 'versions'))
+        ok &= check_appends(os.path.join(root, 'appends'))
+        ok &= check_flat_layout(os.path.join(root, 'bars'))
+    return ok
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,173 @@
+'''
+Parity check: streaming indicators (indicators.py) and the vectorized multi-symbol
+batch (indicator_batch.py) vs the batch versions
+
+Streams synthetic bars through every indicator one bar at a time and compares each
+value with the batch computation over the whole series: TA-Lib for the ta_review.py
+set, the pandas expressions from sma.py and vwap.py. Also checks that preview() of a
+bar gives what update() of the same bar then returns, and times a few thousand live
+instances. The multi-symbol batch is compared with TA-Lib for every symbol and every
+parameter, and a 300 symbol x 20 lookback screen is timed against pandas rolling().
+Every indicator in indicator_registry.py is compared across the backends implementing it.
+
+Exits non-zero on any mismatch.
+
+run with: python check_indicators.py [bars]
+'''
+import sys
+import time
+import numpy as np
+import pandas as pd
+import indicators as ind
+import indicator_batch as batch
+from indicator_registry import registry
+from bench_bar_store import synthetic_bars
+
+def stream(indicator, high, low, close, volume, column=None):
+    """Values of a streaming indicator bar by bar (NaN while it's warming up)."""
+    out = np.full(len(close), np.nan)
+    for i in range(len(close)):
+        preview = indicator.preview(high[i], low[i], close[i], volume[i])
+        value = indicator.update(high[i], low[i], close[i], volume[i])
+        if value is not None and column is not None:
+            value, preview = getattr(value, column), getattr(preview, column)
+        if (preview is None) != (value is None) or (value is not None and not np.isclose(preview, value)):
+            raise AssertionError(f"{type(indicator).__name__}: preview {preview} != update {value} at bar {i}")
+        if value is not None:
+            out[i] = value
+    return out
+
+def compare(name, streamed, batch):
+    batch = np.asarray(batch, dtype=float)
+    same_warmup = np.array_equal(np.isnan(streamed), np.isnan(batch))
+    ok = same_warmup and np.allclose(streamed, batch, rtol=1e-9, atol=1e-9, equal_nan=True)
+    error = np.nanmax(np.abs(streamed - batch)) if same_warmup else float('nan')
+    print(f"{'✅' if ok else '❌'} {name:<18} max abs diff {error:.2e}" + ('' if same_warmup else '  (warm-up differs)'))
+    return ok
+
+def main(bars=5000):
+    data = synthetic_bars(7, bars)
+    high, low, close, volume = (np.ascontiguousarray(data[:, i]) for i in (2, 3, 4, 5))
+    h, l, c, v = (column.tolist() for column in (high, low, close, volume))
+    ok = True
+
+    # the pandas versions the monitors use
+    ok &= compare('sma20 (sma.py)', stream(ind.SMA(20), h, l, c, v), pd.Series(close).rolling(20).mean())
+    typical_volume = (volume * (high + low + close) / 3).cumsum()
+    ok &= compare('vwap (vwap.py)', stream(ind.VWAP(), h, l, c, v), typical_volume / volume.cumsum())
+
+    try:
+        import talib
+    except ImportError:
+        print("⚠️ TA-Lib not installed, skipping the ta_review.py set")
+        return ok
+
+    upper, middle, lower = talib.BBANDS(close, timeperiod=20, nbdevup=2, nbdevdn=2, matype=0)
+    macd, signal, hist = talib.MACD(close, fastperiod=12, slowperiod=26, signalperiod=9)
+    slowk, slowd = talib.STOCH(high, low, close, fastk_period=14, slowk_period=3, slowk_matype=0,
+                               slowd_period=3, slowd_matype=0)
+    checks = [
+        ('sma20', ind.SMA(20), None, talib.SMA(close, timeperiod=20)),
+        ('ema10', ind.EMA(10), None, talib.EMA(close, timeperiod=10)),
+        ('rsi14', ind.RSI(14), None, talib.RSI(close, timeperiod=14)),
+        ('bbands upper', ind.Bollinger(20), 'upper', upper),
+        ('bbands middle', ind.Bollinger(20), 'middle', middle),
+        ('bbands lower', ind.Bollinger(20), 'lower', lower),
+        ('macd', ind.MACD(), 'macd', macd),
+        ('macd signal', ind.MACD(), 'signal', signal),
+        ('macd hist', ind.MACD(), 'hist', hist),
+        ('atr14', ind.ATR(14), None, talib.ATR(high, low, close, timeperiod=14)),
+        ('stoch k', ind.Stochastic(), 'k', slowk),
+        ('stoch d', ind.Stochastic(), 'd', slowd),
+        ('cci20', ind.CCI(20), None, talib.CCI(high, low, close, timeperiod=20)),
+        ('sar', ind.ParabolicSAR(), None, talib.SAR(high, low, acceleration=0.02, maximum=0.2)),
+        ('obv', ind.OBV(), None, talib.OBV(close, volume)),
+    ]
+    for name, indicator, column, batch in checks:
+        ok &= compare(name, stream(indicator, h, l, c, v, column), batch)
+
+    # many live instances on one core: seed, then one closed bar and 10 intrabar previews each
+    symbols = 300
+    engine = ind.IndicatorEngine()
+    history = pd.DataFrame({'high': high[:500], 'low': low[:500], 'close': close[:500], 'volume': volume[:500]})
+    for s in range(symbols):
+        engine.seed(s, history)
+    instances = symbols * len(engine.factories)
+    start = time.perf_counter()
+    for i in range(500, 520):
+        for s in range(symbols):
+            for _ in range(10):
+                engine.preview(s, h[i], l[i], c[i], v[i])
+            engine.update(s, h[i], l[i], c[i], v[i])
+    elapsed = time.perf_counter() - start
+    calls = 20 * symbols * 11 * len(engine.factories)
+    print(f"⏱️ {instances:,} instances: {calls / elapsed:,.0f} indicator updates/s ({elapsed / calls * 1e6:.2f}µs each)")
+    return ok & check_batch(talib) & check_registry(data)
+
+def check_batch(talib, symbols=5, bars=800):
+    data = [synthetic_bars(seed, bars) for seed in range(symbols)]
+    high, low, close, volume = (np.vstack([rows[:, i] for rows in data]) for i in (2, 3, 4, 5))
+    periods = [5, 14, 20, 33]
+
+    def per_symbol(function):
+        """symbols x params x time of a TA-Lib call per (symbol, period)."""
+        return np.array([[function(s, period) for period in periods] for s in range(symbols)])
+
+    bands = batch.bollinger(close, periods)
+    stoch = batch.stochastic(high, low, close, periods)
+    macd_params = [(12, 26, 9), (5, 35, 5), (8, 21, 5)]
+    macd = batch.macd(close, macd_params)
+    checks = [
+        ('sma', batch.sma(close, periods), per_symbol(lambda s, p: talib.SMA(close[s], p))),
+        ('ema', batch.ema(close, periods), per_symbol(lambda s, p: talib.EMA(close[s], p))),
+        ('rsi', batch.rsi(close, periods), per_symbol(lambda s, p: talib.RSI(close[s], p))),
+        ('atr', batch.atr(high, low, close, periods), per_symbol(lambda s, p: talib.ATR(high[s], low[s], close[s], p))),
+        ('cci', batch.cci(high, low, close, periods), per_symbol(lambda s, p: talib.CCI(high[s], low[s], close[s], p))),
+        ('sma (chunked)', batch.sma(close, periods, max_bytes=1), batch.sma(close, periods)),
+        ('sar', batch.sar(high, low), np.array([talib.SAR(high[s], low[s], 0.02, 0.2) for s in range(symbols)])),
+        ('obv', batch.obv(close, volume), np.array([talib.OBV(close[s], volume[s]) for s in range(symbols)])),
+        ('vwap', batch.vwap(high, low, close, volume), np.cumsum(volume * (high + low + close) / 3, axis=1) / np.cumsum(volume, axis=1)),
+    ]
+    checks += [(f'bbands {name}', getattr(bands, name), per_symbol(lambda s, p, i=i: talib.BBANDS(close[s], p, 2, 2, 0)[i]))
+               for i, name in enumerate(bands._fields)]
+    checks += [(f'stoch {name}', getattr(stoch, name),
+                per_symbol(lambda s, p, i=i: talib.STOCH(high[s], low[s], close[s], p, 3, 0, 3, 0)[i]))
+               for i, name in enumerate(stoch._fields)]
+    checks += [(f'macd {name}', getattr(macd, name),
+                np.array([[talib.MACD(close[s], *param)[i] for param in macd_params] for s in range(symbols)]))
+               for i, name in enumerate(macd._fields)]
+
+    ok = True
+    for name, values, expected in checks:
+        ok &= compare(f'batch {name}', values.ravel(), expected.ravel())
+
+    # a screen: 300 symbols x 20 lookbacks x 1000 bars
+    closes = np.vstack([synthetic_bars(seed, 1000)[:, 4] for seed in range(300)])
+    lookbacks = list(range(5, 105, 5))
+    start = time.perf_counter()
+    for s in range(len(closes)):
+        series = pd.Series(closes[s])
+        for period in lookbacks:
+            series.rolling(period).mean()
+    print(f"⏱️ {'pandas rolling x6000':<22}{time.perf_counter() - start:>9.3f}s")
+    out = np.empty((len(closes), len(lookbacks), closes.shape[1]))
+    for name, function in (('sma', batch.sma), ('ema', batch.ema), ('rsi', batch.rsi)):
+        start = time.perf_counter()
+        function(closes, lookbacks, out=out)
+        print(f"⏱️ {'batch ' + name + ' 300x20':<22}{time.perf_counter() - start:>9.3f}s")
+    return ok
+
+def check_registry(data):
+    """Every registered indicator on every backend implementing it vs its NumPy version (ta's RSI seeds differently)."""
+    bars = pd.DataFrame(data[:, 1:], columns=['open', 'high', 'low', 'close', 'volume'])
+    ok = True
+    for name in registry.names():
+        expected = np.ravel(registry.compute(name, bars, backend='numpy'))
+        for backend in registry.available(name):
+            if backend not in ('numpy', 'ta'):
+                ok &= compare(f'{name} on {backend}', np.ravel(registry.compute(name, bars, backend=backend)), expected)
+    print(f"⏱️ backend imports: " + ', '.join(f"{backend} {took:.3f}s" for backend, took in registry.import_times.items()))
+    return ok
+
+if __name__ == "__main__":
+    sys.exit(0 if main(*(int(arg) for arg in sys.argv[1:2])) else 1)
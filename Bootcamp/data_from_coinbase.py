@@ -1,13 +1,18 @@
 '''
 Fixed Coinbase Data Fetching Script
+
+Bars are cached in historical_data/bars (see ohlcv_cache.py): a request only fetches
+the time ranges that aren't cached yet, so asking for 101 weeks after 100 fetches
+one week, and a repeated request doesn't touch the network.
 '''
-import pandas as pd
-import datetime
+import asyncio
 import os
 import ccxt
+import ccxt.async_support as ccxt_async
 import dontshare as d
-from math import ceil
 import time
+from ohlcv_downloader import OhlcvDownloader, to_frame
+from ohlcv_cache import OhlcvCache
 
 # Extract API key values correctly
 api_key = d.api_key["apiKey"] if isinstance(d.api_key, dict) else d.api_key
@@ -30,22 +35,34 @@ symbol = 'XRP/USD'  # May need to be changed dynamically
 timeframe = '1h'
 weeks = 100
 
-# Function to convert timeframe to seconds
-def timeframe_to_sec(timeframe):
-    if 'm' in timeframe:
-        return int(''.join([char for char in timeframe if char.isnumeric()])) * 60
-    elif 'h' in timeframe:
-        return int(''.join([char for char in timeframe if char.isnumeric()])) * 60 * 60
-    elif 'd' in timeframe:
-        return int(''.join([char for char in timeframe if char.isnumeric()])) * 24 * 60 * 60
+historical_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'historical_data')
+
+async def download(symbol, timeframe, start_ms, end_ms):
+    """All bars in [start_ms, end_ms): the cached ones plus the missing ranges, fetched concurrently."""
+    exchange = ccxt_async.coinbase({
+        'apiKey': api_key,
+        'secret': api_secret,
+        'enableRateLimit': False,  # the downloader's token bucket does the throttling
+    })
+    try:
+        downloader = OhlcvDownloader(exchange, limit=200)
+        dataframe = await OhlcvCache(exchange, downloader=downloader).get(symbol, timeframe, start_ms, end_ms)
+        if downloader.failed:
+            print(f"⚠️ {len(downloader.failed)} pages still failed after retries, the data has holes")
+        return dataframe
+    finally:
+        await exchange.close()
 
 def get_historical_data(symbol, timeframe, weeks):
     """Fetch historical OHLCV data from Coinbase."""
     
-    # Check if data already exists
-    filename = f'{symbol.replace("/", "-")}-{timeframe}-{weeks}wks-data.csv'
-    if os.path.exists(filename):
-        return pd.read_csv(filename)
+    end_ms = int(time.time() * 1000)
+    start_ms = end_ms - weeks * 7 * 24 * 60 * 60 * 1000
+
+    # Check if the whole range is already cached
+    cache = OhlcvCache(None, exchange_id='coinbase')
+    if not cache.missing(symbol, timeframe, start_ms, end_ms):
+        return to_frame(cache.read(symbol, timeframe, start_ms, end_ms))
 
     if not coinbase:
         print("⚠️ Coinbase API is not initialized. Exiting...")
@@ -64,49 +81,18 @@ def get_historical_data(symbol, timeframe, weeks):
             print("❌ No suitable symbol found. Exiting.")
             return None
 
-    # Convert timeframe to granularity
-    granularity = timeframe_to_sec(timeframe)
-
-    # Calculate total historical time required
-    total_time = weeks * 7 * 24 * 60 * 60  # Total time in seconds
-    run_times = ceil(total_time / (granularity * 200))
-
-    dataframe = pd.DataFrame()
-    now = datetime.datetime.utcnow()
-
-    for i in range(run_times):
-        since = now - datetime.timedelta(seconds=granularity * 200 * (i + 1))
-        since_timestamp = int(since.timestamp()) * 1000  # Convert to milliseconds
-
-        print(f"📊 Fetching data since: {since} (Timestamp: {since_timestamp})")
-
-        try:
-            data = coinbase.fetch_ohlcv(symbol, timeframe, since=since_timestamp, limit=200)
-            if not data:
-                print("⚠️ No data returned for this time period.")
-                continue
-
-            df = pd.DataFrame(data, columns=['datetime', 'open', 'high', 'low', 'close', 'volume'])
-            df['datetime'] = pd.to_datetime(df['datetime'], unit='ms')
-            dataframe = pd.concat([df, dataframe])
-
-            # Respect API rate limits
-            time.sleep(1.5)  # Adjust based on Coinbase's rate limits
-
-        except Exception as e:
-            print(f"⚠️ Error fetching data: {e}")
-            time.sleep(5)  # Wait before retrying next batch
+    # Fetch only the missing ranges, every 200-bar page concurrently within the rate limit
+    print(f"📊 Fetching {weeks} weeks of {timeframe} {symbol} bars")
+    dataframe = asyncio.run(download(symbol, timeframe, start_ms, end_ms))
 
     if dataframe.empty:
         print("⚠️ No historical data fetched. Exiting...")
         return None
 
-    dataframe.set_index('datetime', inplace=True)
     dataframe = dataframe[["open", "high", "low", "close", "volume"]]
 
-    # Save to CSV
-    filename = "C:/Users/erikn/Desktop/Bootcamp/historical_data.csv"
-    filename = os.path.join("C:/Users/erikn/Desktop/Bootcamp/historical_data", f'{symbol.replace("/", "-")}-{timeframe}-{weeks}wks-data.csv')
+    # Save a CSV copy next to the other historical data
+    filename = os.path.join(historical_folder, f'{symbol.replace("/", "-")}-{timeframe}-{weeks}wks-data.csv')
     dataframe.to_csv(filename)
     print(f"✅ Data saved to {filename}")
 
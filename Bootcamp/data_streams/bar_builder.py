@@ -0,0 +1,301 @@
+'''
+Streaming trade-to-bar builder: time, tick, volume and dollar bars from aggTrades
+
+Builds bars incrementally from trades, either live (as an aggTrade consumer in
+ingest.py, behind the gap filler) or from recordings (python bar_builder.py).
+Bar specs:
+
+    15s, 1m, 5m ...    time bars, bucketed by exchange trade time (epoch aligned)
+    tick:500           a bar every 500 trades
+    volume:10          a bar every 10 units of the base asset (e.g. 10 BTC)
+    dollar:1000000     a bar every $1m of notional
+
+Only the bar being built is kept per (symbol, spec), so memory is bounded however
+long the input is. A time bar closes when a trade for a later bucket arrives, or
+once tick(now) is close_delay seconds past its end; buckets without trades produce
+no bar. A threshold bar closes on the trade that reaches the threshold (that trade
+belongs to it, so a bar can overshoot).
+
+A trade can still arrive for a time bucket that tick() has closed: the gap filler's
+backfill after a reconnect, or a straggler. If it belongs to the last bar emitted it
+is folded into that bar, which is emitted again with the same timestamp and
+revision + 1 (the store keeps the later row, so it is an upsert); anything older
+is dropped and counted in bar_late_trades_dropped_total. tick() also leaves alone
+the symbols in `paused` - ingest.py points it at the gap filler's held trades, so
+no bar is timer-closed while its symbol backfills.
+
+Every finished Bar goes to the handlers registered with subscribe(). With persist
+on, bars are also buffered and flushed to the local bar store (../bar_store.py)
+under exchange 'binance', one base series per spec:
+
+    historical_data/bars/binance/BTCUSDT/1m/...
+    historical_data/bars/binance/BTCUSDT/dollar1000000/...
+
+so BarStore(exchange_id='binance', base_timeframe='1m').bars('BTCUSDT', timeframe='1h')
+works right away. The store is keyed by timestamp: time bars use their bucket start
+(never moved), threshold bars the time of their first trade, nudged 1 ms past the
+previous bar when two would collide.
+
+The csv recordings only hold trades of $15k and up (recent_trades filters the rest),
+so bars built from them are big-trade bars; the live feed sees every trade.
+
+    python bar_builder.py                          # every live_data_csv/*_trades.csv
+    python bar_builder.py --specs 1m,dollar:5000000 btcusdt_trades.csv
+'''
+import argparse
+import asyncio
+import glob
+import os
+import sys
+import time
+from collections import namedtuple
+from columnar_store import iter_trades_csv
+from metrics import metrics
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from bar_store import BarStore  # noqa: E402
+from ohlcv_downloader import is_time_frame, timeframe_to_ms  # noqa: E402
+
+csv_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'live_data_csv')
+EXCHANGE_ID = 'binance'
+DEFAULT_SPECS = ('1m', 'dollar:1000000')
+
+Bar = namedtuple('Bar', [
+    'symbol', 'spec', 'timestamp', 'start', 'end', 'open', 'high', 'low', 'close',
+    'volume', 'dollar_volume', 'buy_volume', 'trades', 'revision',
+])
+
+def store_timeframe(spec):
+    """Name of a spec's series in the bar store: '1m' stays, 'dollar:1000000' -> 'dollar1000000'."""
+    return spec.replace(':', '')
+
+class BarState:
+    """The bar being built for one (symbol, spec)."""
+    __slots__ = ('start', 'end', 'open', 'high', 'low', 'close', 'volume', 'dollar_volume', 'buy_volume',
+                 'trades', 'bucket', 'revision')
+
+    def __init__(self, time_ms, price, bucket=None):
+        self.start = self.end = time_ms
+        self.open = self.high = self.low = self.close = price
+        self.volume = self.dollar_volume = self.buy_volume = 0.0
+        self.trades = 0
+        self.bucket = bucket
+        self.revision = 0
+
+    def add(self, time_ms, price, quantity, is_buyer_maker):
+        if price > self.high:
+            self.high = price
+        elif price < self.low:
+            self.low = price
+        if time_ms >= self.end:
+            self.close = price
+            self.end = time_ms
+        elif time_ms < self.start:  # out of order: an earlier trade opens the bar
+            self.open = price
+            self.start = time_ms
+        self.volume += quantity
+        self.dollar_volume += price * quantity
+        if not is_buyer_maker:
+            self.buy_volume += quantity
+        self.trades += 1
+
+class SpecBuilder:
+    """Builds one spec's bars for one symbol."""
+    def __init__(self, symbol, spec):
+        self.symbol = symbol
+        self.spec = spec
+        self.state = None
+        self.closed = None  # last time bar emitted, late trades for its bucket still fold in
+        self.last_timestamp = None
+        self.revised = metrics.counter('bar_revisions_total')
+        self.dropped = metrics.counter('bar_late_trades_dropped_total')
+        if is_time_frame(spec):
+            self.kind, self.step = 'time', timeframe_to_ms(spec)
+        else:
+            self.kind, threshold = spec.split(':')
+            if self.kind not in ('tick', 'volume', 'dollar'):
+                raise ValueError(f"unknown bar spec {spec!r}")
+            self.threshold = float(threshold)
+
+    def bar(self, state, timestamp):
+        return Bar(self.symbol, self.spec, timestamp, state.start, state.end, state.open, state.high, state.low,
+                   state.close, state.volume, state.dollar_volume, state.buy_volume, state.trades, state.revision)
+
+    def finish(self):
+        state, self.state = self.state, None
+        if self.kind == 'time':
+            self.closed = state
+            return self.bar(state, state.bucket)
+        timestamp = state.start
+        if self.last_timestamp is not None and timestamp <= self.last_timestamp:
+            timestamp = self.last_timestamp + 1
+        self.last_timestamp = timestamp
+        return self.bar(state, timestamp)
+
+    def add(self, time_ms, price, quantity, is_buyer_maker):
+        """Add one trade. Returns the bar it finished or revised, if any."""
+        done = None
+        if self.kind == 'time':
+            bucket = time_ms // self.step * self.step
+            state, closed = self.state, self.closed
+            if state is not None and bucket > state.bucket:
+                done = self.finish()
+                state = None
+            if state is None and (closed is None or bucket > closed.bucket):
+                state = self.state = BarState(time_ms, price, bucket)
+            elif state is None or bucket < state.bucket:
+                # its bucket has been emitted already
+                if closed is None or bucket != closed.bucket:
+                    self.dropped.inc()
+                    return None
+                closed.add(time_ms, price, quantity, is_buyer_maker)
+                closed.revision += 1
+                self.revised.inc()
+                return self.bar(closed, closed.bucket)
+            state.add(time_ms, price, quantity, is_buyer_maker)
+            return done
+
+        if self.state is None:
+            self.state = BarState(time_ms, price)
+        state = self.state
+        state.add(time_ms, price, quantity, is_buyer_maker)
+        if self.kind == 'tick':
+            reached = state.trades >= self.threshold
+        elif self.kind == 'volume':
+            reached = state.volume >= self.threshold
+        else:
+            reached = state.dollar_volume >= self.threshold
+        return self.finish() if reached else None
+
+    def close_if_due(self, now_ms, close_delay_ms):
+        if self.kind == 'time' and self.state is not None and now_ms >= self.state.bucket + self.step + close_delay_ms:
+            return self.finish()
+        return None
+
+class BarBuilder:
+    def __init__(self, specs=DEFAULT_SPECS, persist=False, root=None, batch_size=10000, close_delay=2,
+                 flush_interval=60):
+        self.specs = tuple(specs)
+        self.persist = persist
+        self.stores = {spec: BarStore(**({'root': root} if root else {}), exchange_id=EXCHANGE_ID,
+                                      base_timeframe=store_timeframe(spec)) for spec in self.specs}
+        self.batch_size = batch_size
+        self.close_delay_ms = close_delay * 1000
+        self.flush_interval = flush_interval
+        self.builders = {}  # symbol -> [SpecBuilder per spec]
+        self.paused = ()    # symbols whose time bars tick() must not close (backfilling)
+        self.handlers = []
+        self.pending = {}   # (spec, symbol) -> [row] waiting for the store
+        self.pending_rows = 0
+        self.bars_built = 0
+
+    def subscribe(self, handler):
+        """Register handler(bar) for every finished Bar."""
+        self.handlers.append(handler)
+
+    def builders_for(self, symbol):
+        builders = self.builders.get(symbol)
+        if builders is None:
+            builders = self.builders[symbol] = [SpecBuilder(symbol, spec) for spec in self.specs]
+        return builders
+
+    def add_trade(self, symbol, trade_time, price, quantity, is_buyer_maker):
+        """Feed one trade. Returns the bars it finished (usually none)."""
+        done = []
+        for builder in self.builders_for(symbol):
+            bar = builder.add(trade_time, price, quantity, is_buyer_maker)
+            if bar is not None:
+                done.append(bar)
+        if done:
+            self.emit(done)
+        return done
+
+    def tick(self, now_ms):
+        """Close the time bars whose bucket (plus close_delay) has passed, except for paused symbols."""
+        done = [bar for symbol, builders in self.builders.items() if symbol not in self.paused for builder in builders
+                for bar in (builder.close_if_due(now_ms, self.close_delay_ms),) if bar is not None]
+        if done:
+            self.emit(done)
+        return done
+
+    def close_all(self):
+        """Finish every open bar (end of a recording or shutdown)."""
+        done = [builder.finish() for builders in self.builders.values() for builder in builders
+                if builder.state is not None]
+        if done:
+            self.emit(done)
+        return done
+
+    def emit(self, bars):
+        self.bars_built += len(bars)
+        for bar in bars:
+            for handler in self.handlers:
+                handler(bar)
+            if self.persist:
+                self.pending.setdefault((bar.spec, bar.symbol), []).append(
+                    (bar.timestamp, bar.open, bar.high, bar.low, bar.close, bar.volume))
+        if self.persist:
+            self.pending_rows += len(bars)
+            if self.pending_rows >= self.batch_size:
+                self.flush()
+
+    def take_pending(self):
+        pending, self.pending, self.pending_rows = self.pending, {}, 0
+        return pending
+
+    def write_pending(self, pending):
+        for (spec, symbol), rows in pending.items():
+            self.stores[spec].append(symbol, rows)
+
+    def flush(self):
+        self.write_pending(self.take_pending())
+
+    async def binance_trade_stream(self, trade):
+        """Handle one decoded AggTrade routed by the combined-stream manager (or the gap filler)."""
+        self.add_trade(trade.symbol, trade.trade_time, trade.price, trade.quantity, trade.is_buyer_maker)
+
+    async def run(self):
+        """Close time bars every second and write finished bars to the store in a worker thread."""
+        last_flush = time.monotonic()
+        try:
+            while True:
+                await asyncio.sleep(1)
+                self.tick(int(time.time() * 1000))
+                if self.persist and time.monotonic() - last_flush >= self.flush_interval:
+                    await asyncio.to_thread(self.write_pending, self.take_pending())
+                    last_flush = time.monotonic()
+        finally:
+            if self.persist:
+                self.flush()  # unfinished bars stay out of the store, they'd be partial
+
+def build_from_csv(builder, csv_filenames):
+    """Feed recordings through a builder, one file (symbol) at a time. Returns the trade count."""
+    count = 0
+    for csv_filename in csv_filenames:
+        for _, symbol, _, price, quantity, trade_time, is_buyer_maker in iter_trades_csv(csv_filename):
+            builder.add_trade(symbol, trade_time, price, quantity, is_buyer_maker)
+            count += 1
+    builder.close_all()
+    return count
+
+bar_builder = BarBuilder()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Build bars from aggTrade recordings into the bar store')
+    parser.add_argument('files', nargs='*', help='*_trades.csv recordings (default: all in live_data_csv/)')
+    parser.add_argument('--specs', default=','.join(DEFAULT_SPECS), help='e.g. 15s,1m,tick:500,volume:10,dollar:1000000')
+    parser.add_argument('--dry-run', action='store_true', help="build and count, don't write to the store")
+    args = parser.parse_args()
+
+    files = [path if os.path.isfile(path) else os.path.join(csv_folder, path) for path in args.files] or \
+        sorted(glob.glob(os.path.join(csv_folder, '*_trades.csv')))
+    builder = BarBuilder(args.specs.split(','), persist=not args.dry_run)
+    counts = {}
+    builder.subscribe(lambda bar: counts.__setitem__((bar.symbol, bar.spec), counts.get((bar.symbol, bar.spec), 0) + 1))
+    start = time.perf_counter()
+    trades = build_from_csv(builder, files)
+    builder.flush()
+    elapsed = time.perf_counter() - start
+    for (symbol, spec), bars in sorted(counts.items()):
+        print(f"{symbol:<12}{spec:<16}{bars:>8,} bars")
+    print(f"✅ {trades:,} trades -> {builder.bars_built:,} bars in {elapsed:.2f}s ({trades / elapsed:,.0f} trades/s)")
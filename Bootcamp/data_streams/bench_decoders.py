@@ -0,0 +1,70 @@
+'''
+Micro-benchmark for decoders.py - messages/second per decoder and json backend
+
+Before timing, every installed backend's records are checked against the stdlib json
+ones (same type, same values); a backend that is not installed is reported and skipped.
+
+run with: python bench_decoders.py [messages]
+'''
+import json
+import sys
+import time
+from decoders import BACKENDS, make_frame_decoder, format_time_est, msgspec, orjson
+
+def sample_frames():
+    trade = {'stream': 'btcusdt@aggTrade', 'data': {
+        'e': 'aggTrade', 'E': 1739158327732, 's': 'BTCUSDT', 'a': 2568326986, 'p': '96573.70',
+        'q': '0.305', 'f': 5012345678, 'l': 5012345680, 'T': 1739158327687, 'm': False}}
+    liquidation = {'stream': '!forceOrder@arr', 'data': {
+        'e': 'forceOrder', 'E': 1739158568100, 'o': {
+            's': 'RAYSOLUSDT', 'S': 'BUY', 'o': 'LIMIT', 'f': 'IOC', 'q': '758.0', 'p': '4.7206871',
+            'ap': '4.6788370', 'X': 'FILLED', 'l': '0.4', 'z': '758.0', 'T': 1739158568086}}}
+    mark_price = {'stream': 'btcusdt@markPrice', 'data': {
+        'e': 'markPriceUpdate', 'E': 1739158332000, 's': 'BTCUSDT', 'p': '96580.12000000',
+        'i': '96612.44', 'P': '96590.1', 'r': '0.00004602', 'T': 1739174400000}}
+    return {'aggTrade': json.dumps(trade), 'forceOrder': json.dumps(liquidation), 'markPrice': json.dumps(mark_price)}
+
+def bench(decode_frame, message, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        decode_frame(message)
+    return count / (time.perf_counter() - start)
+
+def check_parity(frames):
+    """True if every installed backend decodes every frame to the same record as json."""
+    reference = make_frame_decoder('json')
+    same = True
+    for backend, module in (('msgspec', msgspec), ('orjson', orjson)):
+        if module is None:
+            print(f"⚠️ {backend} not installed, parity not checked")
+            continue
+        decode_frame = make_frame_decoder(backend)
+        matches = True
+        for kind, message in frames.items():
+            stream, payload = decode_frame(message)
+            expected = reference(message)
+            if type(payload) is not type(expected[1]) or (stream, payload) != expected:
+                print(f"❌ {backend} {kind}: {stream, payload!r} != {expected!r}")
+                matches = same = False
+        if matches:
+            print(f"✅ {backend} matches json on {', '.join(frames)}")
+    return same
+
+def main(count=200000):
+    frames = sample_frames()
+    if not check_parity(frames):
+        sys.exit(1)
+    print(f"📊 {count:,} messages per run")
+    print(f"{'decoder':<12}" + ''.join(f"{backend:>14}" for backend in BACKENDS))
+    for kind, message in frames.items():
+        rates = [bench(make_frame_decoder(backend), message, count) for backend in BACKENDS]
+        print(f"{kind:<12}" + ''.join(f"{rate:>12,.0f}/s" for rate in rates))
+
+    # formatting is deferred and cached per second - this is the cost when we do print
+    start = time.perf_counter()
+    for i in range(count):
+        format_time_est(1739158327687 + i)
+    print(f"{'format_time':<12}{count / (time.perf_counter() - start):>12,.0f}/s")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
@@ -1,13 +1,11 @@
 import asyncio
-import json
 import os
-from datetime import datetime
-import pytz
-from websockets import connect
 from termcolor import cprint
+from stream_manager import CombinedStreamManager
+from csv_sink import CsvSink
+from decoders import format_time_est
 
-websocket_url = 'wss://fstream.binance.com/ws/!forceOrder@arr'
-csv_folder = 'C:/Users/erikn/Desktop/Bootcamp/live_data_csv'
+csv_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'live_data_csv')
 csv_filename = os.path.join(csv_folder, 'binance_bigliqs.csv')
 
 if not os.path.exists(csv_folder):
@@ -23,40 +21,43 @@ if not os.path.isfile(csv_filename):
             'order_trade_time', 'usd_size'
         ])+ "\n")
 
-async def binance_liquidation(uri, csv_filename):
-    async with connect(uri) as websocket:
-        while True:
-            try:
-                msg = await websocket.recv()
-                order_data = eval(msg)['o']  # Use eval to parse the message directly
-                symbol = order_data['s'].replace('USDT', '')
-                side = order_data['S']
-                timestamp = int(order_data['T'])
-                filled_quantity = float(order_data['z'])
-                price = float(order_data['p'])
-                usd_size = filled_quantity * price
-                est = pytz.timezone("US/Eastern")
-                time_est = datetime.fromtimestamp(timestamp / 1000, est).strftime('%H:%M:%S')
-
-                if usd_size > 100000:
-                    liquidation_type = 'L LIQ' if side == 'SELL' else 'S LIQ'
-                    symbol = symbol[:4]
-                    output = f"{liquidation_type} {symbol} {time_est} {usd_size:,.2f}"
-                    color = 'blue' if side == 'SELL' else 'magenta'
-                    attrs = ['bold'] if usd_size > 10000 else []
-                    usd_size = usd_size / 1000000
-
-                    cprint(output, 'white', f'on_{color}', attrs=attrs)
-                    print('')
-
-                msg_values = [str(order_data.get(key)) for key in ['s', 'S', 'o', 'f', 'q', 'p', 'ap', 'X', 'l', 'z', 'T']]
-                msg_values.append(str(usd_size))
-                with open(csv_filename, 'a') as f:
-                    trade_info = ','.join(msg_values) + '\n'
-                    trade_info = trade_info.replace('USDT', '')
-                    f.write(trade_info)
-
-            except Exception as e:
-                await asyncio.sleep(5)
-
-asyncio.run(binance_liquidation(websocket_url, csv_filename))
\ No newline at end of file
+# one writer task batches the csv appends
+csv_sink = CsvSink()
+
+async def binance_liquidation(liq, csv_filename=csv_filename):
+    """Handle one decoded ForceOrder routed by the combined-stream manager."""
+    symbol = liq.symbol.replace('USDT', '')
+    side = liq.side
+    timestamp = liq.trade_time
+    filled_quantity = liq.filled_quantity
+    price = liq.price
+    usd_size = filled_quantity * price
+
+    if usd_size > 100000:
+        time_est = format_time_est(timestamp)
+        liquidation_type = 'L LIQ' if side == 'SELL' else 'S LIQ'
+        symbol = symbol[:4]
+        output = f"{liquidation_type} {symbol} {time_est} {usd_size:,.2f}"
+        color = 'blue' if side == 'SELL' else 'magenta'
+        attrs = ['bold'] if usd_size > 10000 else []
+        usd_size = usd_size / 1000000
+
+        cprint(output, 'white', f'on_{color}', attrs=attrs)
+        print('')
+
+    msg_values = [str(value) for value in (
+        liq.symbol, side, liq.order_type, liq.time_in_force, liq.original_quantity, price,
+        liq.average_price, liq.order_status, liq.last_filled_quantity, filled_quantity, timestamp)]
+    msg_values.append(str(usd_size))
+    trade_info = ','.join(msg_values) + '\n'
+    trade_info = trade_info.replace('USDT', '')
+    if csv_sink is not None:
+        await csv_sink.write(csv_filename, trade_info)
+
+async def main():
+    manager = CombinedStreamManager()
+    manager.subscribe('!forceOrder@arr', binance_liquidation)
+    await asyncio.gather(manager.run(), csv_sink.run())
+
+if __name__ == "__main__":
+    asyncio.run(main())
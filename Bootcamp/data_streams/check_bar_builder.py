@@ -0,0 +1,68 @@
+'''
+Checks for the bar builder's late trades (bar_builder.py)
+
+Feeds trades around a time bar that tick() has already closed - the case of the gap
+filler's backfill after a reconnect - and checks that the bucket stays one bar at
+its own timestamp in the store, that older trades are dropped and counted, that a
+paused (backfilling) symbol isn't timer-closed, and that threshold bars still get
+distinct timestamps.
+
+Exits non-zero on any failure.
+
+run with: python check_bar_builder.py
+'''
+import sys
+import tempfile
+from bar_builder import BarBuilder
+from metrics import metrics
+
+MINUTE = 60000
+
+def check(name, ok, detail=''):
+    print(f"{'✅' if ok else '❌'} {name}" + (f"  ({detail})" if detail and not ok else ''))
+    return ok
+
+def main():
+    ok = True
+    with tempfile.TemporaryDirectory() as root:
+        builder = BarBuilder(['1m'], persist=True, root=root, close_delay=2)
+        bars = []
+        builder.subscribe(bars.append)
+        dropped = metrics.counter('bar_late_trades_dropped_total')
+
+        builder.add_trade('BTCUSDT', 10 * MINUTE + 1000, 100.0, 1.0, False)
+        builder.add_trade('BTCUSDT', 10 * MINUTE + 30000, 101.0, 1.0, True)
+        closed = builder.tick(11 * MINUTE + 2000)
+        ok &= check("tick() closes the bucket", [bar.timestamp for bar in closed] == [10 * MINUTE])
+
+        # backfilled after the timer close: same bucket, later in time than what the bar has
+        revised = builder.add_trade('BTCUSDT', 10 * MINUTE + 50000, 99.0, 2.0, False)
+        ok &= check("late trade revises the closed bar",
+                    [(bar.timestamp, bar.revision, bar.volume, bar.low, bar.close) for bar in revised]
+                    == [(10 * MINUTE, 1, 4.0, 99.0, 99.0)], revised)
+
+        builder.add_trade('BTCUSDT', 11 * MINUTE + 5000, 102.0, 1.0, False)
+        before = dropped.value
+        ok &= check("a trade older than the last bar is dropped",
+                    builder.add_trade('BTCUSDT', 9 * MINUTE, 98.0, 1.0, False) == [] and dropped.value == before + 1)
+
+        builder.close_all()
+        builder.flush()
+        stored = builder.stores['1m'].bars('BTCUSDT')
+        ok &= check("one row per minute in the store, at the bucket start",
+                    list(stored.timestamp) == [10 * MINUTE, 11 * MINUTE], list(stored.timestamp))
+        ok &= check("the store has the revised bar", list(stored.volume) == [4.0, 1.0], list(stored.volume))
+
+        builder.paused = {'BTCUSDT'}
+        builder.add_trade('BTCUSDT', 20 * MINUTE, 100.0, 1.0, False)
+        ok &= check("no timer close while the symbol backfills", builder.tick(30 * MINUTE) == [])
+        builder.paused = ()
+        ok &= check("closed once it is released", len(builder.tick(30 * MINUTE)) == 1)
+
+    ticks = BarBuilder(['tick:1'])
+    timestamps = [bar.timestamp for trade in range(3) for bar in ticks.add_trade('BTCUSDT', 5000, 100.0, 1.0, False)]
+    ok &= check("threshold bars in one ms get distinct timestamps", timestamps == [5000, 5001, 5002], timestamps)
+    return ok
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,225 @@
+'''
+Columnar, day-partitioned storage for recorded trades, liquidations and funding
+
+The csv files are stringly typed and slow to reload, so the recorders can also write
+typed NumPy columns, partitioned by symbol and UTC day:
+
+    columnar_data/<kind>/<SYMBOL>/<YYYY-MM-DD>/part-000001/<column>.npy
+
+Each segment is sorted by its time column. Reading memory-maps only the columns you
+ask for and binary-searches the time column, so a one-hour slice of two columns never
+touches the rest of the day.
+
+    store = ColumnarStore()
+    store.append('trades', 'BTCUSDT', (event_time, agg_id, price, qty, trade_time, is_buyer_maker))
+    store.flush()
+    cols = store.read('trades', 'BTCUSDT', start=t0, end=t1, columns=['trade_time', 'price'])
+'''
+import asyncio
+import csv
+import os
+from datetime import datetime, timezone
+import numpy as np
+
+store_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'columnar_data')
+DAY_MS = 24 * 60 * 60 * 1000
+
+# kind -> (columns, time column used for partitioning and range queries)
+SCHEMAS = {
+    'trades': (np.dtype([
+        ('event_time', 'i8'), ('agg_trade_id', 'i8'), ('price', 'f8'),
+        ('quantity', 'f8'), ('trade_time', 'i8'), ('is_buyer_maker', '?'),
+    ]), 'trade_time'),
+    'liquidations': (np.dtype([
+        ('trade_time', 'i8'), ('is_sell', '?'), ('original_quantity', 'f8'), ('price', 'f8'),
+        ('average_price', 'f8'), ('filled_quantity', 'f8'), ('usd_size', 'f8'),
+    ]), 'trade_time'),
+    'funding': (np.dtype([
+        ('event_time', 'i8'), ('mark_price', 'f8'), ('funding_rate', 'f8'),
+    ]), 'event_time'),
+}
+
+def day_name(day_index):
+    return datetime.fromtimestamp(day_index * DAY_MS / 1000, timezone.utc).strftime('%Y-%m-%d')
+
+class ColumnarStore:
+    def __init__(self, root=store_folder, segment_rows=250000, flush_interval=300):
+        self.root = root
+        self.segment_rows = segment_rows
+        self.flush_interval = flush_interval
+        self.buffers = {}  # (kind, symbol) -> list of row tuples
+
+    def append(self, kind, symbol, row):
+        """Buffer one row; full buffers are written out by flush()/run()."""
+        self.buffers.setdefault((kind, symbol.upper()), []).append(row)
+
+    def pending_rows(self):
+        return sum(len(rows) for rows in self.buffers.values())
+
+    def day_folder(self, kind, symbol, day):
+        return os.path.join(self.root, kind, symbol.upper(), day)
+
+    def next_part(self, folder):
+        parts = [int(name[5:]) for name in os.listdir(folder) if name.startswith('part-')] if os.path.isdir(folder) else []
+        return os.path.join(folder, f'part-{max(parts, default=0) + 1:06d}')
+
+    def new_part(self, folder):
+        """Create the next part folder; if another writer got that number first, take the one after."""
+        while True:
+            part = self.next_part(folder)
+            try:
+                os.makedirs(part)
+                return part
+            except FileExistsError:
+                continue
+
+    def write_rows(self, kind, symbol, rows):
+        """Turn buffered rows into typed arrays and save one segment per UTC day."""
+        self.write_table(kind, symbol, np.array(rows, dtype=SCHEMAS[kind][0]))
+
+    def write_table(self, kind, symbol, table):
+        dtype, time_col = SCHEMAS[kind]
+        table = table[np.argsort(table[time_col], kind='stable')]
+        days = table[time_col] // DAY_MS
+
+        # rows are sorted, so each day is one contiguous slice
+        starts = np.flatnonzero(np.diff(days)) + 1
+        for chunk in np.split(table, starts):
+            folder = self.new_part(self.day_folder(kind, symbol, day_name(int(chunk[time_col][0] // DAY_MS))))
+            for name in dtype.names:
+                np.save(os.path.join(folder, f'{name}.npy'), np.ascontiguousarray(chunk[name]))
+
+    def take_buffers(self, full_only=False):
+        """Swap out buffers to write (on the event loop, so appends never race the writer)."""
+        taken = {}
+        for key, rows in list(self.buffers.items()):
+            if rows and (not full_only or len(rows) >= self.segment_rows):
+                taken[key] = rows
+                self.buffers[key] = []
+        return taken
+
+    def write_buffers(self, taken):
+        for (kind, symbol), rows in taken.items():
+            self.write_rows(kind, symbol, rows)
+
+    def flush(self):
+        self.write_buffers(self.take_buffers())
+
+    async def run(self):
+        """Background writer: write full buffers often, everything every flush_interval."""
+        loop = asyncio.get_running_loop()
+        last_flush = loop.time()
+        writing = None
+        try:
+            while True:
+                await asyncio.sleep(1)
+                flush_all = loop.time() - last_flush >= self.flush_interval
+                taken = self.take_buffers(full_only=not flush_all)
+                if taken:
+                    # shielded so a cancel can't abandon a write halfway through the thread
+                    writing = asyncio.ensure_future(asyncio.to_thread(self.write_buffers, taken))
+                    await asyncio.shield(writing)
+                if flush_all:
+                    last_flush = loop.time()
+        finally:
+            # let the write in flight finish before the last flush, or both race for the same part folders
+            try:
+                if writing is not None and not writing.done():
+                    await writing
+            finally:
+                self.flush()
+
+    def days(self, kind, symbol):
+        folder = os.path.join(self.root, kind, symbol.upper())
+        return sorted(os.listdir(folder)) if os.path.isdir(folder) else []
+
+    def read(self, kind, symbol, start=None, end=None, columns=None):
+        """
+        Columns for [start, end) (epoch ms, either may be None) as a dict of arrays.
+        Only the requested columns are memory-mapped, and only the matching rows copied.
+        """
+        dtype, time_col = SCHEMAS[kind]
+        columns = list(columns or dtype.names)
+        first_day = day_name(start // DAY_MS) if start is not None else None
+        last_day = day_name((end - 1) // DAY_MS) if end is not None else None
+
+        pieces = {name: [] for name in columns}
+        for day in self.days(kind, symbol):
+            if (first_day and day < first_day) or (last_day and day > last_day):
+                continue
+            day_folder = self.day_folder(kind, symbol, day)
+            for part in sorted(os.listdir(day_folder)):
+                folder = os.path.join(day_folder, part)
+                times = np.load(os.path.join(folder, f'{time_col}.npy'), mmap_mode='r')
+                lo = np.searchsorted(times, start, 'left') if start is not None else 0
+                hi = np.searchsorted(times, end, 'left') if end is not None else len(times)
+                if hi <= lo:
+                    continue
+                for name in columns:
+                    column = np.load(os.path.join(folder, f'{name}.npy'), mmap_mode='r')
+                    pieces[name].append(np.array(column[lo:hi]))
+
+        result = {}
+        for name in columns:
+            result[name] = np.concatenate(pieces[name]) if pieces[name] else np.empty(0, dtype[name])
+
+        # segments can overlap in time (several flushes a day), keep rows in time order
+        if time_col in result and np.any(np.diff(result[time_col]) < 0):
+            order = np.argsort(result[time_col], kind='stable')
+            result = {name: values[order] for name, values in result.items()}
+        return result
+
+    def compact(self, kind, symbol, day):
+        """Merge a day's small segments into one."""
+        dtype, time_col = SCHEMAS[kind]
+        day_folder = self.day_folder(kind, symbol, day)
+        parts = sorted(os.listdir(day_folder))
+        if len(parts) < 2:
+            return
+        chunks = []
+        for part in parts:
+            folder = os.path.join(day_folder, part)
+            chunk = np.empty(len(np.load(os.path.join(folder, f'{time_col}.npy'), mmap_mode='r')), dtype)
+            for name in dtype.names:
+                chunk[name] = np.load(os.path.join(folder, f'{name}.npy'))
+            chunks.append(chunk)
+
+        # write the merged segment before removing the old ones
+        self.write_table(kind, symbol, np.concatenate(chunks))
+        for part in parts:
+            folder = os.path.join(day_folder, part)
+            for name in os.listdir(folder):
+                os.remove(os.path.join(folder, name))
+            os.rmdir(folder)
+
+def iter_trades_csv(csv_filename):
+    """
+    Yield (event_time, symbol, agg_trade_id, price, quantity, trade_time, is_buyer_maker)
+    from a live_data_csv/<symbol>_trades.csv recording.
+
+    The recordings hold two row layouts: 7 values under the 8 column header (no First
+    Trade ID), and an older 6 value one with no trade ID and an HH:MM:SS trade time.
+    For the older rows the ID is -1 and the event time stands in for the trade time.
+    Torn lines from concurrent appends are skipped.
+    """
+    with open(csv_filename) as f:
+        reader = csv.reader(f, skipinitialspace=True)
+        next(reader, None)
+        for fields in reader:
+            try:
+                if len(fields) == 7:
+                    event_time, symbol, agg_id, price, quantity, trade_time, is_buyer_maker = fields
+                    yield (int(event_time), symbol, int(agg_id), float(price), float(quantity),
+                           int(trade_time), is_buyer_maker == 'True')
+                elif len(fields) == 6:
+                    event_time, symbol, price, quantity, _, is_buyer_maker = fields
+                    yield (int(event_time), symbol, -1, float(price), float(quantity),
+                           int(event_time), is_buyer_maker == 'True')
+            except ValueError:
+                continue
+
+def import_trades_csv(store, csv_filename):
+    """Load an existing live_data_csv/<symbol>_trades.csv into the store."""
+    for event_time, symbol, agg_id, price, quantity, trade_time, is_buyer_maker in iter_trades_csv(csv_filename):
+        store.append('trades', symbol, (event_time, agg_id, price, quantity, trade_time, is_buyer_maker))
+    store.flush()
@@ -0,0 +1,111 @@
+'''
+Batched CSV writer shared by the stream handlers
+
+Handlers used to open, append and close their CSV for every websocket message.
+Now they just queue the finished line with `await csv_sink.write(filename, line)`
+and one writer task keeps the files open and writes in batches, either when
+batch_size lines are waiting or flush_interval seconds have passed.
+
+The disk writes run in a worker thread so a slow disk never stalls the receive
+loop, and the queue is bounded so a stuck disk pushes back instead of eating RAM.
+
+fsync_interval: None = leave it to the OS, 0 = fsync every batch,
+                N = fsync at most every N seconds
+folder:         write every file into this folder instead (load tests, replays)
+'''
+import asyncio
+import os
+import time
+from metrics import metrics, decoded_at
+
+class CsvSink:
+    def __init__(self, batch_size=1000, flush_interval=1.0, max_queue=100000, fsync_interval=None, folder=None):
+        self.batch_size = batch_size
+        self.folder = folder
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.files = {}  # filename -> open file handle
+        self.last_fsync = time.monotonic()
+        self.rows_written = 0
+        self.latency = {}  # filename -> decoded_to_persisted histogram
+        metrics.gauge('queue_depth', self.queue_depth, queue='csv_sink')
+
+    async def write(self, filename, line):
+        """Queue one finished CSV line (with its newline) for filename."""
+        await self.queue.put((filename, line, decoded_at.get() or time.time()))
+
+    def queue_depth(self):
+        return self.queue.qsize()
+
+    def write_batch(self, batch):
+        """Group a batch by file and write each group with a single call."""
+        grouped = {}
+        for filename, line, _ in batch:
+            grouped.setdefault(filename, []).append(line)
+
+        for filename, lines in grouped.items():
+            f = self.files.get(filename)
+            if f is None:
+                path = os.path.join(self.folder, os.path.basename(filename)) if self.folder else filename
+                f = self.files[filename] = open(path, 'a')
+            f.write(''.join(lines))
+            f.flush()
+
+        if self.fsync_interval is not None and time.monotonic() - self.last_fsync >= self.fsync_interval:
+            for f in self.files.values():
+                os.fsync(f.fileno())
+            self.last_fsync = time.monotonic()
+
+        self.rows_written += len(batch)
+
+        persisted = time.time()
+        for filename, _, decoded in batch:
+            histogram = self.latency.get(filename)
+            if histogram is None:
+                histogram = self.latency[filename] = metrics.histogram(
+                    'ws_latency_seconds', stage='decoded_to_persisted', sink=os.path.basename(filename))
+            histogram.record(persisted - decoded)
+
+    def drain(self):
+        """Take everything still waiting in the queue."""
+        batch = []
+        while not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+        return batch
+
+    def close_files(self):
+        for f in self.files.values():
+            f.flush()
+            os.fsync(f.fileno())
+            f.close()
+        self.files = {}
+
+    async def run(self):
+        """Writer task: collect batches and write them off the event loop."""
+        loop = asyncio.get_running_loop()
+        batch = []
+        writing = None
+        try:
+            while True:
+                batch = [await self.queue.get()]
+                deadline = loop.time() + self.flush_interval
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self.queue.get_nowait())
+                    except asyncio.QueueEmpty:
+                        remaining = deadline - loop.time()
+                        if remaining <= 0:
+                            break
+                        await asyncio.sleep(min(remaining, 0.05))
+
+                # shielded so a cancel can't abandon a batch halfway through the thread
+                writing = asyncio.ensure_future(asyncio.to_thread(self.write_batch, batch))
+                batch = []
+                await asyncio.shield(writing)
+        finally:
+            # clean shutdown - whatever is still queued goes to disk
+            if writing is not None and not writing.done():
+                await writing
+            self.write_batch(batch + self.drain())
+            self.close_files()
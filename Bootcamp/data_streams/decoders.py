@@ -0,0 +1,176 @@
+'''
+Shared message decoding for the Binance stream handlers
+
+decode_frame(message) takes a raw combined-stream frame and returns (stream, payload),
+where payload is a typed record for the streams we know:
+
+    <symbol>@aggTrade  -> AggTrade      (price/quantity as floats, times as epoch ms)
+    forceOrder streams -> ForceOrder
+    <symbol>@markPrice -> MarkPrice
+    !markPrice@arr     -> list of MarkPrice
+    anything else      -> the plain decoded dict
+
+The JSON backend is the fastest one installed: msgspec (aggTrade and forceOrder frames
+go straight into typed structs, no dict in between, then into the same namedtuples), then
+orjson, then the stdlib json. Every backend returns the same record types.
+
+Nothing here formats times. Handlers call format_time_est(ms) only when they actually
+print or write a row; it is cached per second and reuses one timezone object.
+
+bench_decoders.py checks the backends agree and measures messages/second for each.
+'''
+import json
+from collections import namedtuple
+from datetime import datetime
+from functools import lru_cache
+import pytz
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+AggTrade = namedtuple('AggTrade', [
+    'event_time', 'symbol', 'agg_trade_id', 'price', 'quantity',
+    'first_trade_id', 'last_trade_id', 'trade_time', 'is_buyer_maker',
+])
+ForceOrder = namedtuple('ForceOrder', [
+    'event_time', 'symbol', 'side', 'order_type', 'time_in_force', 'original_quantity',
+    'price', 'average_price', 'order_status', 'last_filled_quantity', 'filled_quantity', 'trade_time',
+])
+MarkPrice = namedtuple('MarkPrice', [
+    'event_time', 'symbol', 'mark_price', 'index_price', 'funding_rate', 'next_funding_time',
+])
+
+BACKENDS = [name for name, module in (('msgspec', msgspec), ('orjson', orjson)) if module] + ['json']
+default_backend = BACKENDS[0]
+
+def decode_agg_trade(d):
+    return AggTrade(d['E'], d['s'], d['a'], float(d['p']), float(d['q']), d['f'], d['l'], d['T'], d['m'])
+
+def decode_force_order(d):
+    o = d['o']
+    return ForceOrder(d['E'], o['s'], o['S'], o['o'], o['f'], float(o['q']), float(o['p']),
+                      float(o['ap']), o['X'], float(o['l']), float(o['z']), o['T'])
+
+def decode_mark_price(d):
+    # delivery contracts send an empty funding rate
+    return MarkPrice(d['E'], d['s'], float(d['p']), float(d.get('i') or 0), float(d['r'] or 0), d.get('T', 0))
+
+def decode_mark_price_arr(items):
+    return [decode_mark_price(d) for d in items]
+
+PAYLOAD_DECODERS = {
+    'aggTrade': decode_agg_trade,
+    'forceOrder': decode_force_order,
+    'markPrice': decode_mark_price,
+    'markPriceArr': decode_mark_price_arr,
+}
+
+@lru_cache(maxsize=1024)
+def stream_kind(stream):
+    """Map a stream name to its payload schema ('aggTrade', 'markPrice', ...) or None."""
+    if stream.endswith('@aggTrade'):
+        return 'aggTrade'
+    if 'forceOrder' in stream:
+        return 'forceOrder'
+    if stream.startswith('!markPrice@arr'):
+        return 'markPriceArr'
+    if '@markPrice' in stream:
+        return 'markPrice'
+    return None
+
+def decode_payload(kind, data):
+    decoder = PAYLOAD_DECODERS.get(kind)
+    return decoder(data) if decoder else data
+
+if msgspec:
+    class _Frame(msgspec.Struct):
+        stream: str
+        data: msgspec.Raw
+
+    # same fields, in the same order, as the AggTrade namedtuple, filled straight from the json
+    class _AggTrade(msgspec.Struct, rename={
+            'event_time': 'E', 'symbol': 's', 'agg_trade_id': 'a', 'price': 'p', 'quantity': 'q',
+            'first_trade_id': 'f', 'last_trade_id': 'l', 'trade_time': 'T', 'is_buyer_maker': 'm'}):
+        event_time: int
+        symbol: str
+        agg_trade_id: int
+        price: float
+        quantity: float
+        first_trade_id: int
+        last_trade_id: int
+        trade_time: int
+        is_buyer_maker: bool
+
+    class _Order(msgspec.Struct, rename={
+            'symbol': 's', 'side': 'S', 'order_type': 'o', 'time_in_force': 'f', 'original_quantity': 'q',
+            'price': 'p', 'average_price': 'ap', 'order_status': 'X', 'last_filled_quantity': 'l',
+            'filled_quantity': 'z', 'trade_time': 'T'}):
+        symbol: str
+        side: str
+        order_type: str
+        time_in_force: str
+        original_quantity: float
+        price: float
+        average_price: float
+        order_status: str
+        last_filled_quantity: float
+        filled_quantity: float
+        trade_time: int
+
+    class _ForceOrder(msgspec.Struct):
+        E: int
+        o: _Order
+
+def make_frame_decoder(backend=None):
+    """Build decode_frame(message) -> (stream, payload) for one json backend."""
+    backend = backend or default_backend
+
+    if backend == 'msgspec':
+        frame_decoder = msgspec.json.Decoder(_Frame)
+        agg_trade_decoder = msgspec.json.Decoder(_AggTrade, strict=False)  # strict=False: "p":"96573.7" -> float
+        force_order_decoder = msgspec.json.Decoder(_ForceOrder, strict=False)
+        generic_decoder = msgspec.json.Decoder()
+
+        def decode_frame(message):
+            frame = frame_decoder.decode(message)
+            kind = stream_kind(frame.stream)
+            if kind == 'aggTrade':
+                return frame.stream, AggTrade(*msgspec.structs.astuple(agg_trade_decoder.decode(frame.data)))
+            if kind == 'forceOrder':
+                liq = force_order_decoder.decode(frame.data)
+                return frame.stream, ForceOrder(liq.E, *msgspec.structs.astuple(liq.o))
+            return frame.stream, decode_payload(kind, generic_decoder.decode(frame.data))
+
+        return decode_frame
+
+    loads = orjson.loads if backend == 'orjson' else json.loads
+
+    def decode_frame(message):
+        frame = loads(message)
+        stream = frame['stream']
+        return stream, decode_payload(stream_kind(stream), frame['data'])
+
+    return decode_frame
+
+decode_frame = make_frame_decoder()
+
+EST = pytz.timezone('US/Eastern')
+
+@lru_cache(maxsize=4096)
+def _format_second(second, tz):
+    return datetime.fromtimestamp(second, tz).strftime('%H:%M:%S')
+
+def format_time_est(ms):
+    """Epoch ms -> 'HH:MM:SS' US/Eastern, cached per second."""
+    return _format_second(ms // 1000, EST)
+
+def format_time_local(ms):
+    """Epoch ms -> 'HH:MM:SS' in the machine's local time, cached per second."""
+    return _format_second(ms // 1000, None)
@@ -0,0 +1,76 @@
+'''
+In-process publish/subscribe for decoded market events
+
+The ingestion daemon owns the websockets; everything else in the process subscribes
+here instead of opening its own feed. Topics:
+
+    trade        - AggTrade      (every <symbol>@aggTrade the daemon is subscribed to)
+    liquidation  - ForceOrder    (!forceOrder@arr)
+    funding      - MarkPrice     (one event per symbol of !markPrice@arr)
+
+Subscribers get the decoded record itself, never a copy, so they must treat it as
+read-only. A subscription can be narrowed to one symbol. Handlers may be plain
+functions or coroutines, and an error in one never reaches the others.
+
+    bus.subscribe('trade', on_trade)                   # every symbol
+    bus.subscribe('trade', on_btc, symbol='BTCUSDT')   # one symbol
+
+Processes that want the same events read shared_ring.py instead.
+'''
+import asyncio
+
+TOPICS = ('trade', 'liquidation', 'funding')
+
+class EventBus:
+    def __init__(self, on_error=None):
+        self.on_error = on_error
+        self.handlers = {topic: [] for topic in TOPICS}  # topic -> handlers for every symbol
+        self.symbol_handlers = {topic: {} for topic in TOPICS}  # topic -> symbol -> handlers
+
+    def subscribe(self, topic, handler, symbol=None):
+        """Register handler(event) for a topic, optionally only for one symbol (e.g. 'BTCUSDT')."""
+        if symbol is None:
+            self.handlers[topic].append(handler)
+        else:
+            self.symbol_handlers[topic].setdefault(symbol.upper(), []).append(handler)
+
+    def unsubscribe(self, topic, handler, symbol=None):
+        handlers = self.handlers[topic] if symbol is None else self.symbol_handlers[topic].get(symbol.upper(), [])
+        if handler in handlers:
+            handlers.remove(handler)
+
+    def has_subscribers(self, topic):
+        return bool(self.handlers[topic]) or any(self.symbol_handlers[topic].values())
+
+    async def publish(self, topic, event):
+        """Hand one event to every handler of the topic and of the event's symbol."""
+        handlers = self.handlers[topic]
+        by_symbol = self.symbol_handlers[topic]
+        if by_symbol:
+            handlers = handlers + by_symbol.get(event.symbol, [])
+        for handler in handlers:
+            try:
+                result = handler(event)
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                self.report_error(topic, e)
+
+    def report_error(self, topic, error):
+        if self.on_error:
+            self.on_error(topic, error)
+        else:
+            print(f"⚠️ Error in {topic} subscriber: {error}")
+
+    # combined-stream handlers - subscribe these on the CombinedStreamManager
+
+    async def publish_trade(self, trade):
+        await self.publish('trade', trade)
+
+    async def publish_liquidation(self, liq):
+        await self.publish('liquidation', liq)
+
+    async def publish_funding(self, marks):
+        if self.has_subscribers('funding'):
+            for mark in marks:
+                await self.publish('funding', mark)
@@ -1,103 +1,66 @@
 import asyncio
-import json
-import curses  # For real-time terminal UI
-from datetime import datetime
-from websockets import connect
 import os
+from stream_manager import CombinedStreamManager
+from csv_sink import CsvSink
+from funding_tracker import FundingTracker, yearly_rate
+from funding_dashboard import FundingDashboard
 
-# Symbols to track
+# Symbols always shown on the dashboard - every other perpetual comes in through !markPrice@arr too
 symbols = ['btcusdt', 'ethusdt', 'solusdt', 'wifusdt']
-websocket_url_base = 'wss://fstream.binance.com/ws/'
-csv_folder = 'C:/Users/erikn/Desktop/Bootcamp/live_data_csv'
-csv_filename = os.path.join(csv_folder, 'binance_bigliqs.csv')
+csv_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'live_data_csv')
+csv_filename = os.path.join(csv_folder, 'binance_funding.csv')
+persist_cadence = 3600  # also persist an unchanged rate once an hour (None = only on change)
+dashboard_fps = 4
 
 if not os.path.exists(csv_folder):
     os.makedirs(csv_folder)
 
-# Shared data storage for funding rates
-funding_data = {symbol: "Waiting..." for symbol in symbols}
+if not os.path.isfile(csv_filename):
+    with open(csv_filename, 'w') as f:
+        f.write('event_time_ms,symbol,mark_price,funding_rate,yearly_funding_rate,next_funding_time\n')
 
-for symbol in symbols:
-    csv_filename = os.path.join(csv_folder, f'{symbol}_funding.csv')
-    if not os.path.isfile(csv_filename):
-        with open(csv_filename, 'w') as f:
-            f.write('Event Time, Symbol, Funding Rate, Yearly Funding Rate\n')
+# Latest mark price and funding rate of every perpetual, shared with the dashboard
+funding_tracker = FundingTracker(cadence=persist_cadence)
+funding_errors = {}  # stream -> connection error text, cleared by the next update
 
-async def binance_funding_stream(symbol):
-    """Fetch live funding rates from Binance and update global data."""
-    websocket_url = f'{websocket_url_base}{symbol}@markPrice'
+# one writer task batches the csv appends
+csv_sink = CsvSink()
+columnar_store = None  # set to a ColumnarStore to also record typed columns (see ingest.py)
 
-    while True:
-        try:
-            async with connect(websocket_url) as websocket:
-                while True:
-                    message = await websocket.recv()
-                    data = json.loads(message)
-                    event_time = datetime.fromtimestamp(data['E'] / 1000).strftime("%H:%M:%S")
-                    funding_rate = float(data['r'])
-                    yearly_funding_rate = (funding_rate * 3 * 365) * 100
+async def binance_funding_stream(marks):
+    """Handle a decoded !markPrice@arr list (or a single <symbol>@markPrice) routed by the manager."""
+    if not isinstance(marks, list):
+        marks = [marks]
+    funding_errors.clear()
 
-                    # Store the latest funding rate
-                    funding_data[symbol] = f"{event_time}  {symbol.upper()}  {yearly_funding_rate:.2f}%"
+    for mark in marks:
+        symbol = mark.symbol.lower()
+        if not funding_tracker.update(mark, symbol):
+            continue  # rate unchanged and not due yet
 
-                    # Save to CSV
-                    csv_filename = os.path.join(csv_folder, f'{symbol}_funding.csv')
-                    with open(csv_filename, 'a') as f:
-                        f.write(f"{event_time}, {symbol.upper()}, {funding_rate}, {yearly_funding_rate}\n")
+        # Save to CSV with the exchange event time in epoch ms
+        if csv_sink is not None:
+            await csv_sink.write(csv_filename, f"{mark.event_time},{mark.symbol},{mark.mark_price},{mark.funding_rate},"
+                                               f"{yearly_rate(mark.funding_rate)},{mark.next_funding_time}\n")
+        if columnar_store is not None:
+            columnar_store.append('funding', symbol, (mark.event_time, mark.mark_price, mark.funding_rate))
 
-        except Exception as e:
-            funding_data[symbol] = f"Error: {e}. Reconnecting..."
-            await asyncio.sleep(5)  # Retry after delay
-
-async def display_funding_rates(stdscr):
-    """Curses-based UI to display funding rates in real-time."""
-    curses.curs_set(0)  # Hide cursor
-    stdscr.nodelay(1)   # Make getch() non-blocking
-    stdscr.timeout(100)  # Refresh rate
-
-    # Set up color pairs
-    curses.start_color()
-    curses.init_pair(1, curses.COLOR_BLACK, curses.COLOR_RED)    # High funding
-    curses.init_pair(2, curses.COLOR_BLACK, curses.COLOR_YELLOW) # Medium-high funding
-    curses.init_pair(3, curses.COLOR_BLACK, curses.COLOR_CYAN)   # Medium funding
-    curses.init_pair(4, curses.COLOR_BLACK, curses.COLOR_GREEN)  # Low funding
-    curses.init_pair(5, curses.COLOR_WHITE, curses.COLOR_BLACK)  # Default
-
-    while True:
-        stdscr.clear()
-        stdscr.addstr(0, 0, "Binance Funding Rates (Live Updates)", curses.A_BOLD)
-        stdscr.addstr(1, 0, "=" * 40)
-
-        for idx, symbol in enumerate(symbols):
-            rate_text = funding_data[symbol]
-
-            # Determine the color based on funding rate
-            try:
-                rate_value = float(rate_text.split()[-1][:-1])  # Extract numerical value
-                if rate_value > 50:
-                    color = curses.color_pair(1)
-                elif rate_value > 30:
-                    color = curses.color_pair(2)
-                elif rate_value > 5:
-                    color = curses.color_pair(3)
-                elif rate_value < -10:
-                    color = curses.color_pair(4)
-                else:
-                    color = curses.color_pair(5)
-            except ValueError:
-                color = curses.color_pair(5)  # Default color if parsing fails
-
-            # Display funding rate in the UI
-            stdscr.addstr(3 + idx, 0, rate_text, color)
-
-        stdscr.refresh()
-        await asyncio.sleep(1)  # Refresh every second
+def funding_stream_error(stream, error):
+    """Show connection errors in the UI instead of printing over it."""
+    funding_errors[stream.rsplit('=', 1)[-1]] = str(error)
 
 async def main():
     """Run both the WebSocket fetchers and UI display."""
-    tasks = [binance_funding_stream(symbol) for symbol in symbols]
-    tasks.append(curses.wrapper(display_funding_rates))  # Run curses UI
-    await asyncio.gather(*tasks)
+    manager = CombinedStreamManager(on_error=funding_stream_error)
+    manager.subscribe('!markPrice@arr', binance_funding_stream)
+    dashboard = FundingDashboard(funding_tracker, funding_errors, symbols, fps=dashboard_fps)
+    tasks = [asyncio.create_task(manager.run()), asyncio.create_task(csv_sink.run())]
+    try:
+        await dashboard.run()  # returns on 'q'
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
 
 if __name__ == "__main__":
     asyncio.run(main())
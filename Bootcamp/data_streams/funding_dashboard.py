@@ -0,0 +1,73 @@
+'''
+Live funding-rate dashboard for the terminal
+
+Reads numeric snapshots straight from shared state (a {symbol: FundingRate} mapping
+such as funding.funding_tracker, plus {name: error text}) and draws them with curses
+as a table; the drawing, paging and keys are table_dashboard.py's.
+
+Keys:
+    s        cycle the sort column (symbol, annualized, rate, mark, updated)
+    r        reverse the sort
+    n/space  next page        p  previous page   (PgDn/PgUp too)
+    q        quit
+'''
+import curses
+from decoders import format_time_local
+from table_dashboard import TableDashboard
+
+# (title, width, sort key) - sort keys read the numeric snapshot, never the drawn text
+COLUMNS = [
+    ('Symbol', 12, lambda symbol, rate: symbol),
+    ('Annualized', 12, lambda symbol, rate: rate.yearly_rate),
+    ('Rate', 12, lambda symbol, rate: rate.funding_rate),
+    ('Mark', 14, lambda symbol, rate: rate.mark_price),
+    ('Updated', 10, lambda symbol, rate: rate.event_time),
+]
+
+def color_for(yearly_rate):
+    """Color pair number for an annualized funding rate in %."""
+    if yearly_rate > 50:
+        return 1  # High funding
+    if yearly_rate > 30:
+        return 2  # Medium-high funding
+    if yearly_rate > 5:
+        return 3  # Medium funding
+    if yearly_rate < -10:
+        return 4  # Low funding
+    return 5
+
+class FundingDashboard(TableDashboard):
+    title = 'Binance Funding Rates (Live Updates)'
+    noun = 'symbols'
+    columns = COLUMNS
+    color_pairs = [
+        (curses.COLOR_BLACK, curses.COLOR_RED),     # High funding
+        (curses.COLOR_BLACK, curses.COLOR_YELLOW),  # Medium-high funding
+        (curses.COLOR_BLACK, curses.COLOR_CYAN),    # Medium funding
+        (curses.COLOR_BLACK, curses.COLOR_GREEN),   # Low funding
+        (curses.COLOR_WHITE, curses.COLOR_BLACK),   # Default
+    ]
+
+    def __init__(self, rates, errors=None, symbols=None, fps=4, sort_column=0, reverse=False):
+        super().__init__(fps, sort_column, reverse)
+        self.rates = rates  # symbol -> FundingRate, updated by the stream handler
+        self.errors = errors if errors is not None else {}
+        self.symbols = symbols  # always listed, even before their first update
+
+    def rows(self):
+        symbols = set(self.rates) | set(self.errors) | set(self.symbols or ())
+        ready = {symbol: self.rates[symbol] for symbol in symbols if symbol in self.rates}
+        return ready, [symbol for symbol in symbols if symbol not in ready]
+
+    def row_cells(self, symbol):
+        """[(text, color pair)] for one symbol, from its numeric snapshot."""
+        error = self.errors.get(symbol)
+        rate = self.rates.get(symbol)
+        if error:
+            return [(symbol.upper(), 5), (f"Error: {error}. Reconnecting...", 5)]
+        if rate is None:
+            return [(symbol.upper(), 5), ("Waiting...", 5)]
+        color = color_for(rate.yearly_rate)
+        return [(symbol.upper(), color), (f"{rate.yearly_rate:.2f}%", color),
+                (f"{rate.funding_rate * 100:.4f}%", color), (f"{rate.mark_price:.6g}", color),
+                (format_time_local(rate.event_time), color)]
@@ -0,0 +1,97 @@
+'''
+All-market funding tracker for the !markPrice@arr stream
+
+One combined-stream subscription to !markPrice@arr delivers the mark price and
+funding rate of every perpetual once a second. FundingTracker keeps the latest
+values in a compact table - one row per symbol in parallel NumPy columns - and
+decides which updates are worth persisting:
+
+    - the funding rate changed since the last persisted row, or
+    - `cadence` seconds have passed since it (None = only on change)
+
+Consecutive identical rows are what made the old per-symbol *_funding.csv files
+so big; most symbols only change rate a few times an hour.
+
+The tracker is also a read-only mapping {symbol: FundingRate}, so the dashboard
+(funding_dashboard.py) can page through the whole market, and top_extremes(n)
+returns the n most extreme annualized rates.
+'''
+from collections import namedtuple
+from collections.abc import Mapping
+import numpy as np
+
+FundingRate = namedtuple('FundingRate', ['event_time', 'mark_price', 'funding_rate', 'yearly_rate'])
+
+FUNDINGS_PER_YEAR = 3 * 365  # 8 hour funding interval
+
+def yearly_rate(funding_rate):
+    """Annualized funding rate in %."""
+    return funding_rate * FUNDINGS_PER_YEAR * 100
+
+class FundingTracker(Mapping):
+    def __init__(self, cadence=None, capacity=512):
+        self.cadence_ms = cadence * 1000 if cadence else None
+        self.index = {}     # symbol -> row
+        self.symbols = []   # row -> symbol
+        self.event_time = np.zeros(capacity, 'i8')
+        self.mark_price = np.zeros(capacity, 'f8')
+        self.funding_rate = np.zeros(capacity, 'f8')
+        self.next_funding_time = np.zeros(capacity, 'i8')
+        self.persisted_rate = np.full(capacity, np.nan)
+        self.persisted_time = np.zeros(capacity, 'i8')
+
+    def row_of(self, symbol):
+        row = self.index.get(symbol)
+        if row is None:
+            row = self.index[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+            if row == len(self.event_time):
+                self.grow()
+        return row
+
+    def grow(self):
+        for name in ('event_time', 'mark_price', 'funding_rate', 'next_funding_time', 'persisted_time'):
+            column = getattr(self, name)
+            setattr(self, name, np.concatenate([column, np.zeros_like(column)]))
+        self.persisted_rate = np.concatenate([self.persisted_rate, np.full(len(self.persisted_rate), np.nan)])
+
+    def update(self, mark, symbol=None):
+        """Store one MarkPrice. Returns True when this update should be persisted."""
+        row = self.row_of(symbol or mark.symbol)
+        if mark.event_time < self.event_time[row]:
+            return False  # out of order, keep the newer value
+        self.event_time[row] = mark.event_time
+        self.mark_price[row] = mark.mark_price
+        self.funding_rate[row] = mark.funding_rate
+        self.next_funding_time[row] = mark.next_funding_time
+
+        due = self.cadence_ms is not None and mark.event_time - self.persisted_time[row] >= self.cadence_ms
+        if mark.funding_rate != self.persisted_rate[row] or due:
+            self.persisted_rate[row] = mark.funding_rate
+            self.persisted_time[row] = mark.event_time
+            return True
+        return False
+
+    def yearly_rates(self):
+        return yearly_rate(self.funding_rate[:len(self.symbols)])
+
+    def top_extremes(self, n=10):
+        """[(symbol, annualized %)] for the n rates furthest from zero, most extreme first."""
+        rates = self.yearly_rates()
+        if n < len(rates):
+            rows = np.argpartition(-np.abs(rates), n)[:n]
+        else:
+            rows = np.arange(len(rates))
+        rows = rows[np.argsort(-np.abs(rates[rows]), kind='stable')]
+        return [(self.symbols[row], float(rates[row])) for row in rows]
+
+    def __getitem__(self, symbol):
+        row = self.index[symbol]
+        rate = float(self.funding_rate[row])
+        return FundingRate(int(self.event_time[row]), float(self.mark_price[row]), rate, yearly_rate(rate))
+
+    def __iter__(self):
+        return iter(self.symbols)
+
+    def __len__(self):
+        return len(self.symbols)
@@ -1,14 +1,14 @@
 import asyncio
-import json 
 import os 
-from datetime import datetime
-import pytz 
-from websockets import connect 
+import time
+from collections import deque
 from termcolor import cprint 
+from stream_manager import CombinedStreamManager
+from decoders import format_time_est
+from rolling_windows import RollingSeconds
 
 # list of symbols you want to track 
 symbols = ['btcusdt', 'ethusdt', 'solusdt', 'bnbusdt', 'dogeusdt', 'wifusdt']
-websocket_url_base = 'wss://fstream.binance.com/ws/'
 trades_filename = 'binance_trades.csv'
 
 # check if the csv file exists
@@ -17,49 +17,99 @@ if not os.path.isfile(trades_filename):
         f.write('Event Time, Symbol, Aggregate Trade ID, Price, Quantity, First Trade ID, Trade Time, Is Buyer Maker\n')
 
 class TradeAggregator:
-    def __init__(self):
-        self.trade_buckets = {}
-
-    async def add_trade(self, symbol, second, usd_size, is_buyer_maker):
-        trade_key = (symbol, second, is_buyer_maker)
-        self.trade_buckets[trade_key] = self.trade_buckets.get(trade_key, 0) + usd_size
-
-    async def check_and_print_trades(self):
-        timestamp_now = datetime.utcnow().strftime("%H:%M:%S")
-        deletetions = []
-        for trade_key, usd_size in self.trade_buckets.items():
-            symbol, second, is_buyer_maker = trade_key
-            if second < timestamp_now and usd_size > 500000:
-                attrs = ['bold']
-                back_color = 'on_blue' if not is_buyer_maker else 'on_magenta'
-                trade_type = "BUY" if not is_buyer_maker else 'SELL'
-                if usd_size > 3000000:
-                    usd_size = usd_size / 1000000
-                    cprint(f"\033[5m{trade_type} {symbol} {second} ${usd_size:.2f}m\033[0m", 'white', back_color, attrs=attrs)
-                else:
-                    usd_size = usd_size / 1000000
-                    cprint(f"{trade_type} {symbol} {second} ${usd_size:.2f}m", 'white', back_color, attrs=attrs)
-                deletetions.append(trade_key)
-
-        for key in deletetions:
-            del self.trade_buckets[key]
+    """
+    Buy/sell notional per symbol in epoch-second ring buffers (see rolling_windows.py).
 
-trade_aggregator = TradeAggregator()
+    Seconds are keyed by exchange trade time in epoch seconds, so midnight and time
+    zones don't matter. Every opened second is queued once; a tick only looks at the
+    seconds that closed since the last one (O(expired)) and alerts on single-second
+    spikes. The 1s/5s/60s rolling windows are running sums, used for sustained-flow
+    alerts over the window ending at the last closed second (never the still-open ones).
+    """
+    def __init__(self, windows=(1, 5, 60), spike_threshold=500000, flow_thresholds=None, close_delay=1):
+        self.windows = windows
+        self.spike_threshold = spike_threshold
+        self.flow_thresholds = flow_thresholds or {5: 2000000, 60: 10000000}
+        self.close_delay = close_delay  # seconds to wait for late trades before a second is closed
+        self.rings = {}  # symbol -> RollingSeconds with channels (buy, sell)
+        self.open_seconds = deque()  # (second, symbol) in the order they were opened
+        self.flow_alerted = set()  # (symbol, window, side) currently above its threshold
+
+    def add_trade(self, symbol, trade_time, usd_size, is_buyer_maker):
+        """trade_time is the exchange trade time in epoch ms."""
+        second = trade_time // 1000
+        ring = self.rings.get(symbol)
+        if ring is None:
+            ring = self.rings[symbol] = RollingSeconds(2, self.windows)
+
+        bucket = ring.bucket(second)
+        if bucket is None or bucket == (0.0, 0.0):
+            self.open_seconds.append((second, symbol))
+
+        if is_buyer_maker:
+            ring.add(second, 0.0, usd_size)
+        else:
+            ring.add(second, usd_size, 0.0)
+
+    def close_seconds(self, now_second):
+        """Yield (symbol, second, buy, sell) for every second that closed by now_second."""
+        cutoff = now_second - self.close_delay
+        while self.open_seconds and self.open_seconds[0][0] < cutoff:
+            second, symbol = self.open_seconds.popleft()
+            ring = self.rings[symbol]
+            bucket = ring.bucket(second)
+            if bucket is not None:
+                yield symbol, second, bucket[0], bucket[1]
 
-async def binance_trade_stream(uri, symbol, filename, aggregator):
-    async with connect(uri) as websocket:
-        while True:
-            try:
-                message = await websocket.recv()
-                data = json.loads(message)
-                usd_size = float(data['p']) * float(data['q'])
-                trade_time = datetime.fromtimestamp(data['T']/1000, pytz.timezone('US/Eastern'))
-                readable_trade_time = trade_time.strftime('%H:%M:%S')
+    def snapshot(self, symbol, now_second=None):
+        """Rolling {window: (buy, sell)} notional for one symbol."""
+        ring = self.rings.get(symbol)
+        if ring is None:
+            return {window: (0.0, 0.0) for window in self.windows}
+        if now_second is not None:
+            ring.advance(now_second)
+        return ring.all_windows()
 
-                await aggregator.add_trade(symbol.upper().replace('USDT', ''), readable_trade_time, usd_size, data['m'])
+    async def check_and_print_trades(self, now_second=None):
+        now_second = now_second or int(time.time())
+        for symbol, second, buy, sell in self.close_seconds(now_second):
+            readable_second = format_time_est(second * 1000)
+            for usd_size, is_buyer_maker in ((buy, False), (sell, True)):
+                if usd_size > self.spike_threshold:
+                    attrs = ['bold']
+                    back_color = 'on_blue' if not is_buyer_maker else 'on_magenta'
+                    trade_type = "BUY" if not is_buyer_maker else 'SELL'
+                    if usd_size > 3000000:
+                        usd_size = usd_size / 1000000
+                        cprint(f"\033[5m{trade_type} {symbol} {readable_second} ${usd_size:.2f}m\033[0m", 'white', back_color, attrs=attrs)
+                    else:
+                        usd_size = usd_size / 1000000
+                        cprint(f"{trade_type} {symbol} {readable_second} ${usd_size:.2f}m", 'white', back_color, attrs=attrs)
+
+            self.check_flow(symbol, now_second - self.close_delay - 1)
+
+    def check_flow(self, symbol, last_closed):
+        """
+        Alert once when a rolling window ending at the last closed second crosses its
+        threshold, re-arm when it drops back.
+        """
+        windows = self.rings[symbol].all_windows(last_closed)
+        for window, threshold in self.flow_thresholds.items():
+            for usd_size, trade_type in zip(windows[window], ('BUY', 'SELL')):
+                key = (symbol, window, trade_type)
+                if usd_size > threshold and key not in self.flow_alerted:
+                    self.flow_alerted.add(key)
+                    back_color = 'on_blue' if trade_type == 'BUY' else 'on_magenta'
+                    cprint(f"{trade_type} FLOW {symbol} {window}s ${usd_size / 1000000:.2f}m", 'white', back_color, attrs=['bold'])
+                elif usd_size <= threshold:
+                    self.flow_alerted.discard(key)
+
+trade_aggregator = TradeAggregator()
 
-            except:
-                await asyncio.slep(5)
+async def binance_trade_stream(trade, aggregator=trade_aggregator):
+    """Handle one decoded AggTrade routed by the combined-stream manager."""
+    usd_size = trade.price * trade.quantity
+    aggregator.add_trade(trade.symbol.replace('USDT', ''), trade.trade_time, usd_size, trade.is_buyer_maker)
 
 async def print_aggregated_trades_every_second(aggregator):
     while True:
@@ -67,9 +117,11 @@ async def print_aggregated_trades_every_second(aggregator):
         await aggregator.check_and_print_trades()
 
 async def main():
-    filename = 'binance_trades_big.csv'
-    trade_stream_tasks = [binance_trade_stream(f"{websocket_url_base}{symbol}@aggTrade", symbol, filename, trade_aggregator) for symbol in symbols]
+    manager = CombinedStreamManager()
+    for symbol in symbols:
+        manager.subscribe(f"{symbol}@aggTrade", binance_trade_stream)
     print_task = asyncio.create_task(print_aggregated_trades_every_second(trade_aggregator))
-    await asyncio.gather(*trade_stream_tasks, print_task)
+    await asyncio.gather(manager.run(), print_task)
 
-asyncio.run(main())
\ No newline at end of file
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,181 @@
+'''
+Ingestion daemon - every data stream in one process and one event loop
+
+Replaces the one-terminal-per-script model of the old run_all.py. Each upstream
+stream is subscribed exactly once over the combined-stream manager and fanned
+out to every consumer that wants it:
+
+    <symbol>@aggTrade  -> recent_trades (big trade prints + csv), huge_trades (per-second aggregation),
+                          order_flow (CVD, imbalance and trade-size histograms)
+    !markPrice@arr     -> funding (latest rates of every perpetual, csv on change)
+    !forceOrder@arr    -> liquidation_data (csv), big_liquids (big liq prints + csv),
+                          liquidation_cascades (cascade start/end alerts)
+
+All csv appends go through one shared CsvSink, which is flushed on Ctrl+C or SIGTERM.
+
+Other consumers don't need their own feed either: every trade, liquidation and funding
+update is published on `ingest.bus` (see event_bus.py) for code running in this
+process, and trades and liquidations are written to the shared-memory rings
+bootcamp_trades and bootcamp_liquidations (see shared_ring.py) for other processes.
+Set INGEST_SHARED_RING=0 to skip the rings.
+
+Trades pass through an AggTradeGapFiller (see trade_gaps.py) before any consumer sees
+them: duplicates are dropped and the IDs missed during a reconnect are backfilled
+from the REST aggTrades endpoint. Set INGEST_BACKFILL=0 to turn that off.
+
+Every trade also feeds the bar builder (see bar_builder.py), which turns it into the
+bars named in INGEST_BARS (default 1m,dollar:1000000; time, tick:N, volume:N or
+dollar:N) and appends them to the local bar store once a minute and on shutdown.
+Set INGEST_BARS= (empty) to build none.
+
+Every trade also updates the anchored VWAPs (day, week, rolling 60m with std bands) of
+`vwap_engine.vwap_engine`, which bots in this process read from memory. At start they
+are seeded from 1m klines; set INGEST_VWAP_SEED=0 to count from live trades only.
+
+Latency, rates, queue depths and reconnects are served in Prometheus format on
+http://localhost:9108/metrics and summarised every 60 seconds (see metrics.py).
+
+INGEST_STORAGE picks where the recorders write:
+    csv      - live_data_csv/*.csv (default)
+    columnar - typed, day-partitioned NumPy columns (see columnar_store.py)
+    both     - both of the above
+
+run with: python ingest.py   (or python run_all.py)
+'''
+import asyncio
+import os
+import signal
+from stream_manager import CombinedStreamManager
+from csv_sink import CsvSink
+from columnar_store import ColumnarStore
+from metrics import metrics, METRICS_PORT
+from event_bus import EventBus
+from shared_ring import SharedRingWriter
+from trade_gaps import AggTradeGapFiller
+import recent_trades
+import huge_trades
+import funding
+import liquidation_data
+import big_liquids
+import liquidation_cascades
+import order_flow
+import bar_builder
+import vwap_engine
+
+storage = os.environ.get('INGEST_STORAGE', 'csv')
+metrics_port = int(os.environ.get('METRICS_PORT', METRICS_PORT))
+shared_ring = os.environ.get('INGEST_SHARED_RING', '1') != '0'
+backfill = os.environ.get('INGEST_BACKFILL', '1') != '0'
+vwap_seed = os.environ.get('INGEST_VWAP_SEED', '1') != '0'
+bar_specs = [spec for spec in os.environ.get('INGEST_BARS', ','.join(bar_builder.DEFAULT_SPECS)).split(',') if spec]
+summary_interval = 60
+
+bus = EventBus()
+
+def build_manager(sink, store=None, bus=None, gap_filler=None):
+    """
+    Subscribe each upstream stream once and attach all of its consumers (and the bus, if given).
+    With a gap_filler the trade consumers subscribe to it, and it to the manager.
+    """
+    for module in (recent_trades, funding, liquidation_data):
+        module.csv_sink = sink if storage in ('csv', 'both') else None
+        module.columnar_store = store
+    big_liquids.csv_sink = sink
+
+    manager = CombinedStreamManager()
+    trades = gap_filler or manager
+
+    # all trade consumers share the same <symbol>@aggTrade subscription
+    for symbol in recent_trades.symbols:
+        trades.subscribe(f"{symbol}@aggTrade", recent_trades.binance_trade_stream)
+    for symbol in huge_trades.symbols:
+        trades.subscribe(f"{symbol}@aggTrade", huge_trades.binance_trade_stream)
+    for symbol in order_flow.symbols:
+        trades.subscribe(f"{symbol}@aggTrade", order_flow.binance_trade_stream)
+
+    manager.subscribe('!markPrice@arr', funding.binance_funding_stream)
+
+    manager.subscribe('!forceOrder@arr', liquidation_data.binance_liquidation)
+    manager.subscribe('!forceOrder@arr', big_liquids.binance_liquidation)
+    manager.subscribe('!forceOrder@arr', liquidation_cascades.binance_liquidation)
+
+    # bars and VWAPs for every symbol with a trade stream
+    for stream in list(trades.handlers):
+        if stream.endswith('@aggTrade'):
+            if bar_specs:
+                trades.subscribe(stream, bar_builder.bar_builder.binance_trade_stream)
+            trades.subscribe(stream, vwap_engine.binance_trade_stream)
+
+    if bus is not None:
+        for stream in list(trades.handlers):
+            if stream.endswith('@aggTrade'):
+                trades.subscribe(stream, bus.publish_trade)
+        manager.subscribe('!forceOrder@arr', bus.publish_liquidation)
+        manager.subscribe('!markPrice@arr', bus.publish_funding)
+
+    if gap_filler is not None:
+        if bar_specs:
+            bar_builder.bar_builder.paused = gap_filler.held  # symbols backfilling right now
+        gap_filler.attach(manager)
+    return manager
+
+def open_shared_rings(bus):
+    """Create the trade and liquidation rings and feed them from the bus."""
+    trades = SharedRingWriter('trades')
+    liquidations = SharedRingWriter('liquidations', capacity=1 << 12)
+    bus.subscribe('trade', trades.publish_trade)
+    bus.subscribe('liquidation', liquidations.publish_liquidation)
+    metrics.gauge('shared_ring_records', lambda: trades.seq, ring=trades.name)
+    metrics.gauge('shared_ring_records', lambda: liquidations.seq, ring=liquidations.name)
+    return [trades, liquidations]
+
+async def main():
+    sink = CsvSink()
+    store = ColumnarStore() if storage in ('columnar', 'both') else None
+    bars = bar_builder.bar_builder = bar_builder.BarBuilder(bar_specs, persist=True)  # replay doesn't persist
+    manager = build_manager(sink, store, bus, AggTradeGapFiller() if backfill else None)
+    rings = open_shared_rings(bus) if shared_ring else []
+    print(f"🚀 Ingesting {len(manager.handlers)} streams over {len(manager.connection_urls())} connection(s)")
+
+    tasks = [
+        asyncio.create_task(manager.run()),
+        asyncio.create_task(sink.run()),
+        asyncio.create_task(huge_trades.print_aggregated_trades_every_second(huge_trades.trade_aggregator)),
+        asyncio.create_task(liquidation_cascades.check_cascades_every_second()),
+        asyncio.create_task(metrics.serve(metrics_port)),
+        asyncio.create_task(metrics.report_every(summary_interval)),
+    ]
+    if vwap_seed:
+        trade_symbols = [stream.split('@')[0] for stream in manager.handlers if stream.endswith('@aggTrade')]
+        tasks.append(asyncio.create_task(vwap_engine.vwap_engine.seed(trade_symbols)))
+    if bar_specs:
+        metrics.gauge('queue_depth', lambda: bars.pending_rows, queue='bar_builder')
+        tasks.append(asyncio.create_task(bars.run()))
+    if store is not None:
+        metrics.gauge('queue_depth', store.pending_rows, queue='columnar_store')
+        tasks.append(asyncio.create_task(store.run()))
+
+    # stop cleanly on SIGTERM as well as Ctrl+C so the csv sink gets flushed
+    loop = asyncio.get_running_loop()
+    try:
+        loop.add_signal_handler(signal.SIGTERM, lambda: [task.cancel() for task in tasks])
+    except NotImplementedError:
+        pass  # Windows
+
+    try:
+        await asyncio.gather(*tasks)
+    except asyncio.CancelledError:
+        pass
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for ring in rings:
+            ring.close()
+        print("✅ All data streams stopped.")
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("\n🛑 Stopped.")
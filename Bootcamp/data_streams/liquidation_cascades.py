@@ -0,0 +1,189 @@
+'''
+Streaming liquidation-cascade detector over the !forceOrder@arr feed
+
+Keeps, per symbol and for the whole market, epoch-second ring buffers (see
+rolling_windows.py) of long and short liquidation notional and event counts, with
+running sums over each window (default 10s and 60s). A liquidated long is a SELL
+force order, a liquidated short a BUY.
+
+Per symbol it also tracks the price range over the detection window with two
+monotonic deques (rolling max and min), so the price displacement of a cascade is
+known without looking back through history.
+
+A cascade starts when one side's notional AND count over the detection window
+cross the start thresholds, and ends once the notional falls below end_ratio of the
+start threshold (hysteresis, so it doesn't flap). Every event is O(1) amortized;
+tick() only looks at the cascades that are active right now.
+
+    L CASCADE START ETH 10s $3.20m 14 liqs  -2.41%
+    L CASCADE END   ETH after 45s  peak $5.10m 31 liqs  -3.80%
+'''
+import asyncio
+import time
+from collections import deque, namedtuple
+from termcolor import cprint
+from stream_manager import CombinedStreamManager
+from rolling_windows import RollingSeconds
+from decoders import format_time_est
+
+MARKET = 'MARKET'
+SIDES = ('LONG', 'SHORT')
+
+# kind is 'start' or 'end'; displacement is the price move in % over the window (None market-wide)
+CascadeEvent = namedtuple('CascadeEvent', [
+    'kind', 'scope', 'side', 'second', 'notional', 'count', 'displacement', 'started', 'peak_notional',
+])
+
+class PriceRange:
+    """Rolling max/min price over the last `window_ms` with monotonic deques."""
+    def __init__(self, window_ms):
+        self.window_ms = window_ms
+        self.highs = deque()  # (time, price), prices decreasing
+        self.lows = deque()   # (time, price), prices increasing
+        self.last = None
+
+    def add(self, time_ms, price):
+        while self.highs and self.highs[-1][1] <= price:
+            self.highs.pop()
+        self.highs.append((time_ms, price))
+        while self.lows and self.lows[-1][1] >= price:
+            self.lows.pop()
+        self.lows.append((time_ms, price))
+        self.last = price
+        self.expire(time_ms)
+
+    def expire(self, now_ms):
+        cutoff = now_ms - self.window_ms
+        while self.highs[0][0] <= cutoff and len(self.highs) > 1:
+            self.highs.popleft()
+        while self.lows[0][0] <= cutoff and len(self.lows) > 1:
+            self.lows.popleft()
+
+    def displacement(self, side):
+        """% move from the window's extreme to the last price: down for longs, up for shorts."""
+        if side == 'LONG':
+            high = self.highs[0][1]
+            return (self.last - high) / high * 100 if high else 0.0
+        low = self.lows[0][1]
+        return (self.last - low) / low * 100 if low else 0.0
+
+class CascadeDetector:
+    def __init__(self, windows=(10, 60), detect_window=10, start_notional=1000000, start_count=5,
+                 market_notional=5000000, market_count=20, end_ratio=0.5):
+        self.windows = windows
+        self.detect_window = detect_window
+        self.thresholds = {False: (start_notional, start_count), True: (market_notional, market_count)}
+        self.end_ratio = end_ratio
+        self.rings = {}   # symbol or MARKET -> RollingSeconds (long usd, short usd, long count, short count)
+        self.prices = {}  # symbol -> PriceRange
+        self.active = {}  # (scope, side) -> [started second, peak notional, peak count]
+
+    def ring(self, scope):
+        ring = self.rings.get(scope)
+        if ring is None:
+            ring = self.rings[scope] = RollingSeconds(4, self.windows)
+        return ring
+
+    def totals(self, scope, side):
+        """(notional, count) over the detection window."""
+        long_usd, short_usd, long_count, short_count = self.rings[scope].window(self.detect_window)
+        return (long_usd, round(long_count)) if side == 'LONG' else (short_usd, round(short_count))
+
+    def add(self, symbol, side, trade_time, price, usd_size):
+        """Add one liquidation. Returns the cascade-start events it triggered (usually none)."""
+        second = trade_time // 1000
+        liq_side = 'LONG' if side == 'SELL' else 'SHORT'
+        values = (usd_size, 0.0, 1.0, 0.0) if liq_side == 'LONG' else (0.0, usd_size, 0.0, 1.0)
+
+        prices = self.prices.get(symbol)
+        if prices is None:
+            prices = self.prices[symbol] = PriceRange(self.detect_window * 1000)
+        prices.add(trade_time, price)
+
+        events = []
+        for scope in (symbol, MARKET):
+            if not self.ring(scope).add(second, *values):
+                continue  # older than the ring, too late to matter
+            event = self.check_start(scope, liq_side, second)
+            if event:
+                events.append(event)
+        return events
+
+    def check_start(self, scope, side, second):
+        notional, count = self.totals(scope, side)
+        key = (scope, side)
+        cascade = self.active.get(key)
+        if cascade is not None:
+            cascade[1] = max(cascade[1], notional)
+            cascade[2] = max(cascade[2], count)
+            return None
+        min_notional, min_count = self.thresholds[scope == MARKET]
+        if notional >= min_notional and count >= min_count:
+            self.active[key] = [second, notional, count]
+            return CascadeEvent('start', scope, side, second, notional, count,
+                                self.displacement(scope, side), second, notional)
+        return None
+
+    def displacement(self, scope, side):
+        prices = self.prices.get(scope)
+        return prices.displacement(side) if prices else None
+
+    def tick(self, now_second):
+        """Move every active cascade's windows to now and yield the ones that ended."""
+        for key in list(self.active):
+            scope, side = key
+            self.rings[scope].advance(now_second)
+            notional, count = self.totals(scope, side)
+            started, peak_notional, peak_count = self.active[key]
+            min_notional = self.thresholds[scope == MARKET][0]
+            if notional < min_notional * self.end_ratio:
+                del self.active[key]
+                yield CascadeEvent('end', scope, side, now_second, notional, peak_count,
+                                   self.displacement(scope, side), started, peak_notional)
+
+    def snapshot(self, scope, now_second=None):
+        """{window: (long usd, short usd, long count, short count)} for a symbol or MARKET."""
+        ring = self.rings.get(scope)
+        if ring is None:
+            return {window: (0.0, 0.0, 0, 0) for window in self.windows}
+        if now_second is not None:
+            ring.advance(now_second)
+        return {window: (long_usd, short_usd, round(long_count), round(short_count))
+                for window, (long_usd, short_usd, long_count, short_count) in ring.all_windows().items()}
+
+def print_cascade(event):
+    scope = event.scope.replace('USDT', '')
+    side = 'L' if event.side == 'LONG' else 'S'
+    color = 'on_blue' if event.side == 'LONG' else 'on_magenta'
+    move = f"  {event.displacement:+.2f}%" if event.displacement is not None else ''
+    if event.kind == 'start':
+        cprint(f"\033[5m{side} CASCADE START {scope} {format_time_est(event.second * 1000)} "
+               f"${event.notional / 1000000:.2f}m {event.count} liqs{move}\033[0m", 'white', color, attrs=['bold'])
+    else:
+        cprint(f"{side} CASCADE END   {scope} after {event.second - event.started}s  "
+               f"peak ${event.peak_notional / 1000000:.2f}m {event.count} liqs{move}", 'white', color)
+
+cascade_detector = CascadeDetector()
+
+async def binance_liquidation(liq, detector=cascade_detector):
+    """Handle one decoded ForceOrder routed by the combined-stream manager."""
+    price = liq.average_price or liq.price
+    for event in detector.add(liq.symbol, liq.side, liq.trade_time, price, liq.filled_quantity * price):
+        print_cascade(event)
+
+async def check_cascades(detector=cascade_detector, now_second=None):
+    for event in detector.tick(now_second or int(time.time())):
+        print_cascade(event)
+
+async def check_cascades_every_second(detector=cascade_detector):
+    while True:
+        await asyncio.sleep(1)
+        await check_cascades(detector)
+
+async def main():
+    manager = CombinedStreamManager()
+    manager.subscribe('!forceOrder@arr', binance_liquidation)
+    await asyncio.gather(manager.run(), check_cascades_every_second())
+
+if __name__ == "__main__":
+    asyncio.run(main())
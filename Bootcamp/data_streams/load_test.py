@@ -0,0 +1,189 @@
+'''
+Load test for the recorders against the local Binance stand-in
+
+Starts standin_server.py in its own process (so its CPU isn't counted), points the
+ingestion consumers from ingest.build_manager at it and runs them for a while:
+
+    python load_test.py --rate 20000                    # steady 20k msg/s for 30s
+    python load_test.py --rate 100000 --profile ramp    # find where the consumers saturate
+    python load_test.py --profile burst --disconnect-every 10
+    python load_test.py --rate 100000 --connections 4   # streams split over 4 sockets / server processes
+
+Every second prints the received rate, the exchange->receive lag and the sink backlog;
+the end of the run reports:
+    throughput - messages/s actually handled (--rate is the total over all trade connections)
+    lag        - p50/p99/max of scheduled send time -> receive (grows once consumers saturate)
+    drops      - aggregate trade IDs that never arrived (reconnect gaps)
+    CPU        - per handler, as µs per message and % of one core
+
+CSV rows go to a temporary folder (or nowhere with --no-write), never to live_data_csv/.
+'''
+import argparse
+import asyncio
+import contextlib
+import math
+import os
+import shutil
+import sys
+import tempfile
+import time
+from array import array
+from csv_sink import CsvSink
+from metrics import metrics, counts_quantile
+import ingest
+import huge_trades
+
+here = os.path.dirname(os.path.abspath(__file__))
+
+class HandlerTimer:
+    """Wraps a handler and adds up the CPU time the event loop thread spends in it."""
+    def __init__(self, handler):
+        self.handler = handler
+        self.name = f"{handler.__module__}.{handler.__name__}"
+        self.calls = 0
+        self.cpu = 0.0
+
+    async def __call__(self, payload):
+        start = time.thread_time()
+        result = self.handler(payload)
+        if asyncio.iscoroutine(result):
+            await result
+        self.cpu += time.thread_time() - start
+        self.calls += 1
+
+class SequenceCheck:
+    """Counts aggregate trade IDs that were skipped, per symbol."""
+    def __init__(self):
+        self.last_ids = {}
+        self.missing = 0
+        self.gaps = 0
+
+    def __call__(self, trade):
+        last = self.last_ids.get(trade.symbol)
+        if last is not None and trade.agg_trade_id > last + 1:
+            self.missing += trade.agg_trade_id - last - 1
+            self.gaps += 1
+        if last is None or trade.agg_trade_id > last:
+            self.last_ids[trade.symbol] = trade.agg_trade_id
+
+def instrument(manager):
+    """Time every handler already subscribed, then add the sequence check to the trade streams."""
+    timers = {}
+    for stream, handlers in manager.handlers.items():
+        for i, handler in enumerate(handlers):
+            timer = timers.get(handler)
+            if timer is None:
+                timer = timers[handler] = HandlerTimer(handler)
+            handlers[i] = timer
+    check = SequenceCheck()
+    for stream in list(manager.handlers):
+        if stream.endswith('@aggTrade'):
+            manager.subscribe(stream, check)
+    return list(timers.values()), check
+
+def message_count():
+    return sum(c.value for (name, _), c in metrics.counters.items() if name == 'ws_messages_total')
+
+async def wait_for_port(port, timeout=10):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection('localhost', port)
+            writer.close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.1)
+
+async def main(rate=10000, profile='steady', duration=30, port=8766, write=True, disconnect_every=None,
+               connections=1, server_args=(), log=print):
+    folder = tempfile.mkdtemp(prefix='load_test_') if write else None
+    sink = CsvSink(folder=folder) if write else None
+    manager = ingest.build_manager(sink)
+    manager.base_url = f'ws://localhost:{port}'
+    manager.max_streams = math.ceil(len(manager.handlers) / connections)
+    trade_connections = sum('@aggTrade' in url for url in manager.connection_urls())
+
+    server = await asyncio.create_subprocess_exec(
+        sys.executable, os.path.join(here, 'standin_server.py'), '--port', str(port),
+        '--rate', str(rate / trade_connections), '--profile', profile, '--processes', str(connections),
+        *(['--disconnect-every', str(disconnect_every)] if disconnect_every else []),
+        *server_args, stdout=asyncio.subprocess.DEVNULL)
+    manager.reconnect_delay = 0.5
+    errors = []
+    manager.on_error = lambda stream, error: errors.append((stream, error))
+    timers, check = instrument(manager)
+
+    tasks = [asyncio.create_task(huge_trades.print_aggregated_trades_every_second(huge_trades.trade_aggregator))]
+    if sink:
+        tasks.append(asyncio.create_task(sink.run()))
+    try:
+        await wait_for_port(port)
+        tasks.append(asyncio.create_task(manager.run()))
+
+        start_wall, start_cpu, start_messages = time.perf_counter(), time.process_time(), message_count()
+        previous_lag = metrics.merged_counts('ws_latency_seconds', 'exchange_to_receive')
+        previous_messages = start_messages
+        log(f"{'sec':>4} {'msg/s':>9} {'lag p50':>9} {'lag p99':>9} {'sink queue':>10}")
+        for second in range(1, int(duration) + 1):
+            await asyncio.sleep(1)
+            messages = message_count()
+            lag = metrics.merged_counts('ws_latency_seconds', 'exchange_to_receive')
+            interval = array('q', (n - p for n, p in zip(lag, previous_lag)))
+            queued = sink.queue_depth() if sink else 0
+            log(f"{second:>4} {messages - previous_messages:>9,} {counts_quantile(interval, 0.5) * 1000:>7.1f}ms "
+                f"{counts_quantile(interval, 0.99) * 1000:>7.1f}ms {queued:>10,}")
+            previous_lag, previous_messages = lag, messages
+
+        elapsed = time.perf_counter() - start_wall
+        cpu = time.process_time() - start_cpu
+        handled = message_count() - start_messages
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        server.terminate()
+        await server.wait()
+        if folder:
+            shutil.rmtree(folder, ignore_errors=True)
+
+    lag = metrics.merged_counts('ws_latency_seconds', 'exchange_to_receive')
+    reconnects = sum(c.value for (name, _), c in metrics.counters.items() if name == 'ws_reconnects_total')
+    log(f"\n✅ {handled:,} messages in {elapsed:.1f}s = {handled / elapsed:,.0f} msg/s "
+        f"(process CPU {cpu / elapsed:.0%} of one core)")
+    log(f"⏱️ lag p50 {counts_quantile(lag, 0.5) * 1000:.1f}ms  p99 {counts_quantile(lag, 0.99) * 1000:.1f}ms  "
+        f"max {counts_quantile(lag, 1.0) * 1000:.1f}ms")
+    log(f"🕳️ {check.missing:,} trade IDs missing in {check.gaps} gaps, {reconnects} reconnects")
+    if errors:
+        log(f"⚠️ {len(errors)} errors, first: {errors[0][0]}: {errors[0][1]!r}")
+    if sink:
+        log(f"💾 {sink.rows_written:,} csv rows written")
+    log(f"\n{'handler':<45} {'calls':>10} {'µs/msg':>8} {'core %':>7}")
+    for timer in sorted(timers, key=lambda t: t.cpu, reverse=True):
+        per_message = timer.cpu / timer.calls * 1000000 if timer.calls else 0.0
+        log(f"{timer.name:<45} {timer.calls:>10,} {per_message:>8.1f} {timer.cpu / elapsed:>7.1%}")
+    return handled / elapsed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Load test the recorders against standin_server.py')
+    parser.add_argument('--rate', type=float, default=10000, help='aggTrade messages/s from the stand-in')
+    parser.add_argument('--profile', choices=['steady', 'burst', 'ramp'], default='steady')
+    parser.add_argument('--duration', type=float, default=30, help='seconds to run')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--connections', type=int, default=1, help='split the streams over this many sockets')
+    parser.add_argument('--no-write', action='store_true', help="don't write csv rows at all")
+    parser.add_argument('--disconnect-every', type=float, default=None)
+    parser.add_argument('--ramp-seconds', type=float, default=None)
+    args = parser.parse_args()
+    server_args = ['--ramp-seconds', str(args.ramp_seconds)] if args.ramp_seconds else []
+
+    # the handlers print every big trade - keep those off the report
+    out = sys.stdout
+    report = lambda line: print(line, file=out, flush=True)
+    with contextlib.redirect_stdout(open(os.devnull, 'w')):
+        try:
+            asyncio.run(main(args.rate, args.profile, args.duration, args.port, not args.no_write,
+                             args.disconnect_every, args.connections, server_args, log=report))
+        except KeyboardInterrupt:
+            report("\n🛑 Stopped.")
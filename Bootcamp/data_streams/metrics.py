@@ -0,0 +1,195 @@
+'''
+Latency and backlog metrics for the websocket consumers
+
+Tracks, per stream:
+    exchange_to_receive - exchange event time (E) -> frame received locally
+    receive_to_decoded  - frame received -> typed payload ready for the handlers
+    decoded_to_persisted - payload decoded -> its csv row written to disk (per file)
+plus message counts, reconnects and queue depths.
+
+Latencies go into HDR-style log-linear histograms (16 sub-buckets per power of two,
+~6% precision, fixed memory, O(1) record), so percentiles stay cheap at any rate.
+
+Exposed two ways:
+    http://localhost:9108/metrics   - Prometheus text format (serve())
+    a summary line every N seconds  - report_every()
+
+Everything shares the module-level `metrics` registry.
+'''
+import asyncio
+import contextvars
+import time
+from array import array
+
+METRICS_PORT = 9108
+
+# set by the stream manager when a frame is decoded, read by the sinks when the row hits disk
+decoded_at = contextvars.ContextVar('decoded_at', default=None)
+
+class LatencyHistogram:
+    SUB_BUCKETS = 16
+    MAX_US = 1 << 36  # ~19 hours, anything above lands in the last bucket
+
+    def __init__(self):
+        self.counts = array('q', bytes(8 * (self.index(self.MAX_US - 1) + 1)))
+        self.count = 0
+        self.total = 0.0
+
+    @classmethod
+    def index(cls, us):
+        if us < cls.SUB_BUCKETS:
+            return us
+        shift = us.bit_length() - 5  # keep the top 5 bits: 16 linear steps per power of two
+        return cls.SUB_BUCKETS + shift * cls.SUB_BUCKETS + ((us >> shift) - cls.SUB_BUCKETS)
+
+    @classmethod
+    def bucket_value(cls, idx):
+        """Midpoint of a bucket in microseconds."""
+        if idx < cls.SUB_BUCKETS:
+            return float(idx)
+        shift, step = divmod(idx - cls.SUB_BUCKETS, cls.SUB_BUCKETS)
+        low = (cls.SUB_BUCKETS + step) << shift
+        return low + ((1 << shift) - 1) / 2
+
+    def record(self, seconds):
+        us = min(max(int(seconds * 1000000), 0), self.MAX_US - 1)  # clock skew can make it negative
+        self.counts[self.index(us)] += 1
+        self.count += 1
+        self.total += seconds
+
+    def quantile(self, q):
+        """Value in seconds at quantile q."""
+        return counts_quantile(self.counts, q)
+
+def counts_quantile(counts, q):
+    """Quantile (seconds) of a histogram counts array - also works on merged arrays."""
+    target = q * sum(counts)
+    seen = 0
+    for idx, n in enumerate(counts):
+        seen += n
+        if n and seen >= target:
+            return LatencyHistogram.bucket_value(idx) / 1000000
+    return 0.0
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+def label_text(labels):
+    escaped = ((name, str(value).replace('\\', '\\\\').replace('"', '\\"')) for name, value in labels)
+    return ','.join(f'{name}="{value}"' for name, value in escaped)
+
+class Metrics:
+    def __init__(self):
+        self.histograms = {}  # (name, labels) -> LatencyHistogram
+        self.counters = {}    # (name, labels) -> Counter
+        self.gauges = {}      # (name, labels) -> callable returning a number
+        self.last_report = None
+
+    def histogram(self, name, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        if key not in self.histograms:
+            self.histograms[key] = LatencyHistogram()
+        return self.histograms[key]
+
+    def counter(self, name, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        if key not in self.counters:
+            self.counters[key] = Counter()
+        return self.counters[key]
+
+    def gauge(self, name, func, **labels):
+        self.gauges[(name, tuple(sorted(labels.items())))] = func
+
+    def render(self):
+        """Everything in Prometheus text exposition format."""
+        lines = []
+        typed = set()
+        for (name, labels), hist in sorted(self.histograms.items()):
+            if name not in typed:
+                lines.append(f'# TYPE {name} summary')
+                typed.add(name)
+            for q in (0.5, 0.9, 0.99, 0.999):
+                lines.append(f'{name}{{{label_text(labels + (("quantile", q),))}}} {hist.quantile(q):.6f}')
+            lines.append(f'{name}_sum{{{label_text(labels)}}} {hist.total:.6f}')
+            lines.append(f'{name}_count{{{label_text(labels)}}} {hist.count}')
+        for (name, labels), counter in sorted(self.counters.items()):
+            if name not in typed:
+                lines.append(f'# TYPE {name} counter')
+                typed.add(name)
+            lines.append(f'{name}{{{label_text(labels)}}} {counter.value}')
+        for (name, labels), func in sorted(self.gauges.items(), key=lambda item: item[0]):
+            if name not in typed:
+                lines.append(f'# TYPE {name} gauge')
+                typed.add(name)
+            lines.append(f'{name}{{{label_text(labels)}}} {func()}')
+        return '\n'.join(lines) + '\n'
+
+    def merged_counts(self, name, stage):
+        """Sum the per-stream histograms of one stage."""
+        merged = array('q', bytes(8 * len(LatencyHistogram().counts)))
+        for (hist_name, labels), hist in self.histograms.items():
+            if hist_name == name and ('stage', stage) in labels:
+                for idx, n in enumerate(hist.counts):
+                    if n:
+                        merged[idx] += n
+        return merged
+
+    def summary_line(self):
+        """One line with the rate, per-stage p50/p99 and backlog since the last call."""
+        now = time.monotonic()
+        messages = sum(c.value for (name, _), c in self.counters.items() if name == 'ws_messages_total')
+        reconnects = sum(c.value for (name, _), c in self.counters.items() if name == 'ws_reconnects_total')
+        stages = {stage: self.merged_counts('ws_latency_seconds', stage)
+                  for stage in ('exchange_to_receive', 'receive_to_decoded', 'decoded_to_persisted')}
+
+        last_time, last_messages, last_stages = self.last_report or (now, 0, {})
+        self.last_report = (now, messages, stages)
+        rate = (messages - last_messages) / (now - last_time) if now > last_time else 0.0
+
+        parts = [f"📈 {rate:,.0f} msg/s"]
+        for stage, counts in stages.items():
+            previous = last_stages.get(stage)
+            interval = array('q', (n - p for n, p in zip(counts, previous))) if previous else counts
+            if sum(interval):
+                p50 = counts_quantile(interval, 0.5) * 1000
+                p99 = counts_quantile(interval, 0.99) * 1000
+                parts.append(f"{stage} p50 {p50:.2f}ms p99 {p99:.2f}ms")
+        for (name, labels), func in self.gauges.items():
+            parts.append(f"{dict(labels).get('queue', name)} {func()}")
+        parts.append(f"reconnects {reconnects}")
+        return ' | '.join(parts)
+
+    async def handle_http(self, reader, writer):
+        try:
+            request = await reader.readline()
+            while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                pass  # skip headers
+            path = request.split()[1].decode() if len(request.split()) > 1 else '/'
+            if path.startswith('/metrics'):
+                body, status = self.render().encode(), '200 OK'
+            else:
+                body, status = b'not found\n', '404 Not Found'
+            writer.write(f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4\r\n"
+                         f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def serve(self, port=METRICS_PORT, host='127.0.0.1'):
+        """Serve /metrics until cancelled."""
+        server = await asyncio.start_server(self.handle_http, host, port)
+        async with server:
+            await server.serve_forever()
+
+    async def report_every(self, seconds=60, log=print):
+        """Print a summary line every few seconds."""
+        self.summary_line()  # start the first interval now
+        while True:
+            await asyncio.sleep(seconds)
+            log(self.summary_line())
+
+metrics = Metrics()
@@ -1,15 +1,13 @@
 import asyncio
-import json 
 import os 
-from datetime import datetime
-import pytz 
-from websockets import connect 
 from termcolor import cprint 
+from stream_manager import CombinedStreamManager
+from decoders import format_time_est
+from csv_sink import CsvSink
 
 # list of symbols you want to track 
 symbols = ['btcusdt', 'ethusdt', 'solusdt', 'bnbusdt', 'dogeusdt', 'wifusdt']
-websocket_url_base = 'wss://fstream.binance.com/ws/'
-csv_folder = 'C:/Users/erikn/Desktop/Bootcamp/live_data_csv'
+csv_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'live_data_csv')
 csv_filename = os.path.join(csv_folder, 'binance_bigliqs.csv')
 
 if not os.path.exists(csv_folder):
@@ -22,62 +20,63 @@ for symbol in symbols:
         with open(csv_filename, 'w') as f:
             f.write('Event Time, Symbol, Aggregate Trade ID, Price, Quantity, First Trade ID, Trade Time, Is Buyer Maker\n')
 
-async def binance_trade_stream(uri, symbol, csv_folder):
-    async with connect(uri) as websocket:
-        while True:
-            try:
-                message = await websocket.recv()
-                data = json.loads(message)
-                event_time = int(data['E'])
-                agg_trade_id = data['a']
-                price = float(data['p'])
-                quantity = float(data['q'])
-                trade_time = int(data['T'])
-                is_buyer_maker = data['m']
-                est = pytz.timezone('US/Eastern')
-                readable_trade_time = datetime.fromtimestamp(trade_time / 1000, est).strftime('%H:%M:%S')
-                usd_size = price * quantity 
-                display_symbol = symbol.upper().replace('USDT', '')
+# one writer task batches the csv appends for every symbol
+csv_sink = CsvSink()
+columnar_store = None  # set to a ColumnarStore to also record typed columns (see ingest.py)
 
-                if usd_size > 14999:
-                    trade_type = 'SELL' if is_buyer_maker else "BUY"
-                    color = 'red' if trade_type == 'SELL' else 'green'
+async def binance_trade_stream(trade, csv_folder=csv_folder):
+    """Handle one decoded AggTrade routed by the combined-stream manager."""
+    usd_size = trade.price * trade.quantity 
 
-                    stars = ''
-                    attrs = ['bold'] if usd_size >= 50000 else []
-                    repeat_count = 1 
-                    if usd_size >= 500000:
-                        stars = '*' * 2
-                        repeat_count = 1 
-                        if trade_type == 'SELL':
-                            color = 'magenta'
-                        else:
-                            color = 'blue'
-                        
-                    elif usd_size >= 100000:
-                        stars = '*' * 1 
-                        repeat_count = 1 
+    if usd_size > 14999:
+        symbol = trade.symbol.lower()
+        event_time = trade.event_time
+        agg_trade_id = trade.agg_trade_id
+        price = trade.price
+        quantity = trade.quantity
+        trade_time = trade.trade_time
+        is_buyer_maker = trade.is_buyer_maker
+        # only format the time for trades we actually print and log
+        readable_trade_time = format_time_est(trade_time)
+        display_symbol = symbol.upper().replace('USDT', '')
 
-                    output = f"{stars} {trade_type} {display_symbol} {readable_trade_time} ${usd_size:,.0f} "
-                    for _ in range(repeat_count):
-                        cprint(output, 'white', f'on_{color}', attrs=attrs)
+        trade_type = 'SELL' if is_buyer_maker else "BUY"
+        color = 'red' if trade_type == 'SELL' else 'green'
 
-                    # log to csv 
-                    csv_filename = os.path.join(csv_folder, f'{symbol}_trades.csv')
-                    with open(csv_filename, 'a') as f:
-                        f.write(f"{event_time}, {symbol.upper()},{agg_trade_id},{price},{quantity},"
-                                f"{trade_time},{is_buyer_maker}\n")
+        stars = ''
+        attrs = ['bold'] if usd_size >= 50000 else []
+        repeat_count = 1 
+        if usd_size >= 500000:
+            stars = '*' * 2
+            repeat_count = 1 
+            if trade_type == 'SELL':
+                color = 'magenta'
+            else:
+                color = 'blue'
+            
+        elif usd_size >= 100000:
+            stars = '*' * 1 
+            repeat_count = 1 
 
-            except Exception as e:
-                await asyncio.sleep(5)
+        output = f"{stars} {trade_type} {display_symbol} {readable_trade_time} ${usd_size:,.0f} "
+        for _ in range(repeat_count):
+            cprint(output, 'white', f'on_{color}', attrs=attrs)
+
+        # log to csv 
+        csv_filename = os.path.join(csv_folder, f'{symbol}_trades.csv')
+        if csv_sink is not None:
+            await csv_sink.write(csv_filename, f"{event_time}, {symbol.upper()},{agg_trade_id},{price},{quantity},"
+                                               f"{trade_time},{is_buyer_maker}\n")
+        if columnar_store is not None:
+            columnar_store.append('trades', symbol, (event_time, agg_trade_id, price, quantity, trade_time, is_buyer_maker))
 
 async def main():
-    # create a task for each symbol trade stream 
-    tasks = []
+    # subscribe every symbol over one combined-stream socket
+    manager = CombinedStreamManager()
     for symbol in symbols:
-        stream_url = f"{websocket_url_base}{symbol}@aggTrade"
-        tasks.append(binance_trade_stream(stream_url, symbol, csv_folder))
+        manager.subscribe(f"{symbol}@aggTrade", binance_trade_stream)
 
-    await asyncio.gather(*tasks)
+    await asyncio.gather(manager.run(), csv_sink.run())
 
-asyncio.run(main())
+if __name__ == "__main__":
+    asyncio.run(main())
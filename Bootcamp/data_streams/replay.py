@@ -0,0 +1,245 @@
+'''
+Deterministic replay of recorded data through the live stream handlers
+
+Reads the recordings in live_data_csv/ (*_trades.csv, binance_liquidations.csv,
+binance_funding.csv and the older per-symbol *_funding.csv), turns every row back into a Binance-shaped combined-stream frame and
+feeds it, in event-time order, through the same consumers the ingestion daemon wires
+up (recent_trades, huge_trades.TradeAggregator, order_flow, liquidation_data,
+big_liquids, liquidation_cascades, funding).
+
+Time is simulated: the clock follows the recorded event times, at 1x, Nx or as fast
+as possible, and the per-second aggregator tick is driven by the event times of the
+frames as they are dispatched (in both modes), so two runs over the same files print
+the same alerts.
+
+Two ways to deliver the frames:
+    inprocess - straight into CombinedStreamManager.dispatch (no sockets)
+    websocket - from a local stand-in server, consumed over a real socket
+
+Nothing is written to the csv files unless --record is given.
+
+    python replay.py                       # as fast as possible, in-process
+    python replay.py --speed 10 --mode websocket
+    python replay.py --quiet               # throughput only, no alert prints
+'''
+import argparse
+import asyncio
+import contextlib
+import glob
+import heapq
+import json
+import os
+import time
+from datetime import datetime
+import pytz
+from websockets.asyncio.server import serve
+from columnar_store import iter_trades_csv
+from csv_sink import CsvSink
+import ingest
+import huge_trades
+import liquidation_cascades
+
+csv_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'live_data_csv')
+
+def trade_events(csv_filename):
+    """(time_ms, stream, aggTrade payload) for every row of a *_trades.csv recording."""
+    for event_time, symbol, agg_id, price, quantity, trade_time, is_buyer_maker in iter_trades_csv(csv_filename):
+        yield event_time, f"{symbol.lower()}@aggTrade", {
+            'e': 'aggTrade', 'E': event_time, 's': symbol, 'a': agg_id, 'p': str(price), 'q': str(quantity),
+            'f': -1, 'l': -1, 'T': trade_time, 'm': is_buyer_maker}
+
+def liquidation_events(csv_filename):
+    """(time_ms, stream, forceOrder payload) for every row of binance_liquidations.csv."""
+    with open(csv_filename) as f:
+        next(f, None)
+        for line in f:
+            fields = line.strip().split(',')
+            if len(fields) != 12:
+                continue
+            s, S, o, tif, q, p, ap, X, l, z, T, _ = fields
+            # the recorder stripped USDT from every field, put it back on the symbol
+            yield int(T), '!forceOrder@arr', {'e': 'forceOrder', 'E': int(T), 'o': {
+                's': s + 'USDT', 'S': S, 'o': o, 'f': tif, 'q': q, 'p': p, 'ap': ap,
+                'X': X, 'l': l, 'z': z, 'T': int(T)}}
+
+def funding_events(csv_filename):
+    """(time_ms, stream, !markPrice@arr payload) for every row of binance_funding.csv."""
+    with open(csv_filename) as f:
+        next(f, None)
+        for line in f:
+            fields = line.strip().split(',')
+            if len(fields) != 6:
+                continue
+            event_time, symbol, mark_price, rate, _, next_funding_time = fields
+            yield int(event_time), '!markPrice@arr', [{
+                'e': 'markPriceUpdate', 'E': int(event_time), 's': symbol, 'p': mark_price, 'i': '0',
+                'r': rate, 'T': int(next_funding_time)}]
+
+def legacy_funding_events(csv_filename, base_date, tz):
+    """
+    (time_ms, stream, !markPrice@arr payload) for an old per-symbol *_funding.csv recording.
+    Those files only store HH:MM:SS in the recorder's local time, so the date and
+    timezone have to be supplied; a time going backwards is taken as the next day.
+    """
+    zone = pytz.timezone(tz)
+    day = datetime.strptime(base_date, '%Y-%m-%d')
+    day_offset = 0
+    last_seconds = None
+    with open(csv_filename) as f:
+        next(f, None)
+        for line in f:
+            fields = [field.strip() for field in line.split(',')]
+            if len(fields) != 4:
+                continue
+            clock, symbol, rate, _ = fields
+            h, m, s = (int(part) for part in clock.split(':'))
+            seconds = h * 3600 + m * 60 + s
+            if last_seconds is not None and seconds < last_seconds:
+                day_offset += 1
+            last_seconds = seconds
+            local = zone.localize(datetime.fromordinal(day.toordinal() + day_offset).replace(hour=h, minute=m, second=s))
+            event_time = int(local.timestamp() * 1000)
+            yield event_time, '!markPrice@arr', [{
+                'e': 'markPriceUpdate', 'E': event_time, 's': symbol, 'p': '0', 'i': '0', 'r': rate, 'T': 0}]
+
+def recorded_events(folder=csv_folder, funding_date=None, funding_tz='UTC'):
+    """Every recording in the folder merged into one stream, ordered by event time."""
+    sources = [trade_events(path) for path in sorted(glob.glob(os.path.join(folder, '*_trades.csv')))]
+    liquidations = os.path.join(folder, 'binance_liquidations.csv')
+    if os.path.isfile(liquidations):
+        sources.append(liquidation_events(liquidations))
+    funding = os.path.join(folder, 'binance_funding.csv')
+    if os.path.isfile(funding):
+        sources.append(funding_events(funding))
+    if funding_date:
+        sources += [legacy_funding_events(path, funding_date, funding_tz)
+                    for path in sorted(glob.glob(os.path.join(folder, '*_funding.csv')))
+                    if path != funding]
+    # stable merge: equal times keep file order, so every run sees the same sequence
+    return heapq.merge(*sources, key=lambda event: event[0])
+
+def frame(stream, data):
+    return json.dumps({'stream': stream, 'data': data})
+
+class SimClock:
+    """Maps recorded event time onto wall time at a given speed (None = as fast as possible)."""
+    def __init__(self, speed=None):
+        self.speed = speed
+        self.sim_start = None
+        self.wall_start = None
+        self.now_ms = None
+
+    async def wait_until(self, time_ms):
+        if self.sim_start is None:
+            self.sim_start, self.wall_start = time_ms, time.monotonic()
+        self.now_ms = max(time_ms, self.now_ms or time_ms)
+        if self.speed:
+            delay = self.wall_start + (time_ms - self.sim_start) / 1000 / self.speed - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+async def replay_in_process(events, manager, speed=None, on_second=None):
+    """Dispatch every event through the manager on a simulated clock. Returns (count, last time)."""
+    clock = SimClock(speed)
+    last_second = None
+    count = 0
+    for time_ms, stream, data in events:
+        await clock.wait_until(time_ms)
+        second = time_ms // 1000
+        if on_second and last_second is not None and second > last_second:
+            await on_second(second)
+        last_second = second if last_second is None else max(second, last_second)
+
+        await manager.dispatch(frame(stream, data), time_ms / 1000)
+        count += 1
+        if count % 1000 == 0:
+            await asyncio.sleep(0)  # let the sink and other tasks run
+    return count, clock.now_ms
+
+async def serve_events(events, port, speed=None, done=None):
+    """Local stand-in for fstream.binance.com that plays the events to one client.
+    `done` (a future) gets the number of frames sent once they all are."""
+    events = list(events)
+
+    async def handler(websocket):
+        wanted = set(websocket.request.path.split('streams=', 1)[-1].split('/'))
+        clock = SimClock(speed)
+        sent = 0
+        for time_ms, stream, data in events:
+            if stream in wanted:
+                await clock.wait_until(time_ms)
+                await websocket.send(frame(stream, data))
+                sent += 1
+        if done:
+            done.set_result(sent)
+        await websocket.wait_closed()
+
+    return await serve(handler, 'localhost', port)
+
+class SecondTicker:
+    """manager.on_event for the websocket path: calls on_second whenever a frame's event
+    time enters a new second, before its handlers run, as replay_in_process does. The
+    event time comes from the payload the manager already decoded."""
+    def __init__(self, on_second):
+        self.on_second = on_second
+        self.last_second = None
+
+    async def __call__(self, event_time):
+        second = event_time // 1000
+        if self.last_second is not None and second > self.last_second:
+            await self.on_second(second)
+        self.last_second = second if self.last_second is None else max(second, self.last_second)
+
+async def main(speed=None, mode='inprocess', record=False, port=8799, funding_date=None, funding_tz='UTC'):
+    sink = CsvSink() if record else None
+    manager = ingest.build_manager(sink)
+    aggregator = huge_trades.trade_aggregator
+
+    async def tick(second):
+        await aggregator.check_and_print_trades(now_second=second)
+        await liquidation_cascades.check_cascades(now_second=second)
+
+    sink_task = asyncio.create_task(sink.run()) if sink else None
+    start = time.perf_counter()
+    if mode == 'websocket':
+        events = list(recorded_events(funding_date=funding_date, funding_tz=funding_tz))
+        done = asyncio.get_running_loop().create_future()
+        server = await serve_events(events, port, speed, done)
+        manager.base_url = f'ws://localhost:{port}'
+        manager.on_event = SecondTicker(tick)
+        consumer = asyncio.create_task(manager.run())
+        if events:
+            sent = await done
+            while manager.dispatched < sent and not consumer.done():  # let the last frames drain
+                await asyncio.sleep(0.05)
+        consumer.cancel()
+        server.close()
+        count, last_ms = len(events), events[-1][0] if events else None
+    else:
+        events = recorded_events(funding_date=funding_date, funding_tz=funding_tz)
+        count, last_ms = await replay_in_process(events, manager, speed, on_second=tick)
+    elapsed = time.perf_counter() - start
+    if last_ms is not None:  # None: no recordings, nothing to close
+        await tick(last_ms // 1000 + aggregator.close_delay + 1)  # close the final seconds
+        await liquidation_cascades.check_cascades(now_second=last_ms // 1000 + liquidation_cascades.cascade_detector.detect_window)
+
+    if sink_task:
+        sink_task.cancel()
+        await asyncio.gather(sink_task, return_exceptions=True)
+    return count, elapsed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Replay live_data_csv recordings through the stream handlers')
+    parser.add_argument('--speed', default='max', help="replay speed multiplier, or 'max' (default)")
+    parser.add_argument('--mode', choices=['inprocess', 'websocket'], default='inprocess')
+    parser.add_argument('--record', action='store_true', help='also append to the csv files')
+    parser.add_argument('--quiet', action='store_true', help='hide alert prints, report throughput only')
+    parser.add_argument('--funding-date', help='YYYY-MM-DD the old *_funding.csv recordings start on (they only store HH:MM:SS)')
+    parser.add_argument('--funding-tz', default='UTC', help='timezone the funding recorder ran in')
+    args = parser.parse_args()
+    speed = None if args.speed == 'max' else float(args.speed)
+
+    quiet = contextlib.redirect_stdout(open(os.devnull, 'w')) if args.quiet else contextlib.nullcontext()
+    with quiet:
+        count, elapsed = asyncio.run(main(speed, args.mode, args.record, funding_date=args.funding_date, funding_tz=args.funding_tz))
+    print(f"✅ Replayed {count:,} messages in {elapsed:.2f}s ({count / elapsed:,.0f} msg/s)")
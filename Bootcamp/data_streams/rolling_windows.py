@@ -0,0 +1,109 @@
+'''
+Per-second ring buffer with running sums over several windows at once
+
+One RollingSeconds per symbol keeps `channels` values (e.g. buy and sell notional)
+for each epoch second in a fixed-size ring, plus a running sum of every channel
+over each window (e.g. the last 1, 5 and 60 seconds).
+
+Adding a value updates every window in one pass. Moving time forward only touches
+the seconds that fall out of a window, so the cost is O(expired), never O(buckets).
+'''
+from array import array
+
+class RollingSeconds:
+    def __init__(self, channels, windows, size=None):
+        self.channels = channels
+        self.windows = sorted(windows)
+        self.size = size or 2 * self.windows[-1]  # room for late trades behind the longest window
+        self.values = [array('d', bytes(8 * self.size)) for _ in range(channels)]
+        self.stamps = array('q', [-1]) * self.size  # epoch second held by each slot
+        self.sums = [[0.0] * channels for _ in self.windows]
+        self.head = None  # newest second seen
+
+    def advance(self, second):
+        """Move the newest second forward, dropping seconds that leave each window."""
+        head = self.head
+        if head is None:
+            self.head = second
+            return
+        if second <= head:
+            return
+
+        for sums, window in zip(self.sums, self.windows):
+            # seconds head-window+1 .. min(head, second-window) fall out of this window
+            for old in range(head - window + 1, min(head, second - window) + 1):
+                idx = old % self.size
+                if self.stamps[idx] == old:
+                    for c in range(self.channels):
+                        sums[c] -= self.values[c][idx]
+
+        # recycle the slots for the new seconds (at most one full lap of the ring)
+        for new in range(max(head + 1, second - self.size + 1), second + 1):
+            idx = new % self.size
+            self.stamps[idx] = new
+            for c in range(self.channels):
+                self.values[c][idx] = 0.0
+
+        self.head = second
+
+    def add(self, second, *values):
+        """Add values to a second's bucket. Returns False if it is older than the ring."""
+        if self.head is None or second > self.head:
+            self.advance(second)
+        head = self.head
+        if second <= head - self.size:
+            return False
+
+        idx = second % self.size
+        if self.stamps[idx] != second:
+            self.stamps[idx] = second
+            for c in range(self.channels):
+                self.values[c][idx] = 0.0
+
+        for c, value in enumerate(values):
+            self.values[c][idx] += value
+        for sums, window in zip(self.sums, self.windows):
+            if second > head - window:
+                for c, value in enumerate(values):
+                    sums[c] += value
+        return True
+
+    def bucket(self, second):
+        """Channel values for one second, or None once it has left the ring."""
+        idx = second % self.size
+        if self.stamps[idx] != second:
+            return None
+        return tuple(self.values[c][idx] for c in range(self.channels))
+
+    def window(self, window):
+        """Running channel sums over the last `window` seconds ending at head."""
+        # channels are non-negative (notional, counts) - clamp float dust from add/subtract
+        return tuple(max(total, 0.0) for total in self.sums[self.windows.index(window)])
+
+    def window_ending(self, window, second):
+        """
+        Channel sums over the `window` seconds ending at `second` instead of at head, from
+        the running sums: the seconds that range leaves out are taken off, the ones it adds
+        put on. O(|head - second|), capped at the window length.
+        """
+        if self.head is None:
+            return (0.0,) * self.channels
+        head = self.head
+        totals = list(self.sums[self.windows.index(window)])
+        dropped = list(range(head - window + 1, min(head, second - window) + 1)) + \
+            list(range(max(head - window, second) + 1, head + 1))
+        # seconds after head have no values yet, only the older ones can be added
+        added = range(second - window + 1, min(second, head - window) + 1)
+        for seconds, sign in ((dropped, -1), (added, 1)):
+            for old in seconds:
+                values = self.bucket(old)
+                if values is not None:
+                    for c in range(self.channels):
+                        totals[c] += sign * values[c]
+        return tuple(max(total, 0.0) for total in totals)
+
+    def all_windows(self, second=None):
+        """{window: channel sums} ending at head, or at `second` if given."""
+        if second is None:
+            return {window: self.window(window) for window in self.windows}
+        return {window: self.window_ending(window, second) for window in self.windows}
@@ -0,0 +1,228 @@
+'''
+Lock-free shared-memory ring buffers for cross-process market events
+
+The ingestion daemon writes every trade (and liquidation) into a fixed-size ring in
+multiprocessing.shared_memory. Any number of other processes attach by name and
+tail it at their own pace - no websocket, no socket hop, no locks.
+
+Memory layout (little endian):
+
+    header   8 x int64: magic, version, layout id, capacity, record size,
+                        write sequence, closed flag, reserved
+    records  capacity x fixed-size record, the first field is always its int64 seq
+
+trades record (64 bytes):
+    seq, event_time, trade_time, agg_trade_id (int64), price, quantity (float64),
+    is_buyer_maker (bool), symbol (15 bytes, ascii)
+
+liquidations record (72 bytes):
+    seq, event_time, trade_time (int64), price, average_price, filled_quantity
+    (float64), side (4 bytes), symbol (20 bytes)
+
+There is one writer. Record n goes to slot n % capacity: the writer marks the slot's
+seq -1, writes the record, stores seq = n and then bumps the write sequence. A reader
+copies a batch, then checks that the seq in the copy and the seq still in the ring
+both equal the one it expected (a seqlock), so a record the writer overwrote during
+the copy is never handed out.
+
+A reader that falls more than `capacity` records behind is overrun: it skips ahead
+to the oldest record still in the ring and the skipped records are added to
+reader.missed.
+
+    reader = SharedRingReader('bootcamp_trades')
+    for batch in reader.follow():
+        ...  # numpy structured array, batch['price'], batch['symbol'] ...
+
+    python shared_ring.py [trades|liquidations]   # tail a ring, print rate and latency
+'''
+import struct
+import sys
+import time
+from multiprocessing import shared_memory, resource_tracker
+import numpy as np
+
+MAGIC = 0x474E4952504D4342  # 'BCMPRING'
+VERSION = 1
+HEADER = struct.Struct('<8q')
+MAGIC_AT, VERSION_AT, LAYOUT_AT, CAPACITY_AT, RECORD_SIZE_AT, WRITE_SEQ_AT, CLOSED_AT = range(7)
+SEQ = struct.Struct('<q')
+INT64 = struct.Struct('<q')
+
+# layout name -> (layout id, [(field, struct code)]), seq first
+LAYOUTS = {
+    'trades': (1, [
+        ('seq', 'q'), ('event_time', 'q'), ('trade_time', 'q'), ('agg_trade_id', 'q'),
+        ('price', 'd'), ('quantity', 'd'), ('is_buyer_maker', '?'), ('symbol', '15s'),
+    ]),
+    'liquidations': (2, [
+        ('seq', 'q'), ('event_time', 'q'), ('trade_time', 'q'),
+        ('price', 'd'), ('average_price', 'd'), ('filled_quantity', 'd'), ('side', '4s'), ('symbol', '20s'),
+    ]),
+}
+LAYOUT_NAMES = {layout_id: name for name, (layout_id, _) in LAYOUTS.items()}
+RING_NAMES = {'trades': 'bootcamp_trades', 'liquidations': 'bootcamp_liquidations'}
+
+NUMPY_CODES = {'q': '<i8', 'd': '<f8', '?': '?'}
+
+def record_struct(layout):
+    return struct.Struct('<' + ''.join(code for _, code in LAYOUTS[layout][1]))
+
+def record_dtype(layout):
+    return np.dtype([(name, NUMPY_CODES.get(code, 'S' + code[:-1])) for name, code in LAYOUTS[layout][1]])
+
+def attach(name):
+    """Open an existing segment without letting this process's resource tracker unlink it at exit."""
+    try:
+        return shared_memory.SharedMemory(name, track=False)
+    except TypeError:  # Python < 3.13
+        shm = shared_memory.SharedMemory(name)
+        try:
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        except Exception:
+            pass
+        return shm
+
+class SharedRingWriter:
+    def __init__(self, layout='trades', name=None, capacity=1 << 16):
+        self.layout = layout
+        self.name = name or RING_NAMES[layout]
+        self.capacity = capacity
+        self.record = record_struct(layout)
+        size = HEADER.size + capacity * self.record.size
+        try:
+            self.shm = shared_memory.SharedMemory(self.name, create=True, size=size)
+        except FileExistsError:
+            # left behind by a daemon that didn't shut down cleanly
+            stale = shared_memory.SharedMemory(self.name)
+            stale.close()
+            stale.unlink()
+            self.shm = shared_memory.SharedMemory(self.name, create=True, size=size)
+        self.buf = self.shm.buf
+        self.seq = 0
+        self.symbols = {}  # symbol -> encoded bytes
+
+        records = np.ndarray(capacity, record_dtype(layout), self.buf, HEADER.size)
+        records['seq'] = -1
+        del records  # no exported views may outlive close()
+        HEADER.pack_into(self.buf, 0, MAGIC, VERSION, LAYOUTS[layout][0], capacity, self.record.size, 0, 0, 0)
+
+    def append(self, *fields):
+        """Write one record (every field but seq, in layout order)."""
+        seq = self.seq
+        offset = HEADER.size + (seq % self.capacity) * self.record.size
+        self.record.pack_into(self.buf, offset, -1, *fields)
+        SEQ.pack_into(self.buf, offset, seq)
+        self.seq = seq + 1
+        INT64.pack_into(self.buf, WRITE_SEQ_AT * 8, self.seq)
+
+    def encoded(self, symbol):
+        value = self.symbols.get(symbol)
+        if value is None:
+            value = self.symbols[symbol] = symbol.encode()
+        return value
+
+    def publish_trade(self, trade):
+        """EventBus 'trade' subscriber."""
+        self.append(trade.event_time, trade.trade_time, trade.agg_trade_id, trade.price, trade.quantity,
+                    trade.is_buyer_maker, self.encoded(trade.symbol))
+
+    def publish_liquidation(self, liq):
+        """EventBus 'liquidation' subscriber."""
+        self.append(liq.event_time, liq.trade_time, liq.price, liq.average_price, liq.filled_quantity,
+                    self.encoded(liq.side), self.encoded(liq.symbol))
+
+    def close(self, unlink=True):
+        INT64.pack_into(self.buf, CLOSED_AT * 8, 1)  # tells readers the writer is gone
+        self.buf = None
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+class SharedRingReader:
+    def __init__(self, name='bootcamp_trades', start='latest'):
+        """start: 'latest' only sees new records, 'oldest' begins with everything still in the ring."""
+        self.shm = attach(name)
+        magic, version, layout_id, capacity, record_size, write_seq, _, _ = HEADER.unpack_from(self.shm.buf, 0)
+        if magic != MAGIC or version != VERSION:
+            self.shm.close()
+            raise ValueError(f"{name} is not a version {VERSION} shared ring")
+        self.layout = LAYOUT_NAMES[layout_id]
+        self.capacity = capacity
+        self.dtype = record_dtype(self.layout)
+        if self.dtype.itemsize != record_size:
+            self.shm.close()
+            raise ValueError(f"{name} record size {record_size} != {self.dtype.itemsize} for {self.layout}")
+        self.header = np.ndarray(HEADER.size // 8, '<i8', self.shm.buf)
+        self.records = np.ndarray(capacity, self.dtype, self.shm.buf, HEADER.size)
+        self.seqs = self.records['seq']
+        self.next_seq = write_seq if start == 'latest' else max(0, write_seq - capacity)
+        self.missed = 0
+
+    @property
+    def closed(self):
+        return bool(self.header[CLOSED_AT])
+
+    def lag(self):
+        """Records written that this reader hasn't read yet."""
+        return int(self.header[WRITE_SEQ_AT]) - self.next_seq
+
+    def read(self, max_records=4096):
+        """Copy out the next records (at most max_records) as a structured array, possibly empty."""
+        head = int(self.header[WRITE_SEQ_AT])
+        if head - self.next_seq > self.capacity:
+            # overrun: the writer has lapped us, skip to the oldest record still there
+            self.missed += head - self.capacity - self.next_seq
+            self.next_seq = head - self.capacity
+        end = min(head, self.next_seq + max_records)
+        if end <= self.next_seq:
+            return self.records[:0].copy()
+
+        expected = np.arange(self.next_seq, end)
+        slots = expected % self.capacity
+        batch = self.records[slots]  # fancy indexing copies
+        valid = (batch['seq'] == expected) & (self.seqs[slots] == expected)
+        if not valid.all():
+            # the writer overwrote the oldest part of the batch while we copied it
+            torn = int(np.flatnonzero(~valid)[-1]) + 1
+            self.missed += torn
+            batch = batch[torn:]
+        self.next_seq = end
+        return batch
+
+    def follow(self, idle_sleep=0.0005, max_records=4096):
+        """Yield non-empty batches as they arrive until the writer closes the ring."""
+        while True:
+            batch = self.read(max_records)
+            if len(batch):
+                yield batch
+            elif self.closed:
+                return
+            else:
+                time.sleep(idle_sleep)
+
+    def close(self):
+        self.header = self.records = self.seqs = None
+        self.shm.close()
+
+def tail(layout='trades', report_every=5):
+    reader = SharedRingReader(RING_NAMES[layout])
+    print(f"📡 Tailing {reader.layout} ring ({reader.capacity:,} records)")
+    count, latency_sum, last_report = 0, 0.0, time.monotonic()
+    try:
+        for batch in reader.follow():
+            count += len(batch)
+            latency_sum += float(np.sum(time.time() * 1000 - batch['event_time']))
+            if time.monotonic() - last_report >= report_every:
+                elapsed = time.monotonic() - last_report
+                print(f"{count / elapsed:,.0f} records/s  avg exchange-to-reader {latency_sum / count:.1f}ms  "
+                      f"lag {reader.lag()}  missed {reader.missed}")
+                count, latency_sum, last_report = 0, 0.0, time.monotonic()
+        print("✅ Writer closed the ring.")
+    finally:
+        reader.close()
+
+if __name__ == "__main__":
+    try:
+        tail(sys.argv[1] if len(sys.argv) > 1 else 'trades')
+    except KeyboardInterrupt:
+        print("\n🛑 Stopped.")
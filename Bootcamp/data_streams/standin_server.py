@@ -0,0 +1,285 @@
+'''
+Local high-rate stand-in for wss://fstream.binance.com
+
+Serves synthetic frames in the exact Binance payload shapes, either combined
+(/stream?streams=btcusdt@aggTrade/!forceOrder@arr/...) or raw (/ws/btcusdt@aggTrade):
+
+    <symbol>@aggTrade   - at --rate messages/s shared by all subscribed symbols
+    !forceOrder@arr     - --liq-rate messages/s (scaled with bursts too)
+    <symbol>@markPrice  - once a second per symbol
+    !markPrice@arr      - once a second, every symbol in one array
+
+Profiles:
+    steady - constant rate
+    burst  - rate x --burst-factor for --burst-length seconds every --burst-every seconds
+    ramp   - from 0 up to --rate over --ramp-seconds, then steady (find where a consumer saturates)
+
+Each frame's E/T is the time it was *scheduled*, so when a consumer can't keep up and
+the socket pushes back, the backlog shows up as exchange->receive latency on the client.
+
+--disconnect-every N closes each connection every N seconds. Aggregate trade IDs keep
+counting while the client is away, so the reconnect leaves a real gap in `a`.
+
+Plain HTTP GETs on the same port get the REST aggTrades endpoint
+(/fapi/v1/aggTrades?symbol=BTCUSDT&fromId=..&limit=..). It returns the recently sent
+trades as they were sent, and makes up the ones skipped during a disconnect the same
+way every time, so a gap can be backfilled (point BINANCE_REST_BASE at
+http://localhost:8765, see trade_gaps.py). The gap after a reconnect is sized from
+when that same set of streams was last sent, so other connections staying up don't
+hide it. Trade IDs and the trades sent live in each server process, so with
+--processes the REST endpoint answers 503 and --disconnect-every is refused: a
+reconnect or a backfill could land on a worker that never saw those IDs.
+
+One connection tops out around 50-60k frames/s (websocket framing in Python). For more,
+split the streams over several connections and serve them from --processes N
+(SO_REUSEPORT, Linux/macOS) - the rate applies to each connection.
+
+Point the recorders at it with BINANCE_WS_BASE=ws://localhost:8765
+'''
+import argparse
+import asyncio
+import http
+import json
+import multiprocessing
+import random
+import signal
+import sys
+import time
+import urllib.parse
+from collections import deque
+from websockets.asyncio.server import serve
+from websockets.datastructures import Headers
+from websockets.http11 import Response
+
+START_PRICES = {'btcusdt': 96000.0, 'ethusdt': 2600.0, 'solusdt': 200.0, 'bnbusdt': 600.0,
+                'dogeusdt': 0.25, 'wifusdt': 0.65}
+
+class StandInServer:
+    def __init__(self, rate=1000, profile='steady', liq_rate=5, burst_factor=10, burst_every=30,
+                 burst_length=5, ramp_seconds=60, disconnect_every=None, seed=1, history=100000, rest=True):
+        self.rate = rate
+        self.profile = profile
+        self.liq_rate = liq_rate
+        self.burst_factor = burst_factor
+        self.burst_every = burst_every
+        self.burst_length = burst_length
+        self.ramp_seconds = ramp_seconds
+        self.disconnect_every = disconnect_every
+        self.random = random.Random(seed)
+        self.started = time.time()
+        self.prices = {}
+        self.agg_ids = {}  # symbol -> next aggregate trade id, shared by all connections
+        self.history = history
+        self.sent_trades = {}  # symbol -> {agg id: REST row} of the last `history` trades sent
+        self.sent_order = {}   # symbol -> deque of those ids, oldest first
+        self.skipped = {}      # symbol -> [(first id, last id, from ms, to ms)] skipped while disconnected
+        self.funding_rates = {}
+        self.rest = rest  # serve /fapi/v1/aggTrades (needs the one process that has the trades)
+        self.sent = 0
+        self.last_send = {}  # stream set -> when a connection for it last sent, to size the gap after a reconnect
+
+    def rate_multiplier(self, now):
+        elapsed = now - self.started
+        if self.profile == 'burst':
+            return self.burst_factor if elapsed % self.burst_every < self.burst_length else 1
+        if self.profile == 'ramp':
+            return min(max(elapsed / self.ramp_seconds, 0.001), 1)
+        return 1
+
+    def agg_trade(self, symbol, time_ms):
+        price = self.prices.get(symbol) or START_PRICES.get(symbol, 10.0)
+        price = self.prices[symbol] = price * (1 + self.random.gauss(0, 0.0001))
+        agg_id = self.agg_ids.get(symbol, 1000000)
+        self.agg_ids[symbol] = agg_id + 1
+        quantity = self.random.expovariate(1) * 50000 / price
+        trade_id = agg_id * 3
+        is_buyer_maker = self.random.random() < 0.5
+        self.remember(symbol, {'a': agg_id, 'p': '%.8g' % price, 'q': '%.6g' % quantity,
+                               'f': trade_id, 'l': trade_id + 2, 'T': time_ms - 1, 'm': is_buyer_maker})
+        return ('{"stream":"%s@aggTrade","data":{"e":"aggTrade","E":%d,"s":"%s","a":%d,"p":"%.8g","q":"%.6g",'
+                '"f":%d,"l":%d,"T":%d,"m":%s}}' % (
+                    symbol, time_ms, symbol.upper(), agg_id, price, quantity, trade_id, trade_id + 2,
+                    time_ms - 1, 'true' if is_buyer_maker else 'false'))
+
+    def remember(self, symbol, row):
+        sent = self.sent_trades.setdefault(symbol, {})
+        order = self.sent_order.setdefault(symbol, deque())
+        sent[row['a']] = row
+        order.append(row['a'])
+        if len(order) > self.history:
+            del sent[order.popleft()]
+
+    def skipped_trade(self, symbol, agg_id, first_id, last_id, from_ms, to_ms):
+        """The same made-up trade for a skipped id every time it is asked for."""
+        rng = random.Random(f"{symbol}{agg_id}")
+        price = (self.prices.get(symbol) or START_PRICES.get(symbol, 10.0)) * (1 + rng.gauss(0, 0.001))
+        time_ms = from_ms + (to_ms - from_ms) * (agg_id - first_id) // max(last_id - first_id, 1)
+        trade_id = agg_id * 3
+        return {'a': agg_id, 'p': '%.8g' % price, 'q': '%.6g' % (rng.expovariate(1) * 50000 / price),
+                'f': trade_id, 'l': trade_id + 2, 'T': time_ms, 'm': rng.random() < 0.5}
+
+    def agg_trades(self, symbol, from_id, limit):
+        """REST /fapi/v1/aggTrades rows from from_id on, sent or skipped, in id order."""
+        sent = self.sent_trades.get(symbol, {})
+        end = self.agg_ids.get(symbol, 1000000)
+        rows = []
+        for agg_id in range(from_id, min(from_id + limit, end)):
+            row = sent.get(agg_id)
+            if row is None:
+                for first_id, last_id, from_ms, to_ms in self.skipped.get(symbol, ()):
+                    if first_id <= agg_id <= last_id:
+                        row = self.skipped_trade(symbol, agg_id, first_id, last_id, from_ms, to_ms)
+                        break
+            if row is not None:
+                rows.append(row)
+        return rows
+
+    def process_request(self, connection, request):
+        """Answer plain HTTP GETs with the REST endpoint, let websocket upgrades through."""
+        if request.headers.get('Upgrade', '').lower() == 'websocket':
+            return None
+        url = urllib.parse.urlsplit(request.path)
+        if url.path != '/fapi/v1/aggTrades':
+            return connection.respond(http.HTTPStatus.NOT_FOUND, 'not found\n')
+        if not self.rest:
+            return connection.respond(http.HTTPStatus.SERVICE_UNAVAILABLE,
+                                      'aggTrades needs a single server process (no --processes)\n')
+        query = dict(urllib.parse.parse_qsl(url.query))
+        symbol = query.get('symbol', '').lower()
+        from_id = int(query.get('fromId', self.agg_ids.get(symbol, 1000000) - 1))
+        limit = min(int(query.get('limit', 500)), 1000)
+        body = json.dumps(self.agg_trades(symbol, from_id, limit), separators=(',', ':')).encode()
+        headers = Headers([('Content-Type', 'application/json'), ('Content-Length', str(len(body)))])
+        return Response(200, 'OK', headers, body)
+
+    def force_order(self, symbols, time_ms):
+        symbol = self.random.choice(symbols or list(START_PRICES))
+        price = self.prices.get(symbol) or START_PRICES.get(symbol, 10.0)
+        quantity = self.random.expovariate(1) * 20000 / price
+        side = 'SELL' if self.random.random() < 0.5 else 'BUY'
+        return json.dumps({'stream': '!forceOrder@arr', 'data': {'e': 'forceOrder', 'E': time_ms, 'o': {
+            's': symbol.upper(), 'S': side, 'o': 'LIMIT', 'f': 'IOC', 'q': f'{quantity:.3f}',
+            'p': f'{price:.8g}', 'ap': f'{price:.8g}', 'X': 'FILLED', 'l': f'{quantity:.3f}',
+            'z': f'{quantity:.3f}', 'T': time_ms}}}, separators=(',', ':'))
+
+    def mark_price_data(self, symbol, time_ms):
+        price = self.prices.get(symbol) or START_PRICES.get(symbol, 10.0)
+        # funding rates move in small steps and stay put most seconds, like the real ones
+        rate = self.funding_rates.get(symbol, 0.0001)
+        if self.random.random() < 0.05:
+            rate = self.funding_rates[symbol] = round(rate + self.random.gauss(0, 0.00002), 8)
+        return {'e': 'markPriceUpdate', 'E': time_ms, 's': symbol.upper(), 'p': f'{price:.8g}',
+                'i': f'{price:.8g}', 'P': f'{price:.8g}', 'r': f'{rate:.8f}',
+                'T': (time_ms // 28800000 + 1) * 28800000}
+
+    def mark_price(self, symbol, time_ms):
+        return json.dumps({'stream': f'{symbol}@markPrice', 'data': self.mark_price_data(symbol, time_ms)},
+                          separators=(',', ':'))
+
+    def mark_price_arr(self, symbols, time_ms):
+        return json.dumps({'stream': '!markPrice@arr', 'data': [
+            self.mark_price_data(symbol, time_ms) for symbol in symbols]}, separators=(',', ':'))
+
+    async def handler(self, websocket):
+        path = websocket.request.path
+        streams = path.split('streams=', 1)[1].split('/') if 'streams=' in path else [path.rsplit('/', 1)[-1]]
+        trade_symbols = [s.split('@')[0] for s in streams if s.endswith('@aggTrade')]
+        mark_symbols = [s.split('@')[0] for s in streams if s.endswith('@markPrice')]
+        wants_liqs = '!forceOrder@arr' in streams
+        if '!markPrice@arr' in streams:
+            mark_symbols.append(None)  # None = the whole-market array
+        key = frozenset(streams)
+
+        # trades kept happening while this client was away - skip those ids
+        last_send = self.last_send.get(key)
+        if last_send and trade_symbols:
+            now = time.time()
+            missed = int((now - last_send) * self.rate / len(trade_symbols))
+            for symbol in trade_symbols:
+                if symbol in self.agg_ids and missed:
+                    first_id = self.agg_ids[symbol]
+                    self.skipped.setdefault(symbol, []).append(
+                        (first_id, first_id + missed - 1, int(last_send * 1000), int(now * 1000)))
+                    self.agg_ids[symbol] += missed
+
+        connected = time.time()
+        next_trade = next_liq = next_mark = connected
+        i = 0
+        while True:
+            now = time.time()
+            if self.disconnect_every and now - connected >= self.disconnect_every:
+                self.last_send[key] = now
+                await websocket.close(1001, 'disconnect injection')
+                return
+
+            multiplier = self.rate_multiplier(now)
+            frames = []
+            while trade_symbols and next_trade <= now:
+                frames.append(self.agg_trade(trade_symbols[i % len(trade_symbols)], int(next_trade * 1000)))
+                i += 1
+                next_trade += 1 / (self.rate * multiplier)
+            while wants_liqs and next_liq <= now:
+                frames.append(self.force_order(trade_symbols, int(next_liq * 1000)))
+                next_liq += 1 / (self.liq_rate * multiplier)
+            while mark_symbols and next_mark <= now:
+                frames += [self.mark_price(symbol, int(next_mark * 1000)) if symbol else
+                           self.mark_price_arr(sorted(set(START_PRICES) | set(trade_symbols)), int(next_mark * 1000))
+                           for symbol in mark_symbols]
+                next_mark += 1
+
+            try:
+                for frame in frames:
+                    await websocket.send(frame)  # blocks when the client falls behind
+            except Exception:
+                self.last_send[key] = time.time()
+                return
+            self.sent += len(frames)
+            self.last_send[key] = time.time()
+            await asyncio.sleep(0.005)
+
+    async def run(self, host='localhost', port=8765, reuse_port=False):
+        async with serve(self.handler, host, port, max_queue=None, compression=None, reuse_port=reuse_port,
+                         process_request=self.process_request):
+            await asyncio.Future()
+
+def run_process(server, port):
+    try:
+        asyncio.run(server.run(port=port, reuse_port=True))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Synthetic Binance futures websocket stand-in')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--rate', type=float, default=1000, help='aggTrade messages/s per connection')
+    parser.add_argument('--profile', choices=['steady', 'burst', 'ramp'], default='steady')
+    parser.add_argument('--liq-rate', type=float, default=5, help='forceOrder messages/s')
+    parser.add_argument('--burst-factor', type=float, default=10)
+    parser.add_argument('--burst-every', type=float, default=30)
+    parser.add_argument('--burst-length', type=float, default=5)
+    parser.add_argument('--ramp-seconds', type=float, default=60)
+    parser.add_argument('--disconnect-every', type=float, default=None, help='close connections every N seconds')
+    parser.add_argument('--processes', type=int, default=1, help='server processes sharing the port')
+    args = parser.parse_args()
+    if args.processes > 1 and args.disconnect_every:
+        parser.error('--disconnect-every needs a single process: a reconnect may land on a worker with other trade IDs')
+
+    server = StandInServer(args.rate, args.profile, args.liq_rate, args.burst_factor, args.burst_every,
+                           args.burst_length, args.ramp_seconds, args.disconnect_every, rest=args.processes == 1)
+    print(f"🚀 Binance stand-in on ws://localhost:{args.port} ({args.rate:,.0f} msg/s per connection, {args.profile})")
+    if args.processes > 1:
+        workers = [multiprocessing.Process(target=run_process, args=(server, args.port), daemon=True)
+                   for _ in range(args.processes)]
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))  # daemon workers go down with us
+        for worker in workers:
+            worker.start()
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            print("\n🛑 Stopped.")
+    else:
+        try:
+            asyncio.run(server.run(port=args.port))
+        except KeyboardInterrupt:
+            print(f"\n🛑 Stopped after {server.sent:,} frames.")
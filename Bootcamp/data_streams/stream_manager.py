@@ -0,0 +1,114 @@
+'''
+Combined-stream connection manager for the Binance futures websockets
+
+Instead of one socket per symbol, every stream (btcusdt@aggTrade, ethusdt@markPrice,
+!forceOrder@arr ...) is subscribed over a single combined-stream socket
+(wss://fstream.binance.com/stream?streams=a/b/c). Binance caps a connection at 200
+streams, so the manager only opens another socket when that limit is hit.
+
+Every combined message looks like {"stream": "btcusdt@aggTrade", "data": {...}}. It is
+decoded once (see decoders.py) and the typed payload is routed to every handler
+registered for that stream name.
+
+Point BINANCE_WS_BASE at a local stand-in server to run without Binance.
+'''
+import asyncio
+import os
+import time
+from websockets import connect
+from decoders import decode_frame
+from metrics import metrics, decoded_at
+
+websocket_url_base = os.environ.get('BINANCE_WS_BASE', 'wss://fstream.binance.com')
+MAX_STREAMS_PER_CONNECTION = 200  # Binance futures limit per connection
+RECONNECT_DELAY = 5
+
+def event_time_of(payload):
+    """Exchange event time (epoch ms) of a decoded payload, if it has one."""
+    if isinstance(payload, list):
+        payload = payload[0] if payload else None
+    if isinstance(payload, dict):
+        return payload.get('E')
+    return getattr(payload, 'event_time', None)
+
+class CombinedStreamManager:
+    def __init__(self, base_url=websocket_url_base, max_streams=MAX_STREAMS_PER_CONNECTION,
+                 reconnect_delay=RECONNECT_DELAY, on_error=None, on_event=None):
+        self.base_url = base_url.rstrip('/')
+        self.max_streams = max_streams
+        self.reconnect_delay = reconnect_delay
+        self.on_error = on_error
+        self.on_event = on_event  # awaited with each frame's event time (ms) before its handlers run
+        self.dispatched = 0  # frames whose handlers have all run
+        self.handlers = {}  # stream name -> list of handlers
+        self.stream_stats = {}  # stream name -> (messages, exchange_to_receive, receive_to_decoded)
+
+    def subscribe(self, stream, handler):
+        """Register a handler(data) for a stream name, e.g. 'btcusdt@aggTrade'."""
+        self.handlers.setdefault(stream, []).append(handler)
+
+    def connection_urls(self):
+        """Split the subscribed streams into as few combined-stream URLs as the limit allows."""
+        streams = list(self.handlers)
+        chunks = [streams[i:i + self.max_streams] for i in range(0, len(streams), self.max_streams)]
+        return [f"{self.base_url}/stream?streams={'/'.join(chunk)}" for chunk in chunks]
+
+    def stats_for(self, stream):
+        stats = self.stream_stats.get(stream)
+        if stats is None:
+            stats = self.stream_stats[stream] = (
+                metrics.counter('ws_messages_total', stream=stream),
+                metrics.histogram('ws_latency_seconds', stage='exchange_to_receive', stream=stream),
+                metrics.histogram('ws_latency_seconds', stage='receive_to_decoded', stream=stream),
+            )
+        return stats
+
+    async def dispatch(self, message, received=None):
+        """Decode one combined-stream frame and hand the payload to its handlers."""
+        received = received or time.time()
+        stream, payload = decode_frame(message)
+        decoded = time.time()
+        decoded_at.set(decoded)
+
+        messages, exchange_to_receive, receive_to_decoded = self.stats_for(stream)
+        messages.inc()
+        receive_to_decoded.record(decoded - received)
+        event_time = event_time_of(payload)
+        if event_time:
+            exchange_to_receive.record(received - event_time / 1000)
+            if self.on_event:
+                await self.on_event(event_time)
+
+        for handler in self.handlers.get(stream, ()):
+            try:
+                result = handler(payload)
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                self.report_error(stream, e)
+        self.dispatched += 1
+
+    def report_error(self, stream, error):
+        if self.on_error:
+            self.on_error(stream, error)
+        else:
+            print(f"⚠️ Error on {stream}: {error}")
+
+    async def run_connection(self, url, index=0):
+        """Keep one combined socket alive, reconnecting after any failure."""
+        reconnects = metrics.counter('ws_reconnects_total', connection=str(index))
+        while True:
+            try:
+                async with connect(url) as websocket:
+                    async for message in websocket:
+                        await self.dispatch(message, time.time())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.report_error(url, e)
+            reconnects.inc()
+            await asyncio.sleep(self.reconnect_delay)
+
+    async def run(self):
+        """Run every connection until cancelled."""
+        await asyncio.gather(*(self.run_connection(url, i) for i, url in enumerate(self.connection_urls())))
@@ -0,0 +1,151 @@
+'''
+Sortable, paged terminal table redrawn by diff
+
+The curses part of the live dashboards (funding_dashboard.py, ../monitor.py): a
+subclass says what the rows are - rows() and row_cells() - and which columns, title
+and colour pairs it has; this draws them.
+
+Runs as an ordinary asyncio task next to whatever feeds the shared state:
+    - curses is set up and torn down inside the task (no curses.wrapper),
+    - key presses are polled without blocking,
+    - each frame only rewrites the cells whose text or colour changed since the
+      last frame, then sleeps until the next one (fps is configurable).
+
+Keys:
+    s        cycle the sort column
+    r        reverse the sort
+    n/space  next page        p  previous page   (PgDn/PgUp too)
+    q        quit
+'''
+import asyncio
+import curses
+
+HEADER_ROWS = 3
+
+class TableDashboard:
+    title = ''
+    noun = 'rows'
+    columns = []      # (title, width, sort key(key, snapshot)) - sort keys read the snapshot, never the drawn text
+    color_pairs = []  # (foreground, background) of color pair 1, 2, ...
+
+    def __init__(self, fps=4, sort_column=0, reverse=False):
+        self.fps = fps
+        self.sort_column = sort_column
+        self.reverse = reverse
+        self.page = 0
+        self.screen = None
+        self.drawn = {}  # (row, col) -> (text, color pair) currently on screen
+
+    def rows(self):
+        """({key: numeric snapshot} for the rows that have one, [keys still waiting])."""
+        raise NotImplementedError
+
+    def row_cells(self, key):
+        """[(text, color pair)] for one row, from its numeric snapshot."""
+        raise NotImplementedError
+
+    def heading(self, pages, count):
+        return f"{self.title}  page {self.page + 1}/{pages}  {count} {self.noun}"
+
+    def sorted_keys(self):
+        snapshots, waiting = self.rows()
+        sort_key = self.columns[self.sort_column][2]
+        ready = sorted(snapshots, key=lambda key: sort_key(key, snapshots[key]), reverse=self.reverse)
+        return ready + sorted(waiting)
+
+    def frame(self, height, width):
+        """Every cell of the next frame: {(row, col): (text, color pair)}."""
+        per_page = max(height - HEADER_ROWS - 1, 1)
+        keys = self.sorted_keys()
+        pages = max((len(keys) + per_page - 1) // per_page, 1)
+        self.page = min(self.page, pages - 1)
+
+        arrow = '▼' if self.reverse else '▲'
+        cells = {(0, 0): (self.heading(pages, len(keys)), -1)}
+        col = 0
+        for i, (title, col_width, _) in enumerate(self.columns):
+            cells[(2, col)] = ((title + (' ' + arrow if i == self.sort_column else '')).ljust(col_width), -1)
+            col += col_width
+
+        start = self.page * per_page
+        for row, key in enumerate(keys[start:start + per_page], HEADER_ROWS):
+            col = 0
+            for (text, color), (_, col_width, _) in zip(self.row_cells(key), self.columns):
+                cells[(row, col)] = (text, color)
+                col += col_width
+        return {cell: value for cell, value in cells.items() if cell[0] < height - 1 and cell[1] < width}
+
+    def draw(self):
+        """Write only the cells that differ from what is on screen."""
+        height, width = self.screen.getmaxyx()
+        cells = self.frame(height, width)
+        for (row, col), (text, color) in self.drawn.items():
+            if (row, col) not in cells:
+                self.put(row, col, ' ' * len(text), 0, width)
+        for cell, value in cells.items():
+            if self.drawn.get(cell) != value:
+                previous = self.drawn.get(cell, ('', 0))[0]
+                text, color = value
+                attr = curses.A_BOLD if color < 0 else curses.color_pair(color)
+                self.put(cell[0], cell[1], text.ljust(len(previous)), attr, width)
+        self.drawn = cells
+        self.screen.noutrefresh()
+        curses.doupdate()
+
+    def put(self, row, col, text, attr, width):
+        try:
+            self.screen.addnstr(row, col, text, max(width - col - 1, 0), attr)
+        except curses.error:
+            pass  # terminal shrank between getmaxyx and the write
+
+    def handle_key(self, key):
+        """Returns False when the dashboard should close."""
+        if key in (ord('q'), ord('Q')):
+            return False
+        if key == ord('s'):
+            self.sort_column = (self.sort_column + 1) % len(self.columns)
+        elif key == ord('r'):
+            self.reverse = not self.reverse
+        elif key in (ord('n'), ord(' '), curses.KEY_NPAGE):
+            self.page += 1
+        elif key in (ord('p'), curses.KEY_PPAGE):
+            self.page = max(self.page - 1, 0)
+        elif key == curses.KEY_RESIZE:
+            self.screen.clear()
+            self.drawn = {}
+        return True
+
+    def setup(self):
+        self.screen = curses.initscr()
+        curses.noecho()
+        curses.cbreak()
+        self.screen.keypad(True)
+        self.screen.nodelay(True)  # getch() never waits
+        curses.curs_set(0)  # Hide cursor
+
+        curses.start_color()
+        for pair, (foreground, background) in enumerate(self.color_pairs, 1):
+            curses.init_pair(pair, foreground, background)
+        self.screen.clear()
+        self.drawn = {}
+
+    def teardown(self):
+        self.screen.keypad(False)
+        curses.nocbreak()
+        curses.echo()
+        curses.endwin()
+
+    async def run(self):
+        """Draw at `fps` frames per second until 'q' or cancellation."""
+        self.setup()
+        try:
+            while True:
+                key = self.screen.getch()
+                while key != -1:
+                    if not self.handle_key(key):
+                        return
+                    key = self.screen.getch()
+                self.draw()
+                await asyncio.sleep(1 / self.fps)
+        finally:
+            self.teardown()
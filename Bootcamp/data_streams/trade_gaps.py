@@ -0,0 +1,199 @@
+'''
+Sequence-gap detection and REST backfill for the <symbol>@aggTrade streams
+
+Binance numbers aggregate trades per symbol with a consecutive ID (`a`). When the
+combined-stream socket drops and reconnects, the trades in between are never sent,
+which used to leave a hole in the recordings that only a whole-day re-download
+could repair.
+
+AggTradeGapFiller sits between the CombinedStreamManager and the trade consumers
+(recent_trades, huge_trades, order_flow, the event bus). Per symbol it remembers the
+last aggregate ID it handed on and, for every trade:
+
+    a <= last      duplicate (resent after a reconnect, or already backfilled) - dropped
+    a == last + 1  handed on
+    a >  last + 1  gap: the missing IDs last+1 .. a-1 are fetched from the REST
+                   aggTrades endpoint and handed on first, in ID order
+
+While a symbol backfills, its live trades are held and released right after, so
+consumers always see each symbol's trades once and in ID order. Other symbols are
+not held up. IDs the REST endpoint no longer has (or gaps above max_gap) are
+counted as lost and skipped.
+
+REST calls go through a worker thread and a token bucket sized to stay well inside
+Binance's request-weight limit (aggTrades costs 20 per call), and back off on 429/418.
+
+Point BINANCE_REST_BASE at the stand-in server (standin_server.py serves
+/fapi/v1/aggTrades too) to test it without Binance.
+'''
+import asyncio
+import json
+import os
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from decoders import AggTrade
+from metrics import metrics
+
+rest_url_base = os.environ.get('BINANCE_REST_BASE', 'https://fapi.binance.com')
+AGG_TRADES_LIMIT = 1000  # most trades one aggTrades call returns
+AGG_TRADES_WEIGHT = 20
+WEIGHT_PER_MINUTE = 1200  # half of Binance's 2400, leave room for everything else on this IP
+
+class RateLimiter:
+    """Token bucket of request weight, refilled continuously."""
+    def __init__(self, weight_per_minute=WEIGHT_PER_MINUTE):
+        self.rate = weight_per_minute / 60
+        self.capacity = weight_per_minute
+        self.tokens = weight_per_minute
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    async def acquire(self, weight):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if now >= self.blocked_until and self.tokens >= weight:
+                self.tokens -= weight
+                return
+            wait = max(self.blocked_until - now, (weight - self.tokens) / self.rate)
+            await asyncio.sleep(wait)
+
+    def back_off(self, seconds):
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+def agg_trade_from_rest(symbol, d):
+    """REST aggTrades rows carry no event time or symbol; the trade time stands in for E."""
+    return AggTrade(d['T'], symbol, d['a'], float(d['p']), float(d['q']), d['f'], d['l'], d['T'], d['m'])
+
+def fetch_agg_trades(symbol, from_id, limit=AGG_TRADES_LIMIT, base_url=rest_url_base, timeout=10):
+    """GET /fapi/v1/aggTrades from from_id on (blocking). Returns the decoded rows."""
+    query = urllib.parse.urlencode({'symbol': symbol, 'fromId': from_id, 'limit': limit})
+    with urllib.request.urlopen(f"{base_url.rstrip('/')}/fapi/v1/aggTrades?{query}", timeout=timeout) as response:
+        return json.loads(response.read())
+
+class AggTradeGapFiller:
+    def __init__(self, base_url=rest_url_base, limit=AGG_TRADES_LIMIT, max_gap=100000, limiter=None,
+                 retries=3, on_error=None):
+        self.base_url = base_url
+        self.limit = limit
+        self.max_gap = max_gap  # bigger holes are logged as lost, not backfilled live
+        self.limiter = limiter or RateLimiter()
+        self.retries = retries
+        self.on_error = on_error
+        self.handlers = {}  # stream name -> list of handlers, like CombinedStreamManager
+        self.last_ids = {}  # symbol -> last aggregate trade id handed on
+        self.held = {}      # symbol -> live trades that arrived while it backfills
+        self.tasks = {}     # symbol -> running backfill task
+        self.streams = {}   # symbol -> stream name
+        self.gaps = metrics.counter('agg_trade_gaps_total')
+        self.backfilled = metrics.counter('agg_trade_backfilled_total')
+        self.duplicates = metrics.counter('agg_trade_duplicates_total')
+        self.lost = metrics.counter('agg_trade_lost_total')
+
+    def subscribe(self, stream, handler):
+        """Register a handler(trade) for a '<symbol>@aggTrade' stream."""
+        self.handlers.setdefault(stream, []).append(handler)
+
+    def attach(self, manager):
+        """Subscribe the filler itself, once per stream, on a CombinedStreamManager."""
+        for stream in self.handlers:
+            manager.subscribe(stream, self.binance_trade_stream)
+
+    def stream_of(self, symbol):
+        stream = self.streams.get(symbol)
+        if stream is None:
+            stream = self.streams[symbol] = f"{symbol.lower()}@aggTrade"
+        return stream
+
+    async def binance_trade_stream(self, trade):
+        """Handle one decoded AggTrade routed by the combined-stream manager."""
+        symbol = trade.symbol
+        held = self.held.get(symbol)
+        if held is not None:
+            held.append(trade)
+            return
+
+        last = self.last_ids.get(symbol)
+        if last is not None:
+            if trade.agg_trade_id <= last:
+                self.duplicates.inc()
+                return
+            if trade.agg_trade_id > last + 1:
+                self.held[symbol] = [trade]
+                self.tasks[symbol] = asyncio.create_task(self.fill_gap(symbol, last + 1, trade.agg_trade_id - 1))
+                return
+        await self.hand_on(trade)
+
+    async def hand_on(self, trade):
+        self.last_ids[trade.symbol] = trade.agg_trade_id
+        for handler in self.handlers.get(self.stream_of(trade.symbol), ()):
+            try:
+                result = handler(trade)
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                self.report_error(trade.symbol, e)
+
+    async def fill_gap(self, symbol, first_id, last_id):
+        """Backfill first_id..last_id, then release the live trades held meanwhile."""
+        missing = last_id - first_id + 1
+        self.gaps.inc()
+        try:
+            if missing > self.max_gap:
+                print(f"⚠️ {symbol} aggTrade gap {first_id}-{last_id} ({missing:,} trades) too big to backfill live")
+            else:
+                print(f"⚠️ {symbol} aggTrade gap {first_id}-{last_id} ({missing:,} trades), backfilling")
+                async for trade in self.fetch_range(symbol, first_id, last_id):
+                    if trade.agg_trade_id > self.last_ids[symbol]:
+                        self.backfilled.inc()
+                        await self.hand_on(trade)
+        except Exception as e:
+            self.report_error(symbol, e)
+        finally:
+            # whatever the REST endpoint couldn't give us is gone for good
+            lost = last_id - self.last_ids[symbol]
+            if lost > 0:
+                self.lost.inc(lost)
+                self.last_ids[symbol] = last_id
+            held = self.held.pop(symbol)
+            self.tasks.pop(symbol, None)
+            for trade in held:
+                await self.binance_trade_stream(trade)  # may find duplicates, or open a new gap
+
+    async def fetch_range(self, symbol, first_id, last_id):
+        """Yield the REST aggTrades first_id..last_id in ID order, page by page."""
+        from_id = first_id
+        while from_id <= last_id:
+            rows = await self.fetch_page(symbol, from_id, min(self.limit, last_id - from_id + 1))
+            if not rows:
+                return
+            for row in rows:
+                if row['a'] > last_id:
+                    return
+                if row['a'] >= from_id:
+                    yield agg_trade_from_rest(symbol, row)
+            from_id = rows[-1]['a'] + 1
+
+    async def fetch_page(self, symbol, from_id, limit):
+        for attempt in range(self.retries + 1):
+            await self.limiter.acquire(AGG_TRADES_WEIGHT)
+            try:
+                return await asyncio.to_thread(fetch_agg_trades, symbol, from_id, limit, self.base_url)
+            except urllib.error.HTTPError as e:
+                if e.code not in (418, 429) or attempt == self.retries:
+                    raise
+                # rate limited (418 = banned for a while): wait as long as Binance asks
+                self.limiter.back_off(float(e.headers.get('Retry-After') or 60))
+            except (urllib.error.URLError, TimeoutError):
+                if attempt == self.retries:
+                    raise
+                await asyncio.sleep(2 ** attempt)
+
+    def report_error(self, symbol, error):
+        if self.on_error:
+            self.on_error(symbol, error)
+        else:
+            print(f"⚠️ Error on {symbol} aggTrades: {error}")
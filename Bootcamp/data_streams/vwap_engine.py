@@ -0,0 +1,271 @@
+'''
+Anchored VWAP from the <symbol>@aggTrade feed, updated trade by trade
+
+vwap.py's VWAP was a cumulative typical-price x volume over whatever 100 bars
+fetch_ohlcv returned, so its anchor moved every bar and its value depended on the
+fetch limit. Here every anchor is explicit and every trade counts at its own price:
+
+    day              since 00:00 UTC, starts over every day
+    week             since Monday 00:00 UTC
+    anchor:<ms>      since a fixed epoch-ms timestamp (a listing, a news candle ...)
+    rolling:<min>    the last <min> minutes, per-second buckets (rolling_windows.py)
+
+Each (symbol, anchor) keeps three running sums - volume, price x volume and
+price^2 x volume - so a trade is O(1) per anchor and VWAP and its volume-weighted
+standard deviation are read straight off them:
+
+    vwap = sum(p v) / sum(v)        std = sqrt(sum(p^2 v) / sum(v) - vwap^2)
+
+value(symbol, anchor) returns a VWAPValue with the bands at vwap +/- k std for every k in
+`bands`, from memory; ingest.py hosts the engine in-process for bots and
+`python vwap_engine.py` prints a live board.
+
+Started mid-session, the engine would only know the trades since it started. seed()
+fills the past from 1m klines instead: it sets the boundary at the next full minute,
+live trades count from there, and once that minute's kline has closed, everything from
+the anchor start up to the boundary comes from klines, so nothing counts twice or goes
+missing. Kline quote volume is the exact sum(p v) of each minute, so the seeded VWAP is
+exact; the bands only see each minute at its own VWAP (slightly narrow until live
+trades dominate), and a rolling window's trailing edge moves a whole minute at a time
+until it has passed the seeded part. Until the seed lands (about a minute) values cover
+live trades only. Start seed() before trades flow: trades counted before it sets the
+boundary would be counted again by the klines.
+'''
+import asyncio
+import json
+import math
+import time
+import urllib.parse
+import urllib.request
+from collections import namedtuple
+from termcolor import cprint
+from stream_manager import CombinedStreamManager
+from rolling_windows import RollingSeconds
+from trade_gaps import RateLimiter, rest_url_base
+
+# list of symbols you want to track
+symbols = ['btcusdt', 'ethusdt', 'solusdt', 'bnbusdt', 'dogeusdt', 'wifusdt']
+
+DEFAULT_ANCHORS = ('day', 'week', 'rolling:60')
+DAY_MS = 86400000
+WEEK_MS = 7 * DAY_MS
+WEEK_OFFSET_MS = 4 * DAY_MS  # 1970-01-01 was a Thursday, the first Monday is 4 days later
+MINUTE_MS = 60000
+KLINES_LIMIT = 1500
+KLINES_WEIGHT = 10  # weight of a klines call with limit above 1000
+MAX_SEED_MS = 31 * DAY_MS
+KLINE_SETTLE = 2.0  # seconds after a minute ends before its kline is taken as final
+
+VWAPValue = namedtuple('VWAPValue', ['symbol', 'anchor', 'start_ms', 'vwap', 'std', 'volume', 'bands'])
+
+class SessionVWAP:
+    """Sums since a fixed timestamp, or since the start of the current day/week (reset when it ends)."""
+    def __init__(self, start_ms=None, period_ms=None, offset_ms=0):
+        self.period_ms = period_ms
+        self.offset_ms = offset_ms
+        self.start_ms = start_ms
+        self.end_ms = None
+        self.floor_ms = None  # trades before this are covered by the seed
+        self.reset()
+
+    def reset(self):
+        self.volume = self.turnover = self.squares = 0.0
+
+    def roll(self, time_ms):
+        """Start the session time_ms falls in, if the current one has ended."""
+        if self.period_ms and (self.end_ms is None or time_ms >= self.end_ms):
+            start = (time_ms - self.offset_ms) // self.period_ms * self.period_ms + self.offset_ms
+            if start != self.start_ms:
+                self.start_ms, self.end_ms = start, start + self.period_ms
+                self.reset()
+
+    def add(self, time_ms, price, quantity):
+        if self.end_ms is None or time_ms >= self.end_ms:
+            self.roll(time_ms)
+        if time_ms < self.start_ms or (self.floor_ms is not None and time_ms < self.floor_ms):
+            return  # late trade from an older session, or already in the seed
+        self.volume += quantity
+        self.turnover += price * quantity
+        self.squares += price * price * quantity
+
+    def seed_range(self, floor_ms):
+        """Count live trades from floor_ms on; returns the [start, floor_ms) to fill from klines."""
+        self.roll(floor_ms)
+        self.floor_ms = floor_ms
+        return max(self.start_ms, floor_ms - MAX_SEED_MS), floor_ms
+
+    def add_seed(self, start_ms, volume, turnover, squares):
+        if start_ms == self.start_ms or not self.period_ms:  # still the session it was fetched for
+            self.volume += volume
+            self.turnover += turnover
+            self.squares += squares
+
+    def totals(self, now_ms=None):
+        if now_ms is not None:
+            self.roll(now_ms)
+        return self.start_ms, self.volume, self.turnover, self.squares
+
+class RollingVWAP:
+    """Sums over the last `minutes` minutes in per-second buckets (plus a trade count, to tell empty from float dust)."""
+    def __init__(self, minutes):
+        self.window = minutes * 60
+        self.seconds = RollingSeconds(4, [self.window])
+        self.floor_ms = None
+
+    def add(self, time_ms, price, quantity):
+        if self.floor_ms is not None and time_ms < self.floor_ms:
+            return
+        self.seconds.add(time_ms // 1000, quantity, price * quantity, price * price * quantity, 1.0)
+
+    def seed_range(self, floor_ms):
+        self.floor_ms = floor_ms
+        return floor_ms - self.window * 1000, floor_ms
+
+    def add_minute(self, open_ms, volume, turnover, squares):
+        self.seconds.add(open_ms // 1000, volume, turnover, squares, 1.0)
+
+    def totals(self, now_ms=None):
+        if now_ms is not None:
+            self.seconds.advance(now_ms // 1000)
+        head = self.seconds.head
+        start_ms = (head - self.window + 1) * 1000 if head is not None else None
+        volume, turnover, squares, count = self.seconds.window(self.window)
+        if count < 0.5:
+            return start_ms, 0.0, 0.0, 0.0
+        return start_ms, volume, turnover, squares
+
+def make_tracker(anchor):
+    kind, _, param = anchor.partition(':')
+    if kind == 'day':
+        return SessionVWAP(period_ms=DAY_MS)
+    if kind == 'week':
+        return SessionVWAP(period_ms=WEEK_MS, offset_ms=WEEK_OFFSET_MS)
+    if kind == 'anchor':
+        return SessionVWAP(start_ms=int(param))
+    if kind == 'rolling':
+        return RollingVWAP(int(param))
+    raise ValueError(f"unknown VWAP anchor {anchor!r}")
+
+def fetch_klines(symbol, start_ms, end_ms, base_url=rest_url_base, timeout=10):
+    """GET /fapi/v1/klines 1m bars with open time in [start_ms, end_ms) (blocking, one page)."""
+    query = urllib.parse.urlencode({'symbol': symbol, 'interval': '1m', 'startTime': start_ms,
+                                    'endTime': end_ms - 1, 'limit': KLINES_LIMIT})
+    with urllib.request.urlopen(f"{base_url.rstrip('/')}/fapi/v1/klines?{query}", timeout=timeout) as response:
+        return json.loads(response.read())
+
+class VWAPEngine:
+    def __init__(self, anchors=DEFAULT_ANCHORS, bands=(1.0, 2.0), base_url=rest_url_base, limiter=None):
+        self.anchors = tuple(anchors)
+        self.bands = tuple(bands)
+        self.base_url = base_url
+        self.limiter = limiter or RateLimiter()
+        self.symbols = {}  # symbol -> {anchor: SessionVWAP | RollingVWAP}
+
+    def trackers(self, symbol):
+        trackers = self.symbols.get(symbol)
+        if trackers is None:
+            trackers = self.symbols[symbol] = {anchor: make_tracker(anchor) for anchor in self.anchors}
+        return trackers
+
+    def add_anchor(self, symbol, anchor):
+        """Track another anchor for one symbol, from the next trade on (seed() it for the past)."""
+        trackers = self.trackers(symbol)
+        if anchor not in trackers:
+            trackers[anchor] = make_tracker(anchor)
+        return trackers[anchor]
+
+    def add_trade(self, symbol, trade_time, price, quantity):
+        for tracker in self.trackers(symbol).values():
+            tracker.add(trade_time, price, quantity)
+
+    def value(self, symbol, anchor='day', now_ms=None):
+        """VWAPValue for a symbol and anchor, or None before any volume."""
+        trackers = self.symbols.get(symbol)
+        tracker = trackers.get(anchor) if trackers else None
+        if tracker is None:
+            return None
+        start_ms, volume, turnover, squares = tracker.totals(now_ms)
+        if volume <= 0:
+            return None
+        vwap = turnover / volume
+        std = math.sqrt(max(squares / volume - vwap * vwap, 0.0))
+        return VWAPValue(symbol, anchor, start_ms, vwap, std, volume,
+                         tuple((k, vwap - k * std, vwap + k * std) for k in self.bands))
+
+    def values(self, anchor='day', now_ms=None):
+        """{symbol: VWAPValue} for every symbol with volume on `anchor`."""
+        values = {symbol: self.value(symbol, anchor, now_ms) for symbol in self.symbols}
+        return {symbol: value for symbol, value in values.items() if value is not None}
+
+    async def seed(self, symbols, anchors=None, now_ms=None):
+        """Fill each anchor's past from 1m klines (see the module docstring). Returns the symbols that failed."""
+        floor_ms = ((now_ms or int(time.time() * 1000)) // MINUTE_MS + 1) * MINUTE_MS
+        ranges = []
+        for symbol in symbols:
+            trackers = self.trackers(symbol.upper())
+            for anchor in anchors or list(trackers):
+                ranges.append((symbol.upper(), trackers[anchor], trackers[anchor].seed_range(floor_ms)))
+
+        # the minute before the boundary has to close before its kline is final
+        await asyncio.sleep(max(floor_ms / 1000 + KLINE_SETTLE - time.time(), 0))
+        failed = []
+        for symbol, tracker, (start_ms, end_ms) in ranges:
+            if symbol in failed:
+                continue
+            try:
+                await self.seed_tracker(symbol, tracker, start_ms, end_ms)
+            except Exception as e:
+                cprint(f"⚠️ VWAP seed for {symbol} failed, counting from live trades only: {e}", 'yellow')
+                failed.append(symbol)
+        return failed
+
+    async def seed_tracker(self, symbol, tracker, start_ms, end_ms):
+        session = tracker.start_ms if isinstance(tracker, SessionVWAP) else None
+        while start_ms < end_ms:
+            await self.limiter.acquire(KLINES_WEIGHT)
+            klines = await asyncio.to_thread(fetch_klines, symbol, start_ms, end_ms, self.base_url)
+            if not klines:
+                break
+            for kline in klines:
+                open_ms, volume, turnover = int(kline[0]), float(kline[5]), float(kline[7])
+                if open_ms >= end_ms:
+                    break
+                squares = turnover * turnover / volume if volume > 0 else 0.0  # each minute at its own VWAP
+                if session is None:
+                    tracker.add_minute(open_ms, volume, turnover, squares)
+                else:
+                    tracker.add_seed(session, volume, turnover, squares)
+            start_ms = int(klines[-1][0]) + MINUTE_MS
+
+def print_vwaps(engine, now_ms=None):
+    for symbol in sorted(engine.symbols):
+        display_symbol = symbol.replace('USDT', '')
+        parts = []
+        for anchor in engine.anchors:
+            value = engine.value(symbol, anchor, now_ms)
+            if value is None:
+                continue
+            _, low, high = value.bands[0]
+            parts.append(f"{anchor} {value.vwap:,.4g} [{low:,.4g} {high:,.4g}]")
+        if parts:
+            cprint(f"VWAP {display_symbol:<5} " + '  '.join(parts), 'cyan')
+
+vwap_engine = VWAPEngine()
+
+async def binance_trade_stream(trade, engine=vwap_engine):
+    """Handle one decoded AggTrade routed by the combined-stream manager."""
+    engine.add_trade(trade.symbol, trade.trade_time, trade.price, trade.quantity)
+
+async def print_vwaps_every(interval=10, engine=vwap_engine):
+    while True:
+        await asyncio.sleep(interval)
+        print_vwaps(engine, int(time.time() * 1000))
+
+async def main():
+    manager = CombinedStreamManager()
+    for symbol in symbols:
+        manager.subscribe(f"{symbol}@aggTrade", binance_trade_stream)
+    await asyncio.gather(manager.run(), vwap_engine.seed(symbols), print_vwaps_every())
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,81 @@
+'''
+Local fake exchange for OHLCV download tests and benchmarks
+
+Has the one ccxt async call the downloader uses, fetch_ohlcv(symbol, timeframe,
+since, limit), and behaves like a real exchange in the ways that matter for it:
+
+    - every request takes `latency` seconds,
+    - more than `rate` requests per second (burst `burst`) raise RateLimitExceeded,
+    - a `failure_rate` fraction of requests fail with NetworkError,
+    - at most `max_limit` bars per request, none after the last closed bar.
+
+Bars are a pure function of (symbol, timeframe, timestamp), so every fetch of the
+same bar returns the same numbers no matter how the pages are cut.
+'''
+import asyncio
+import math
+import random
+import time
+from ohlcv_downloader import timeframe_to_ms
+
+class RateLimitExceeded(Exception):
+    pass
+
+class NetworkError(Exception):
+    pass
+
+class FakeExchange:
+    def __init__(self, latency=0.05, rate=10, burst=10, failure_rate=0.0, max_limit=300, seed=1, now_ms=None):
+        self.latency = latency
+        self.rate = rate
+        self.burst = burst
+        self.failure_rate = failure_rate
+        self.max_limit = max_limit
+        self.random = random.Random(seed)
+        self.now_ms = now_ms  # fixed "now" for reproducible runs, wall clock otherwise
+        self.rateLimit = 1000 / rate  # ccxt's name: minimum ms between requests
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.requests = 0
+        self.rejected = 0
+        self.id = 'fake'
+
+    def bar(self, symbol, step, timestamp):
+        # a slow wave plus per-bar noise seeded by the bar itself
+        base = 100 + sum(map(ord, symbol))
+        noise = random.Random(f"{symbol}{step}{timestamp}")
+        open_ = base * (1 + 0.2 * math.sin(timestamp / 8.64e8)) * (1 + noise.gauss(0, 0.002))
+        close = open_ * (1 + noise.gauss(0, 0.004))
+        high = max(open_, close) * (1 + abs(noise.gauss(0, 0.002)))
+        low = min(open_, close) * (1 - abs(noise.gauss(0, 0.002)))
+        return [timestamp, open_, high, low, close, noise.expovariate(1) * 1000]
+
+    def take_token(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+    async def fetch_ohlcv(self, symbol, timeframe='1h', since=None, limit=None, params=None):
+        self.requests += 1
+        if not self.take_token():
+            self.rejected += 1
+            raise RateLimitExceeded(f"fake {symbol} {timeframe}: too many requests")
+        await asyncio.sleep(self.latency)
+        if self.random.random() < self.failure_rate:
+            raise NetworkError(f"fake {symbol} {timeframe}: connection reset")
+
+        step = timeframe_to_ms(timeframe)
+        now_ms = self.now_ms or int(time.time() * 1000)
+        last_closed = now_ms // step * step - step
+        limit = min(limit or self.max_limit, self.max_limit)
+        start = (since if since is not None else last_closed - (limit - 1) * step)
+        start = -(-start // step) * step  # first bar at or after since
+        return [self.bar(symbol, step, timestamp)
+                for timestamp in range(start, min(start + limit * step, last_closed + step), step)]
+
+    async def close(self):
+        pass
@@ -0,0 +1,307 @@
+'''
+Vectorized indicators for many symbols and many parameter values at once
+
+Screening used to mean one pandas rolling() call per symbol per lookback. These take a
+price matrix (symbols x time) and a list of parameter values and fill one preallocated
+array laid out symbols x params x time, NaN during each parameter's warm-up:
+
+    closes = price_matrix(store, symbols, length=1000)[1]    # or any (S, T) float array
+    smas = sma(closes, range(5, 105, 5))                     # (S, 20, T)
+    smas[:, 3, -1]                                           # every symbol's last sma20
+
+Every function with a lookback accepts out= (an array of the right shape to fill, or for
+bollinger, macd and stochastic a tuple of them, one per line) and max_bytes, the budget
+for one chunk's temporaries; the symbols are processed in as many chunks as it
+takes to stay under it.
+
+Rolling means (sma, bollinger) come from one cumulative sum per chunk, and rolling
+highs/lows (stochastic) from one table of power-of-two windows. The recursive ones
+(ema, rsi, atr, macd) advance every symbol and every parameter together, one vectorized
+step per bar. Values match TA-Lib and the streaming versions in indicators.py, including
+their seeding. CCI's mean deviation needs every value in the window, so it costs
+O(period) per value and is by far the slowest. SAR, OBV and the cumulative VWAP have
+no lookback to sweep and return symbols x time; SAR steps every symbol together, one
+bar at a time.
+
+Rows must not contain NaNs. Trim the symbols to a common length (price_matrix does).
+'''
+from collections import namedtuple
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+MAX_CHUNK_BYTES = 256 << 20
+
+Bands = namedtuple('Bands', ['upper', 'middle', 'lower'])
+MACDLines = namedtuple('MACDLines', ['macd', 'signal', 'hist'])
+StochLines = namedtuple('StochLines', ['k', 'd'])
+
+def as_matrix(values):
+    values = np.asarray(values, dtype=float)
+    return values[None, :] if values.ndim == 1 else values
+
+def output(out, shape):
+    if out is None:
+        return np.empty(shape)
+    if out.shape != shape:
+        raise ValueError(f"out has shape {out.shape}, expected {shape}")
+    return out
+
+def outputs(out, lines, shape):
+    """A `lines` namedtuple of arrays to fill: the ones given in out, or new ones."""
+    if out is None:
+        return lines(*(np.empty(shape) for _ in lines._fields))
+    if len(out) != len(lines._fields):
+        raise ValueError(f"out has {len(out)} arrays, expected {len(lines._fields)}")
+    return lines(*(output(array, shape) for array in out))
+
+def chunks(symbols, bytes_per_symbol, max_bytes):
+    """Slices of the symbol axis whose temporaries fit in max_bytes."""
+    step = max(1, int(max_bytes // max(bytes_per_symbol, 1)))
+    for start in range(0, symbols, step):
+        yield slice(start, min(start + step, symbols))
+
+def rolling_means(x, periods, out):
+    """out[:, j, :] = rolling mean of x over periods[j] (x: rows x T, centred cumsum for precision)."""
+    rows, length = x.shape
+    origin = x[:, :1]
+    total = np.zeros((rows, length + 1))
+    np.cumsum(x - origin, axis=1, out=total[:, 1:])
+    for j, period in enumerate(periods):
+        o = out[:, j]
+        o[:, :period - 1] = np.nan
+        np.subtract(total[:, period:], total[:, :-period], out=o[:, period - 1:])
+        o[:, period - 1:] /= period
+        o[:, period - 1:] += origin
+
+def rolling_extremes(x, periods, reduce):
+    """
+    {period: rolling reduce (np.maximum/np.minimum) of x over period}, each rows x (T - period + 1),
+    from a table of power-of-two windows: any window is the overlap of two of them.
+    """
+    levels = [x]
+    while 2 ** len(levels) <= max(periods):
+        half = 2 ** (len(levels) - 1)
+        levels.append(reduce(levels[-1][:, :-half], levels[-1][:, half:]))
+    count = x.shape[1]
+    extremes = {}
+    for period in periods:
+        level = period.bit_length() - 1
+        span = period - 2 ** level
+        extremes[period] = reduce(levels[level][:, :count - period + 1], levels[level][:, span:span + count - period + 1])
+    return extremes
+
+def smooth(x, periods, alphas, offsets=None):
+    """
+    Exponential smoothing for every parameter at once, returned as (T, rows, P).
+    x is (T, rows, 1) or (T, rows, P). Parameter j is seeded at offsets[j] + periods[j] - 1
+    with the mean of its first periods[j] values from offsets[j] on, like TA-Lib; one
+    that would be seeded at or beyond the last bar stays NaN.
+    """
+    length, rows = x.shape[:2]
+    count = len(periods)
+    offsets = np.zeros(count, int) if offsets is None else np.asarray(offsets)
+    seeds = offsets + np.asarray(periods) - 1
+    result = np.full((length, rows, count), np.nan)
+    state = np.full((rows, count), np.nan)
+    seeded = {}
+    for j, (period, offset) in enumerate(zip(periods, offsets)):
+        if seeds[j] >= length:
+            continue
+        column = x[:, :, j] if x.shape[2] > 1 else x[:, :, 0]
+        seeded.setdefault(int(seeds[j]), []).append((j, column[offset:offset + period].mean(axis=0)))
+    alphas = np.asarray(alphas, dtype=float)
+    for t in range(int(seeds.min()), length):
+        state += alphas * (x[t] - state)
+        for j, seed in seeded.get(t, ()):
+            state[:, j] = seed
+        result[t] = state
+    return result
+
+def to_output(result, out, shift=0):
+    """Copy a (T', rows, P) smoothing result into out (rows x P x T), `shift` bars in."""
+    out[:, :, :shift] = np.nan
+    out[:, :, shift:] = result.transpose(1, 2, 0)
+
+def sma(close, periods, out=None, max_bytes=MAX_CHUNK_BYTES):
+    close, periods = as_matrix(close), list(periods)
+    symbols, length = close.shape
+    out = output(out, (symbols, len(periods), length))
+    for rows in chunks(symbols, 16 * length, max_bytes):
+        rolling_means(close[rows], periods, out[rows])
+    return out
+
+def ema(close, periods, out=None, max_bytes=MAX_CHUNK_BYTES):
+    close, periods = as_matrix(close), list(periods)
+    symbols, length = close.shape
+    out = output(out, (symbols, len(periods), length))
+    alphas = [2.0 / (period + 1) for period in periods]
+    for rows in chunks(symbols, 8 * length * (len(periods) + 1), max_bytes):
+        to_output(smooth(close[rows].T[:, :, None], periods, alphas), out[rows])
+    return out
+
+def rsi(close, periods, out=None, max_bytes=MAX_CHUNK_BYTES):
+    """Wilder RSI; the first value is at bar `period` (one change per bar)."""
+    close, periods = as_matrix(close), list(periods)
+    symbols, length = close.shape
+    out = output(out, (symbols, len(periods), length))
+    alphas = [1.0 / period for period in periods]
+    for rows in chunks(symbols, 8 * length * (2 * len(periods) + 3), max_bytes):
+        change = np.diff(close[rows], axis=1).T[:, :, None]
+        gains = smooth(np.maximum(change, 0.0), periods, alphas)
+        losses = smooth(np.maximum(-change, 0.0), periods, alphas)
+        total = gains + losses
+        with np.errstate(invalid='ignore', divide='ignore'):
+            values = np.where(total == 0, 0.0, 100.0 * gains / total)
+        to_output(values, out[rows], shift=1)
+    return out
+
+def bollinger(close, periods, nbdev=2.0, out=None, max_bytes=MAX_CHUNK_BYTES):
+    """Bands(upper, middle, lower), each symbols x params x time; population stdev like TA-Lib."""
+    close, periods = as_matrix(close), list(periods)
+    symbols, length = close.shape
+    bands = outputs(out, Bands, (symbols, len(periods), length))
+    for rows in chunks(symbols, 8 * length * (len(periods) + 3), max_bytes):
+        x = close[rows]
+        middle = bands.middle[rows]
+        rolling_means(x, periods, middle)
+        squares = np.empty_like(middle)
+        origin = x[:, :1]
+        rolling_means((x - origin) ** 2, periods, squares)
+        centred = middle - origin[:, None]
+        std = np.sqrt(np.maximum(squares - centred ** 2, 0.0))
+        np.add(middle, nbdev * std, out=bands.upper[rows])
+        np.subtract(middle, nbdev * std, out=bands.lower[rows])
+    return bands
+
+def macd(close, params=((12, 26, 9),), out=None, max_bytes=MAX_CHUNK_BYTES):
+    """
+    MACDLines for each (fast, slow, signal) in params, like TA-Lib: the fast EMA is seeded at
+    the same bar as the slow one and the signal at slow + signal - 2.
+    """
+    close, params = as_matrix(close), [tuple(param) for param in params]
+    symbols, length = close.shape
+    lines = outputs(out, MACDLines, (symbols, len(params), length))
+    fast, slow, signal = (np.array(column) for column in zip(*params))
+    for rows in chunks(symbols, 8 * length * (4 * len(params) + 1), max_bytes):
+        x = close[rows].T[:, :, None]
+        line = smooth(x, fast, 2.0 / (fast + 1), offsets=slow - fast) - smooth(x, slow, 2.0 / (slow + 1))
+        signal_line = smooth(line, signal, 2.0 / (signal + 1), offsets=slow - 1)
+        line[np.isnan(signal_line)] = np.nan
+        to_output(line, lines.macd[rows])
+        to_output(signal_line, lines.signal[rows])
+        np.subtract(lines.macd[rows], lines.signal[rows], out=lines.hist[rows])
+    return lines
+
+def atr(high, low, close, periods, out=None, max_bytes=MAX_CHUNK_BYTES):
+    high, low, close, periods = as_matrix(high), as_matrix(low), as_matrix(close), list(periods)
+    symbols, length = close.shape
+    out = output(out, (symbols, len(periods), length))
+    for rows in chunks(symbols, 8 * length * (len(periods) + 4), max_bytes):
+        last_close = close[rows, :-1]
+        h, l = high[rows, 1:], low[rows, 1:]
+        ranges = np.maximum(h - l, np.maximum(np.abs(h - last_close), np.abs(l - last_close)))
+        to_output(smooth(ranges.T[:, :, None], periods, [1.0 / p for p in periods]), out[rows], shift=1)
+    return out
+
+def stochastic(high, low, close, fastk_periods, slowk=3, slowd=3, out=None, max_bytes=MAX_CHUNK_BYTES):
+    """Slow StochLines(k, d) for each fastk period, SMA smoothing like TA-Lib STOCH."""
+    high, low, close, periods = as_matrix(high), as_matrix(low), as_matrix(close), list(fastk_periods)
+    symbols, length = close.shape
+    lines = outputs(out, StochLines, (symbols, len(periods), length))
+    for line in lines:
+        line.fill(np.nan)
+    levels = max(periods).bit_length()
+    for rows in chunks(symbols, 8 * length * (2 * levels + 8), max_bytes):
+        highs = rolling_extremes(high[rows], periods, np.maximum)
+        lows = rolling_extremes(low[rows], periods, np.minimum)
+        for j, period in enumerate(periods):
+            highest, lowest = highs[period], lows[period]
+            spread = highest - lowest
+            with np.errstate(invalid='ignore', divide='ignore'):
+                fast = np.where(spread == 0, 0.0, 100.0 * (close[rows, period - 1:] - lowest) / spread)
+            k = np.empty((fast.shape[0], 1, fast.shape[1]))
+            rolling_means(fast, [slowk], k)
+            d = np.empty_like(k)
+            first = slowk - 1
+            rolling_means(k[:, 0, first:], [slowd], d[:, :, first:])
+            start = period - 1 + first + slowd - 1
+            lines.k[rows, j, start:] = k[:, 0, first + slowd - 1:]
+            lines.d[rows, j, start:] = d[:, 0, first + slowd - 1:]
+    return lines
+
+def cci(high, low, close, periods, out=None, max_bytes=MAX_CHUNK_BYTES):
+    high, low, close, periods = as_matrix(high), as_matrix(low), as_matrix(close), list(periods)
+    symbols, length = close.shape
+    out = output(out, (symbols, len(periods), length))
+    for rows in chunks(symbols, 8 * length * (max(periods) + len(periods) + 2), max_bytes):
+        typical = (high[rows] + low[rows] + close[rows]) / 3.0
+        means = out[rows]
+        rolling_means(typical, periods, means)
+        for j, period in enumerate(periods):
+            mean = means[:, j, period - 1:]
+            deviation = np.abs(sliding_window_view(typical, period, axis=1) - mean[:, :, None]).mean(axis=2)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                mean[:] = np.where(deviation == 0, 0.0, (typical[:, period - 1:] - mean) / (0.015 * deviation))
+    return out
+
+def obv(close, volume):
+    """On-balance volume, symbols x time, starting from the first bar's volume like TA-Lib."""
+    close, volume = as_matrix(close), as_matrix(volume)
+    out = np.empty(close.shape)
+    np.cumsum(np.sign(np.diff(close, axis=1)) * volume[:, 1:], axis=1, out=out[:, 1:])
+    out[:, 1:] += volume[:, :1]
+    out[:, 0] = volume[:, 0]
+    return out
+
+def vwap(high, low, close, volume):
+    """Cumulative typical-price VWAP since the first bar (vwap.py), symbols x time; NaN before any volume."""
+    high, low, close, volume = as_matrix(high), as_matrix(low), as_matrix(close), as_matrix(volume)
+    total = np.cumsum(volume, axis=1)
+    turnover = np.cumsum(volume * (high + low + close) / 3.0, axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(total == 0, np.nan, turnover / total)
+
+def sar(high, low, acceleration=0.02, maximum=0.2):
+    """
+    Parabolic SAR, symbols x time, the branches of indicators.ParabolicSAR (TA-Lib's) taken
+    for every symbol at once. The first value is at the second bar.
+    """
+    high, low = as_matrix(high), as_matrix(low)
+    symbols, length = high.shape
+    out = np.full((symbols, length), np.nan)
+    if length < 2:
+        return out
+    down, up = low[:, 0] - low[:, 1], high[:, 1] - high[:, 0]
+    is_long = ~((down > 0) & (down > up))
+    sar = np.where(is_long, low[:, 0], high[:, 0])
+    ep = np.where(is_long, high[:, 1], low[:, 1])
+    af = np.full(symbols, float(acceleration))
+    last_high, last_low = high[:, 1], low[:, 1]  # the first bar is its own "last" bar
+    for t in range(1, length):
+        h, l = high[:, t], low[:, t]
+        to_short = is_long & (l <= sar)
+        to_long = ~is_long & (h >= sar)
+        value = np.where(to_short, np.maximum(np.maximum(ep, last_high), h),
+                         np.where(to_long, np.minimum(np.minimum(ep, last_low), l), sar))
+        extended = np.where(is_long, h > ep, l < ep) & ~to_short & ~to_long
+        ep = np.where(to_short, l, np.where(to_long, h, np.where(extended, np.where(is_long, h, l), ep)))
+        af = np.where(to_short | to_long, acceleration, np.where(extended, np.minimum(af + acceleration, maximum), af))
+        is_long = is_long ^ to_short ^ to_long
+        moved = value + af * (ep - value)
+        sar = np.where(is_long, np.minimum(np.minimum(moved, last_low), l), np.maximum(np.maximum(moved, last_high), h))
+        last_high, last_low = h, l
+        out[:, t] = value
+    return out
+
+def price_matrix(store, symbols, column='close', timeframe=None, length=None):
+    """
+    (symbols kept, symbols x length matrix) of the last `length` bars from a bar_store.BarStore;
+    symbols with fewer bars are left out. Without a length, the shortest history sets it.
+    """
+    series = {symbol: getattr(store.bars(symbol, timeframe=timeframe), column) for symbol in symbols}
+    length = length or min((len(values) for values in series.values()), default=0)
+    kept = [symbol for symbol, values in series.items() if len(values) >= length]
+    matrix = np.empty((len(kept), length))
+    for i, symbol in enumerate(kept):
+        matrix[i] = series[symbol][len(series[symbol]) - length:]
+    return kept, matrix
@@ -0,0 +1,181 @@
+'''
+Bar-close-aware indicator cache for the live monitors
+
+The monitors refetched 100 bars of OHLCV and recomputed the whole indicator every
+second, but a closed bar never changes: only the bar still forming does. This keeps,
+per (exchange, symbol, timeframe), the last `history` closed bars and the streaming
+indicator state (indicators.py) as of the last closed bar:
+
+    cache = IndicatorCache(kraken, {'sma20': lambda: SMA(20)})
+    view = cache.get('BTC/USD', '15m', price=mid)    # every second
+    view.values['sma20']    # with the forming bar, like df.iloc[-1] of the old DataFrame
+    view.closed['sma20']    # as of the last closed bar
+
+A cached result is valid for as long as the last closed bar is the same one. In
+between, the forming bar is updated from the price the caller already has (its
+high/low/close; the volume is what the exchange reported at the last fetch) and the
+indicators preview() it - no request at all. When a bar closes (close_delay seconds
+after its end, so the exchange has it) one fetch from the last cached bar on brings in
+what closed since, which update() the indicators, and the new forming bar. On a 15m
+timeframe polled every second that is 1 OHLCV request per 900 calls instead of 900.
+
+Anchored indicators (indicators.VWAP(DAY_MS)) are told each bar's open time and
+start over at their session boundary. For them the first load goes back to the start
+of the current session, a page at a time if `history` bars don't reach it, so the
+value is the same whenever the cache was started.
+
+Entries are least-recently-used: ones unused for `ttl` seconds are dropped, and so is
+the oldest beyond `max_entries`, so dozens of symbols can share one cache. A dropped
+entry is reloaded from scratch on its next use.
+
+Works with sync ccxt (get) and async ccxt (await aget).
+'''
+import time
+from collections import OrderedDict, deque, namedtuple
+from ohlcv_downloader import timeframe_to_ms
+
+IndicatorView = namedtuple('IndicatorView', ['symbol', 'timeframe', 'closed_ms', 'forming', 'closed', 'values', 'bars'])
+
+class Entry:
+    """History and indicator state of one (exchange, symbol, timeframe)."""
+    def __init__(self, factories, history):
+        self.indicators = {name: make() for name, make in factories.items()}
+        self.bars = deque(maxlen=history)  # closed [timestamp, open, high, low, close, volume]
+        self.closed_ms = None              # open time of the last closed bar in the state
+        self.forming = None                # [timestamp, open, high, low, close, volume] still forming
+        self.checked = 0.0                 # when the exchange was last asked
+        self.used = 0.0
+
+    def add_closed(self, bar):
+        timestamp, _, high, low, close, volume = bar
+        for indicator in self.indicators.values():
+            indicator.at(timestamp)
+            indicator.update(high, low, close, volume)
+        self.bars.append(bar)
+        self.closed_ms = timestamp
+
+    def session_start(self, time_ms):
+        """Start of the session an anchored indicator needs history from for time_ms, None if none is anchored."""
+        sessions = [indicator.session_ms for indicator in self.indicators.values() if getattr(indicator, 'session_ms', None)]
+        return min((time_ms // session * session for session in sessions), default=None)
+
+    def tick(self, price, start_ms):
+        """Fold a live price into the forming bar (or open a new one at start_ms)."""
+        forming = self.forming
+        if forming is None or forming[0] < start_ms:
+            self.forming = [start_ms, price, price, price, price, 0.0]
+        else:
+            forming[2] = max(forming[2], price)
+            forming[3] = min(forming[3], price)
+            forming[4] = price
+
+class IndicatorCache:
+    def __init__(self, exchange, factories, history=100, max_entries=256, ttl=3600, close_delay=2.0,
+                 retry=5.0, exchange_id=None, clock=time.time):
+        self.exchange = exchange
+        self.exchange_id = exchange_id or getattr(exchange, 'id', 'exchange')
+        self.factories = factories
+        self.history = history
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.close_delay_ms = int(close_delay * 1000)
+        self.retry = retry  # don't ask again sooner than this when a closed bar hasn't shown up yet
+        self.clock = clock
+        self.entries = OrderedDict()  # (exchange id, symbol, timeframe) -> Entry, least recently used first
+        self.requests = 0
+        self.hits = 0
+        self.evictions = 0
+
+    def entry(self, symbol, timeframe, now):
+        # entries idle for longer than ttl are at the front
+        while self.entries:
+            key, oldest = next(iter(self.entries.items()))
+            if now - oldest.used <= self.ttl:
+                break
+            del self.entries[key]
+            self.evictions += 1
+        key = (self.exchange_id, symbol, timeframe)
+        entry = self.entries.get(key)
+        if entry is None:
+            entry = self.entries[key] = Entry(self.factories, self.history)
+            if len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+        else:
+            self.entries.move_to_end(key)
+        entry.used = now
+        return entry
+
+    def last_closed(self, step, now_ms):
+        """Open time of the last bar the exchange has closed (close_delay after its end)."""
+        return (now_ms - self.close_delay_ms) // step * step - step
+
+    def plan(self, symbol, timeframe):
+        """(entry, step, last closed, fetch kwargs or None if the cached state is current)."""
+        now = self.clock()
+        entry = self.entry(symbol, timeframe, now)
+        step = timeframe_to_ms(timeframe)
+        closed = self.last_closed(step, int(now * 1000))
+        if entry.closed_ms == closed or (entry.closed_ms is not None and now - entry.checked < self.retry):
+            self.hits += 1
+            return entry, step, closed, None
+        entry.checked = now
+        self.requests += 1
+        if entry.closed_ms is None:
+            start = entry.session_start(closed + step)  # the forming bar's session
+            if start is not None and start < closed - self.history * step:
+                return entry, step, closed, {'since': start}
+            return entry, step, closed, {'limit': self.history + 2}
+        return entry, step, closed, {'since': entry.closed_ms + step}
+
+    def next_page(self, entry, step, closed, before):
+        """Fetch kwargs for the next page if the last one got somewhere but stopped short of `closed`."""
+        if entry.closed_ms is None or entry.closed_ms == before or entry.closed_ms >= closed:
+            return None
+        self.requests += 1
+        return {'since': entry.closed_ms + step}
+
+    def apply(self, entry, bars, closed):
+        """Take fetched bars: update() the ones that closed since the state, keep the forming one."""
+        for bar in bars:
+            bar = [int(bar[0])] + [float(value) for value in bar[1:6]]
+            if bar[0] <= closed:
+                if entry.closed_ms is None or bar[0] > entry.closed_ms:
+                    entry.add_closed(bar)
+            elif entry.forming is None or bar[0] >= entry.forming[0]:
+                entry.forming = bar
+
+    def view(self, symbol, timeframe, entry, step, closed, price):
+        if price is not None:
+            entry.tick(price, closed + step)
+        values = closed_values = {name: indicator.value for name, indicator in entry.indicators.items()}
+        forming = entry.forming
+        if forming is not None and forming[0] > (entry.closed_ms if entry.closed_ms is not None else -1):
+            timestamp, _, high, low, close, volume = forming
+            for indicator in entry.indicators.values():
+                indicator.at(timestamp)
+            values = {name: indicator.preview(high, low, close, volume) for name, indicator in entry.indicators.items()}
+        return IndicatorView(symbol, timeframe, entry.closed_ms, forming, closed_values, values, entry.bars)
+
+    def get(self, symbol, timeframe, price=None):
+        """IndicatorView for a symbol, fetching (sync ccxt) only when a bar has closed."""
+        entry, step, closed, fetch = self.plan(symbol, timeframe)
+        while fetch is not None:
+            before = entry.closed_ms
+            self.apply(entry, self.exchange.fetch_ohlcv(symbol, timeframe=timeframe, **fetch), closed)
+            fetch = self.next_page(entry, step, closed, before)
+        return self.view(symbol, timeframe, entry, step, closed, price)
+
+    async def aget(self, symbol, timeframe, price=None):
+        """get() for async ccxt exchanges."""
+        entry, step, closed, fetch = self.plan(symbol, timeframe)
+        while fetch is not None:
+            before = entry.closed_ms
+            self.apply(entry, await self.exchange.fetch_ohlcv(symbol, timeframe=timeframe, **fetch), closed)
+            fetch = self.next_page(entry, step, closed, before)
+        return self.view(symbol, timeframe, entry, step, closed, price)
+
+    def stats(self):
+        calls = self.requests + self.hits
+        return {'entries': len(self.entries), 'calls': calls, 'requests': self.requests,
+                'hit_rate': self.hits / calls if calls else 0.0, 'evictions': self.evictions}
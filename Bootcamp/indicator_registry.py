@@ -0,0 +1,252 @@
+'''
+Indicator registry: every indicator by name, with its parameters and its backends
+
+    from indicator_registry import registry
+    registry.compute('rsi', df)                    # default parameters (period=14)
+    registry.compute('bbands', df, period=50)      # -> Bbands(upper, middle, lower)
+    registry.compute('rsi14', df, backend='ta')    # parameters in the name, one backend
+    registry.stream('macd12_26_9')()               # a streaming indicators.py instance
+
+bars is anything with the input columns by name (a DataFrame, a dict of arrays, a
+BarStore frame); results are NumPy arrays, NaN during warm-up. A name is the
+indicator followed by its parameters in order, '_' between them: sma20, rsi14,
+bbands20_2_2, macd12_26_9, stoch14_3_3, sar0.02_0.2.
+
+An indicator is registered with its input columns and default parameters, and has one
+implementation per backend. A backend is a module imported the first time an
+indicator runs on it - this module itself only needs the standard library:
+
+    numpy    indicator_batch.py, pure NumPy, matches TA-Lib (check_indicators.py)
+    talib    TA-Lib (imports pandas too when it is installed)
+    ta       the `ta` package (rsi.py's RSIIndicator)
+    pandas   the rolling/cumsum expressions of sma.py and vwap.py
+
+compute() takes the first backend in the preference order (INDICATOR_BACKENDS,
+default numpy,talib,ta,pandas) that implements the indicator and imports; one that
+fails to import is skipped from then on. The NumPy versions cover the whole
+ta_review.py set, so TA-Lib, ta and pandas are only imported when a caller asks for
+them or for an indicator only they implement. Backends can disagree during warm-up
+(ta seeds RSI differently from TA-Lib). Plug in more with register() / implement().
+
+registry.import_times has the seconds each backend took to import. For cold starts,
+`python indicator_registry.py` times fresh interpreters: startup, importing this
+module, the first value on every backend and the monitor's imports (for a per-module
+breakdown: python -X importtime -c "import talib").
+'''
+import importlib
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from collections import namedtuple
+
+BACKENDS = {'numpy': 'indicator_batch', 'talib': 'talib', 'ta': 'ta', 'pandas': 'pandas'}
+PREFERENCE = os.getenv('INDICATOR_BACKENDS', 'numpy,talib,ta,pandas').split(',')
+COLD_START_BUDGET = 1.0  # seconds, for a short-lived job's first value
+
+Spec = namedtuple('Spec', ['name', 'inputs', 'params', 'outputs', 'stream', 'backends'])
+
+def series(values):
+    import pandas as pd  # the ta and pandas backends have imported it already
+    return pd.Series(values)
+
+class IndicatorRegistry:
+    def __init__(self, backends=BACKENDS, preference=PREFERENCE):
+        self.backends = dict(backends)  # backend -> module name
+        self.preference = [name.strip() for name in preference if name.strip()]
+        self.specs = {}
+        self.modules = {}       # backend -> imported module, or None if it failed to import
+        self.import_times = {}  # backend -> seconds its import took
+
+    def register(self, name, inputs, params=None, outputs=None, stream=None, backends=None):
+        """
+        Add an indicator: its input columns, {parameter: default} in call order, the names of
+        its outputs if it has several, the indicators.py class streaming it, and
+        {backend: function(module, *inputs, **params)}.
+        """
+        result = namedtuple(name.capitalize(), outputs) if outputs else None
+        self.specs[name] = Spec(name, tuple(inputs), dict(params or {}), result, stream, dict(backends or {}))
+        return self.specs[name]
+
+    def implement(self, name, backend, function):
+        self.specs[name].backends[backend] = function
+
+    def names(self):
+        return list(self.specs)
+
+    def available(self, name):
+        """Backends implementing an indicator, in preference order (nothing is imported)."""
+        spec = self.specs[self.parse(name)[0]]
+        return [backend for backend in self.preference if backend in spec.backends]
+
+    def parse(self, name):
+        """'rsi14' -> ('rsi', {'period': 14}); 'macd12_26_9' fills fast, slow and signal in order."""
+        match = re.fullmatch(r'([a-z]+)([\d._]*)', name.strip().lower())
+        spec = self.specs.get(match.group(1)) if match else None
+        if spec is None:
+            raise ValueError(f"unknown indicator {name!r} (registered: {', '.join(self.specs)})")
+        values = [float(value) if '.' in value else int(value) for value in match.group(2).split('_') if value]
+        if len(values) > len(spec.params):
+            raise ValueError(f"{name!r}: {spec.name} takes {len(spec.params)} parameters ({', '.join(spec.params)})")
+        params = dict(spec.params)
+        params.update(zip(spec.params, values))
+        return spec.name, params
+
+    def resolve(self, name, overrides):
+        kind, params = self.parse(name)
+        unknown = set(overrides) - set(params)
+        if unknown:
+            raise TypeError(f"{kind} has no parameter {', '.join(sorted(unknown))}")
+        params.update(overrides)
+        return self.specs[kind], params
+
+    def load(self, backend):
+        """The backend's module, imported (and timed) on first use; None if it isn't installed."""
+        if backend not in self.modules:
+            start = time.perf_counter()
+            try:
+                self.modules[backend] = importlib.import_module(self.backends[backend])
+            except ImportError:
+                self.modules[backend] = None
+            self.import_times[backend] = time.perf_counter() - start
+        return self.modules[backend]
+
+    def compute(self, name, bars, backend=None, **params):
+        """The indicator over a whole series of bars, on `backend` or the first one available."""
+        spec, params = self.resolve(name, params)
+        for candidate in [backend] if backend else self.preference:
+            function = spec.backends.get(candidate)
+            if function is None:
+                continue
+            module = self.load(candidate)
+            if module is None:
+                continue
+            import numpy as np
+            inputs = [np.ascontiguousarray(bars[column], dtype=float) for column in spec.inputs]
+            result = function(module, *inputs, **params)
+            if spec.outputs:
+                return spec.outputs(*(np.asarray(values, dtype=float) for values in result))
+            return np.asarray(result, dtype=float)
+        if backend:
+            raise ImportError(f"{spec.name} on {backend}: not implemented there or {self.backends.get(backend)} isn't installed")
+        raise ImportError(f"no installed backend implements {spec.name} (tried {', '.join(self.preference)})")
+
+    def stream(self, name, **params):
+        """Factory of the streaming indicators.py version (for IndicatorEngine / IndicatorCache)."""
+        spec, params = self.resolve(name, params)
+        if spec.stream is None:
+            raise ValueError(f"{spec.name} has no streaming version")
+
+        def make():
+            import indicators
+            return getattr(indicators, spec.stream)(*params.values())
+        return make
+
+def bollinger_bands(batch, close, period, devup, devdn):
+    bands = batch.bollinger(close, [period], 1.0)
+    middle = bands.middle[0, 0]
+    std = bands.upper[0, 0] - middle
+    return middle + devup * std, middle, middle - devdn * std
+
+def pandas_vwap(pd, high, low, close, volume):
+    volume = series(volume)
+    return (volume * (series(high) + series(low) + series(close)) / 3).cumsum() / volume.cumsum()
+
+registry = IndicatorRegistry()
+
+# the ta_review.py set, plus vwap.py's cumulative VWAP
+registry.register('sma', ['close'], {'period': 20}, stream='SMA', backends={
+    'numpy': lambda batch, close, period: batch.sma(close, [period])[0, 0],
+    'talib': lambda talib, close, period: talib.SMA(close, timeperiod=period),
+    'pandas': lambda pd, close, period: series(close).rolling(period).mean(),
+})
+registry.register('ema', ['close'], {'period': 10}, stream='EMA', backends={
+    'numpy': lambda batch, close, period: batch.ema(close, [period])[0, 0],
+    'talib': lambda talib, close, period: talib.EMA(close, timeperiod=period),
+})
+registry.register('rsi', ['close'], {'period': 14}, stream='RSI', backends={
+    'numpy': lambda batch, close, period: batch.rsi(close, [period])[0, 0],
+    'talib': lambda talib, close, period: talib.RSI(close, timeperiod=period),
+    'ta': lambda ta, close, period: ta.momentum.RSIIndicator(series(close), window=period).rsi(),
+})
+registry.register('bbands', ['close'], {'period': 20, 'devup': 2.0, 'devdn': 2.0}, ['upper', 'middle', 'lower'],
+                  stream='Bollinger', backends={
+    'numpy': bollinger_bands,
+    'talib': lambda talib, close, period, devup, devdn: talib.BBANDS(close, period, devup, devdn, 0),
+})
+registry.register('macd', ['close'], {'fast': 12, 'slow': 26, 'signal': 9}, ['macd', 'signal', 'hist'],
+                  stream='MACD', backends={
+    'numpy': lambda batch, close, fast, slow, signal: [line[0, 0] for line in batch.macd(close, [(fast, slow, signal)])],
+    'talib': lambda talib, close, fast, slow, signal: talib.MACD(close, fast, slow, signal),
+})
+registry.register('atr', ['high', 'low', 'close'], {'period': 14}, stream='ATR', backends={
+    'numpy': lambda batch, high, low, close, period: batch.atr(high, low, close, [period])[0, 0],
+    'talib': lambda talib, high, low, close, period: talib.ATR(high, low, close, timeperiod=period),
+})
+registry.register('stoch', ['high', 'low', 'close'], {'fastk': 14, 'slowk': 3, 'slowd': 3}, ['k', 'd'],
+                  stream='Stochastic', backends={
+    'numpy': lambda batch, high, low, close, fastk, slowk, slowd:
+        [line[0, 0] for line in batch.stochastic(high, low, close, [fastk], slowk, slowd)],
+    'talib': lambda talib, high, low, close, fastk, slowk, slowd:
+        talib.STOCH(high, low, close, fastk, slowk, 0, slowd, 0),
+})
+registry.register('cci', ['high', 'low', 'close'], {'period': 20}, stream='CCI', backends={
+    'numpy': lambda batch, high, low, close, period: batch.cci(high, low, close, [period])[0, 0],
+    'talib': lambda talib, high, low, close, period: talib.CCI(high, low, close, timeperiod=period),
+})
+registry.register('sar', ['high', 'low'], {'acceleration': 0.02, 'maximum': 0.2}, stream='ParabolicSAR', backends={
+    'numpy': lambda batch, high, low, acceleration, maximum: batch.sar(high, low, acceleration, maximum)[0],
+    'talib': lambda talib, high, low, acceleration, maximum: talib.SAR(high, low, acceleration=acceleration, maximum=maximum),
+})
+registry.register('obv', ['close', 'volume'], stream='OBV', backends={
+    'numpy': lambda batch, close, volume: batch.obv(close, volume)[0],
+    'talib': lambda talib, close, volume: talib.OBV(close, volume),
+})
+registry.register('vwap', ['high', 'low', 'close', 'volume'], stream='VWAP', backends={
+    'numpy': lambda batch, high, low, close, volume: batch.vwap(high, low, close, volume)[0],
+    'pandas': pandas_vwap,
+})
+
+def cold_start(code, repeat=3):
+    """(best wall seconds of a fresh interpreter running code, its last stdout line or error)."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    best, output = float('inf'), ''
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run = subprocess.run([sys.executable, '-c', code], cwd=here, capture_output=True, text=True)
+        best = min(best, time.perf_counter() - start)
+        if run.returncode:
+            return None, (run.stderr.strip().splitlines() or ['failed'])[-1]
+        output = (run.stdout.strip().splitlines() or [''])[-1]
+    return best, output
+
+def profile(budget=COLD_START_BUDGET):
+    """Print cold-start times; True if this module plus a first NumPy value fits in budget."""
+    bars = "bars = {c: [100.0 + i % 7 + (c == 'high') - (c == 'low') for i in range(500)] for c in ('high', 'low', 'close', 'volume')}"
+    scenarios = [('python startup', 'pass'), ('import indicator_registry', 'import indicator_registry')]
+    for backend in registry.backends:
+        name = next((spec.name for spec in registry.specs.values() if backend in spec.backends), None)
+        if name:
+            scenarios.append((f"first {name} on {backend}",
+                              f"import json; from indicator_registry import registry; {bars}; "
+                              f"registry.compute({name!r}, bars, backend={backend!r}); print(json.dumps(registry.import_times))"))
+    scenarios += [('import indicator_cache', 'import indicator_cache'), ('import monitor', 'import monitor')]
+
+    ok = True
+    for title, code in scenarios:
+        seconds, output = cold_start(code)
+        if seconds is None:
+            print(f"⚠️ {title:<26} failed: {output}")
+            continue
+        detail = ''
+        if output.startswith('{'):
+            detail = '  ' + ', '.join(f"{backend} import {took:.3f}s" for backend, took in json.loads(output).items())
+        print(f"{'✅' if seconds < budget else '⚠️'} {title:<26} {seconds:.3f}s{detail}")
+        if title == 'first sma on numpy':
+            ok = seconds < budget
+    return ok
+
+if __name__ == "__main__":
+    sys.exit(0 if profile() else 1)
@@ -0,0 +1,543 @@
+'''
+Streaming technical indicators - seeded once from history, then O(1) per bar
+
+The monitors used to rebuild a DataFrame and rerun rolling()/RSIIndicator/cumsum over
+the last 100 bars every second. These keep their running state instead:
+
+    rsi = RSI(14)
+    rsi.seed(store.bars('BTC/USD'))          # any history with high/low/close/volume columns
+    rsi.update(high, low, close, volume)     # a bar closed: advance the state, return the value
+    rsi.preview(high, low, close, volume)    # the forming bar so far: value if it closed now,
+                                             # state untouched (call it on every tick)
+
+Values are None until an indicator has enough bars. Every indicator matches its TA-Lib
+function (the ta_review.py set, same defaults and the same seeding, e.g. EMA and RSI
+start from an SMA of the first `period` values), so a stream and a batch run over the
+same bars give the same numbers; python check_indicators.py verifies that.
+
+    SMA, EMA              close, moving average
+    RSI                   Wilder RSI
+    Bollinger             (upper, middle, lower), population stdev like TA-Lib
+    MACD                  (macd, signal, hist)
+    ATR                   Wilder average true range
+    Stochastic            slow (k, d)
+    CCI                   commodity channel index
+    ParabolicSAR          SAR
+    OBV                   on balance volume
+    VWAP                  cumulative typical-price VWAP (like vwap.py), reset() to re-anchor,
+                          or VWAP(DAY_MS) to start over at every 00:00 UTC
+
+Running sums are re-summed once per window so float drift can't build up. Rolling
+highs/lows use monotonic deques (amortised O(1)). CCI is the exception: its mean
+deviation needs the whole window, so it costs O(period) per bar.
+
+IndicatorEngine runs a set of indicators for many symbols and plugs into the bar
+builder (data_streams/bar_builder.py) as a bar handler.
+'''
+import math
+from collections import deque, namedtuple
+
+BollingerValue = namedtuple('BollingerValue', ['upper', 'middle', 'lower'])
+MACDValue = namedtuple('MACDValue', ['macd', 'signal', 'hist'])
+StochValue = namedtuple('StochValue', ['k', 'd'])
+
+DAY_MS = 86400000
+
+class Window:
+    """The last `size` values with their running sum and sum of squares."""
+    def __init__(self, size):
+        self.size = size
+        self.values = deque(maxlen=size)
+        self.total = 0.0
+        self.squares = 0.0
+        self.pushes = 0
+
+    def leaving(self):
+        """The value the next push drops out of the window (0 while it isn't full)."""
+        return self.values[0] if len(self.values) == self.size else 0.0
+
+    def push(self, x):
+        old = self.leaving()
+        self.values.append(x)
+        self.total += x - old
+        self.squares += x * x - old * old
+        self.pushes += 1
+        if self.pushes == self.size:  # re-sum once per window, amortised O(1)
+            self.pushes = 0
+            self.total = math.fsum(self.values)
+            self.squares = math.fsum(value * value for value in self.values)
+
+class RollingExtreme:
+    """Rolling max (or min) over `size` values with a monotonic deque of (index, value)."""
+    def __init__(self, size, highest=True):
+        self.size = size
+        self.sign = 1.0 if highest else -1.0
+        self.entries = deque()
+        self.index = -1
+
+    def push(self, x):
+        key = self.sign * x
+        self.index += 1
+        entries = self.entries
+        while entries and entries[-1][1] <= key:
+            entries.pop()
+        entries.append((self.index, key))
+        if entries[0][0] <= self.index - self.size:
+            entries.popleft()
+        return self.sign * entries[0][1]
+
+    def peek(self, x):
+        """The extreme if x were pushed next."""
+        key = self.sign * x
+        oldest = self.index + 1 - self.size + 1
+        for index, value in self.entries:  # only the front entry can be leaving
+            if index >= oldest:
+                return self.sign * max(key, value)
+        return x
+
+class Indicator:
+    """update() a closed bar, preview() the forming one; `value` is the last closed bar's value."""
+    value = None
+
+    def update(self, high, low, close, volume=0.0):
+        raise NotImplementedError
+
+    def preview(self, high, low, close, volume=0.0):
+        raise NotImplementedError
+
+    def at(self, time_ms):
+        """Open time (epoch ms) of the bar the next update()/preview() is for; only anchored indicators use it."""
+
+    def seed(self, bars):
+        """Feed closed history (anything with high/low/close/volume columns, e.g. bar_store Bars or a DataFrame)."""
+        volumes = bars.volume if hasattr(bars, 'volume') else [0.0] * len(bars.close)
+        timestamps = bars.timestamp if hasattr(bars, 'timestamp') else [None] * len(bars.close)
+        for time_ms, high, low, close, volume in zip(timestamps, bars.high, bars.low, bars.close, volumes):
+            if time_ms is not None:
+                self.at(int(time_ms))
+            self.update(float(high), float(low), float(close), float(volume))
+        return self.value
+
+class SMA(Indicator):
+    def __init__(self, period=20):
+        self.period = period
+        self.window = Window(period)
+        self.value = None
+
+    def push(self, x):
+        self.window.push(x)
+        if len(self.window.values) == self.period:
+            self.value = self.window.total / self.period
+        return self.value
+
+    def peek(self, x):
+        if len(self.window.values) + 1 < self.period:
+            return None
+        return (self.window.total - self.window.leaving() + x) / self.period
+
+    def update(self, high, low, close, volume=0.0):
+        return self.push(close)
+
+    def preview(self, high, low, close, volume=0.0):
+        return self.peek(close)
+
+class EMA(Indicator):
+    """Exponential moving average seeded with the SMA of the first `period` values (TA-Lib's default)."""
+    def __init__(self, period=10):
+        self.period = period
+        self.k = 2.0 / (period + 1)
+        self.count = 0
+        self.seed_total = 0.0
+        self.value = None
+
+    def push(self, x):
+        if self.value is not None:
+            self.value += self.k * (x - self.value)
+        else:
+            self.count += 1
+            self.seed_total += x
+            if self.count == self.period:
+                self.value = self.seed_total / self.period
+        return self.value
+
+    def peek(self, x):
+        if self.value is not None:
+            return self.value + self.k * (x - self.value)
+        if self.count + 1 == self.period:
+            return (self.seed_total + x) / self.period
+        return None
+
+    def update(self, high, low, close, volume=0.0):
+        return self.push(close)
+
+    def preview(self, high, low, close, volume=0.0):
+        return self.peek(close)
+
+class Wilder:
+    """Wilder's smoothing: the mean of the first `period` values, then (prev * (n - 1) + x) / n."""
+    def __init__(self, period):
+        self.period = period
+        self.count = 0
+        self.seed_total = 0.0
+        self.value = None
+
+    def push(self, x):
+        if self.value is not None:
+            self.value = (self.value * (self.period - 1) + x) / self.period
+        else:
+            self.count += 1
+            self.seed_total += x
+            if self.count == self.period:
+                self.value = self.seed_total / self.period
+        return self.value
+
+    def peek(self, x):
+        if self.value is not None:
+            return (self.value * (self.period - 1) + x) / self.period
+        if self.count + 1 == self.period:
+            return (self.seed_total + x) / self.period
+        return None
+
+def rsi_value(gain, loss):
+    if gain is None:
+        return None
+    total = gain + loss
+    return 100.0 * gain / total if total else 0.0
+
+class RSI(Indicator):
+    def __init__(self, period=14):
+        self.period = period
+        self.gains = Wilder(period)
+        self.losses = Wilder(period)
+        self.last_close = None
+        self.value = None
+
+    def update(self, high, low, close, volume=0.0):
+        if self.last_close is not None:
+            change = close - self.last_close
+            self.value = rsi_value(self.gains.push(max(change, 0.0)), self.losses.push(max(-change, 0.0)))
+        self.last_close = close
+        return self.value
+
+    def preview(self, high, low, close, volume=0.0):
+        if self.last_close is None:
+            return None
+        change = close - self.last_close
+        return rsi_value(self.gains.peek(max(change, 0.0)), self.losses.peek(max(-change, 0.0)))
+
+class Bollinger(Indicator):
+    def __init__(self, period=20, devup=2.0, devdn=2.0):
+        self.period = period
+        self.devup = devup
+        self.devdn = devdn
+        self.window = Window(period)
+        self.value = None
+
+    def bands(self, total, squares):
+        mean = total / self.period
+        std = math.sqrt(max(squares / self.period - mean * mean, 0.0))
+        return BollingerValue(mean + self.devup * std, mean, mean - self.devdn * std)
+
+    def update(self, high, low, close, volume=0.0):
+        self.window.push(close)
+        if len(self.window.values) == self.period:
+            self.value = self.bands(self.window.total, self.window.squares)
+        return self.value
+
+    def preview(self, high, low, close, volume=0.0):
+        window = self.window
+        if len(window.values) + 1 < self.period:
+            return None
+        old = window.leaving()
+        return self.bands(window.total - old + close, window.squares - old * old + close * close)
+
+class MACD(Indicator):
+    """
+    MACD like TA-Lib: the fast EMA starts (slow - fast) bars in, so both EMAs are seeded at
+    the same bar, and the signal EMA is seeded with the SMA of the first `signal` MACD values.
+    """
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.fast = EMA(fast)
+        self.slow = EMA(slow)
+        self.signal = EMA(signal)
+        self.skip = slow - fast
+        self.bars = 0
+        self.value = None
+
+    def update(self, high, low, close, volume=0.0):
+        self.bars += 1
+        fast = self.fast.push(close) if self.bars > self.skip else None
+        slow = self.slow.push(close)
+        if slow is not None:
+            macd = fast - slow
+            signal = self.signal.push(macd)
+            if signal is not None:
+                self.value = MACDValue(macd, signal, macd - signal)
+        return self.value
+
+    def preview(self, high, low, close, volume=0.0):
+        slow = self.slow.peek(close)
+        if slow is None:
+            return None
+        macd = self.fast.peek(close) - slow
+        signal = self.signal.peek(macd)
+        return MACDValue(macd, signal, macd - signal) if signal is not None else None
+
+def true_range(high, low, last_close):
+    return max(high - low, abs(high - last_close), abs(low - last_close))
+
+class ATR(Indicator):
+    def __init__(self, period=14):
+        self.period = period
+        self.ranges = Wilder(period)
+        self.last_close = None
+        self.value = None
+
+    def update(self, high, low, close, volume=0.0):
+        if self.last_close is not None:
+            self.value = self.ranges.push(true_range(high, low, self.last_close))
+        self.last_close = close
+        return self.value
+
+    def preview(self, high, low, close, volume=0.0):
+        if self.last_close is None:
+            return None
+        return self.ranges.peek(true_range(high, low, self.last_close))
+
+def fast_k(close, highest, lowest):
+    spread = highest - lowest
+    return 100.0 * (close - lowest) / spread if spread else 0.0
+
+class Stochastic(Indicator):
+    """Slow stochastic (TA-Lib STOCH with SMA smoothing): %K over fastk bars, then two SMAs."""
+    def __init__(self, fastk=14, slowk=3, slowd=3):
+        self.fastk = fastk
+        self.highs = RollingExtreme(fastk, highest=True)
+        self.lows = RollingExtreme(fastk, highest=False)
+        self.slowk = SMA(slowk)
+        self.slowd = SMA(slowd)
+        self.bars = 0
+        self.value = None
+
+    def update(self, high, low, close, volume=0.0):
+        self.bars += 1
+        highest = self.highs.push(high)
+        lowest = self.lows.push(low)
+        if self.bars >= self.fastk:
+            k = self.slowk.push(fast_k(close, highest, lowest))
+            if k is not None:
+                d = self.slowd.push(k)
+                if d is not None:
+                    self.value = StochValue(k, d)
+        return self.value
+
+    def preview(self, high, low, close, volume=0.0):
+        if self.bars + 1 < self.fastk:
+            return None
+        k = self.slowk.peek(fast_k(close, self.highs.peek(high), self.lows.peek(low)))
+        d = self.slowd.peek(k) if k is not None else None
+        return StochValue(k, d) if d is not None else None
+
+class CCI(Indicator):
+    """Commodity channel index. The mean deviation needs the whole window: O(period) per bar."""
+    def __init__(self, period=20):
+        self.period = period
+        self.window = Window(period)
+        self.value = None
+
+    def cci(self, values, total, typical):
+        mean = total / self.period
+        deviation = sum(abs(value - mean) for value in values) / self.period
+        return (typical - mean) / (0.015 * deviation) if deviation else 0.0
+
+    def update(self, high, low, close, volume=0.0):
+        typical = (high + low + close) / 3.0
+        self.window.push(typical)
+        if len(self.window.values) == self.period:
+            self.value = self.cci(self.window.values, self.window.total, typical)
+        return self.value
+
+    def preview(self, high, low, close, volume=0.0):
+        window = self.window
+        if len(window.values) + 1 < self.period:
+            return None
+        typical = (high + low + close) / 3.0
+        values = list(window.values)[len(window.values) + 1 - self.period:] + [typical]
+        return self.cci(values, window.total - window.leaving() + typical, typical)
+
+class ParabolicSAR(Indicator):
+    """
+    Parabolic SAR, step for step like TA-Lib: the first direction comes from the first two
+    bars' directional movement, and each bar's value is the SAR it was checked against.
+    """
+    def __init__(self, acceleration=0.02, maximum=0.2):
+        self.acceleration = acceleration
+        self.maximum = maximum
+        self.first = None  # (high, low) of the first bar
+        self.state = None  # (is_long, sar, ep, af, last_high, last_low)
+        self.value = None
+
+    def step(self, state, high, low):
+        is_long, sar, ep, af, last_high, last_low = state
+        if is_long:
+            if low <= sar:  # reverse to short
+                sar = max(ep, last_high, high)
+                value = sar
+                af, ep = self.acceleration, low
+                sar = max(sar + af * (ep - sar), last_high, high)
+                is_long = False
+            else:
+                value = sar
+                if high > ep:
+                    ep, af = high, min(af + self.acceleration, self.maximum)
+                sar = min(sar + af * (ep - sar), last_low, low)
+        else:
+            if high >= sar:  # reverse to long
+                sar = min(ep, last_low, low)
+                value = sar
+                af, ep = self.acceleration, high
+                sar = min(sar + af * (ep - sar), last_low, low)
+                is_long = True
+            else:
+                value = sar
+                if low < ep:
+                    ep, af = low, min(af + self.acceleration, self.maximum)
+                sar = max(sar + af * (ep - sar), last_high, high)
+        return value, (is_long, sar, ep, af, high, low)
+
+    def start(self, high, low):
+        first_high, first_low = self.first
+        down, up = first_low - low, high - first_high
+        is_long = not (down > 0 and down > up)
+        # the first bar is its own "last" bar, as in TA-Lib
+        return (is_long, first_low, high, self.acceleration, high, low) if is_long else \
+            (is_long, first_high, low, self.acceleration, high, low)
+
+    def update(self, high, low, close=None, volume=0.0):
+        if self.first is None:
+            self.first = (high, low)
+            return None
+        self.value, self.state = self.step(self.state or self.start(high, low), high, low)
+        return self.value
+
+    def preview(self, high, low, close=None, volume=0.0):
+        if self.first is None:
+            return None
+        return self.step(self.state or self.start(high, low), high, low)[0]
+
+class OBV(Indicator):
+    def __init__(self):
+        self.last_close = None
+        self.value = None
+
+    def next(self, close, volume):
+        if self.last_close is None:
+            return volume
+        if close > self.last_close:
+            return self.value + volume
+        if close < self.last_close:
+            return self.value - volume
+        return self.value
+
+    def update(self, high, low, close, volume=0.0):
+        self.value = self.next(close, volume)
+        self.last_close = close
+        return self.value
+
+    def preview(self, high, low, close, volume=0.0):
+        return self.next(close, volume)
+
+class VWAP(Indicator):
+    """
+    Cumulative typical-price VWAP since the first bar (or the last reset()). With
+    session_ms it is anchored instead: at() starts it over on the first bar of each
+    session (DAY_MS: 00:00 UTC), and bars of a session already over are ignored, so the
+    value doesn't depend on when the history started.
+    """
+    def __init__(self, session_ms=None):
+        self.session_ms = session_ms
+        self.session = None
+        self.past = False  # the next bar belongs to a session already over
+        self.reset()
+
+    def reset(self):
+        self.volume = 0.0
+        self.turnover = 0.0
+        self.value = None
+
+    def at(self, time_ms):
+        if not self.session_ms:
+            return
+        session = time_ms // self.session_ms
+        self.past = self.session is not None and session < self.session
+        if self.session is None or session > self.session:
+            self.session = session
+            self.reset()
+
+    def update(self, high, low, close, volume=0.0):
+        if self.past:
+            return self.value
+        self.volume += volume
+        self.turnover += volume * (high + low + close) / 3.0
+        if self.volume:
+            self.value = self.turnover / self.volume
+        return self.value
+
+    def preview(self, high, low, close, volume=0.0):
+        if self.past:
+            return self.value
+        total = self.volume + volume
+        return (self.turnover + volume * (high + low + close) / 3.0) / total if total else self.value
+
+DEFAULT_INDICATORS = {
+    'sma20': lambda: SMA(20),
+    'ema10': lambda: EMA(10),
+    'rsi14': lambda: RSI(14),
+    'bbands20': lambda: Bollinger(20),
+    'macd': lambda: MACD(12, 26, 9),
+    'atr14': lambda: ATR(14),
+    'stoch': lambda: Stochastic(14, 3, 3),
+    'cci20': lambda: CCI(20),
+    'sar': lambda: ParabolicSAR(0.02, 0.2),
+    'obv': lambda: OBV(),
+    'vwap': lambda: VWAP(),
+}
+
+class IndicatorEngine:
+    """
+    The same indicators for many symbols. factories maps a name to a callable making a fresh
+    indicator; each symbol gets its own set the first time it is seen.
+    """
+    def __init__(self, factories=None):
+        self.factories = dict(factories or DEFAULT_INDICATORS)
+        self.symbols = {}  # symbol -> {name: indicator}
+
+    def indicators(self, symbol):
+        indicators = self.symbols.get(symbol)
+        if indicators is None:
+            indicators = self.symbols[symbol] = {name: make() for name, make in self.factories.items()}
+        return indicators
+
+    def seed(self, symbol, bars):
+        for indicator in self.indicators(symbol).values():
+            indicator.seed(bars)
+        return self.values(symbol)
+
+    def update(self, symbol, high, low, close, volume=0.0):
+        return {name: indicator.update(high, low, close, volume)
+                for name, indicator in self.indicators(symbol).items()}
+
+    def preview(self, symbol, high, low, close, volume=0.0):
+        return {name: indicator.preview(high, low, close, volume)
+                for name, indicator in self.indicators(symbol).items()}
+
+    def values(self, symbol):
+        return {name: indicator.value for name, indicator in self.indicators(symbol).items()}
+
+    def on_bar(self, bar):
+        """Bar handler for data_streams/bar_builder.py (BarBuilder.subscribe(engine.on_bar))."""
+        if bar.revision:
+            return  # a late trade folded into a bar the indicators already have
+        for indicator in self.indicators(bar.symbol).values():
+            indicator.at(bar.timestamp)
+        self.update(bar.symbol, bar.high, bar.low, bar.close, bar.volume)
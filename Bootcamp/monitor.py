@@ -0,0 +1,259 @@
+'''
+One live indicator monitor for many symbols on one shared market-data feed
+
+sma.py, rsi.py and vwap.py each ran their own ccxt client for one symbol, asking
+for the order book and 100 bars every second and sleeping in between - three
+processes per symbol. Here one process watches a list of symbols with any set of
+indicators:
+
+    python monitor.py BTC/USD ETH/USD SOL/USD --indicators sma20,rsi14,vwap --timeframe 15m
+
+MarketFeed is the shared source. Each symbol subscribes once; every `interval`
+seconds one fetch_tickers call brings the bid/ask of all of them, and the
+indicators come from indicator_cache.py: every requested indicator of a symbol
+runs on the same cached bars, the forming bar follows the mid price, and OHLCV is
+only fetched again when a bar closes. That is one request per interval plus one per
+symbol per bar, whatever the number of indicators. Refreshes run as their own
+tasks, at most `concurrency` OHLCV fetches at a time, so a slow symbol never holds
+up the others or the screen.
+
+The table is a table_dashboard.py view drawn at its own frame rate, one row per
+symbol and one column per indicator, coloured by the signal the old monitors
+showed (price vs SMA/EMA/VWAP/SAR, RSI 30/70, CCI +/-100, stochastic 20/80,
+Bollinger bands, MACD histogram). Keys: s sort, r reverse, n/p page, q quit.
+
+Indicator names come from indicator_registry.py, the indicator followed by its
+parameters, '_' between them: sma20, ema50, rsi14, atr14, cci20, bbands20,
+macd12_26_9, stoch14_3_3, sar, obv, vwap. vwap is anchored at 00:00 UTC (see
+ANCHORED), so monitors started at different times show the same value.
+'''
+import argparse
+import asyncio
+import curses
+import os
+import sys
+import time
+from collections import namedtuple
+from indicator_cache import IndicatorCache
+from indicator_registry import registry
+from indicators import DAY_MS, VWAP
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data_streams'))
+from table_dashboard import TableDashboard  # noqa: E402
+
+SYMBOLS = ['BTC/USD']
+INDICATORS = 'sma20,rsi14,vwap'  # what sma.py, rsi.py and vwap.py showed
+TIMEFRAME = '15m'
+
+Quote = namedtuple('Quote', ['bid', 'ask', 'last', 'timestamp'])
+Row = namedtuple('Row', ['quote', 'values'])
+
+def cross(value, price):
+    """Price above the line is a buy (sma.py, vwap.py)."""
+    return 'BUY' if price > value else 'SELL' if price < value else 'HOLD'
+
+def oscillator(low, high, field=None):
+    def signal(value, price):
+        level = getattr(value, field) if field else value
+        return 'BUY' if level < low else 'SELL' if level > high else 'HOLD'
+    return signal
+
+def bands_signal(value, price):
+    return 'BUY' if price < value.lower else 'SELL' if price > value.upper else 'HOLD'
+
+def macd_signal(value, price):
+    return 'BUY' if value.hist > 0 else 'SELL' if value.hist < 0 else 'HOLD'
+
+# registered indicator -> (field shown for multi-value indicators, signal(value, price) or None)
+KINDS = {
+    'sma': (None, cross),
+    'ema': (None, cross),
+    'vwap': (None, cross),
+    'sar': (None, cross),
+    'rsi': (None, oscillator(30, 70)),
+    'cci': (None, oscillator(-100, 100)),
+    'stoch': ('k', oscillator(20, 80, 'k')),
+    'bbands': ('middle', bands_signal),
+    'macd': ('hist', macd_signal),
+    'atr': (None, None),
+    'obv': (None, None),
+}
+
+# the registry's streaming VWAP is cumulative from the first bar it sees, here that would be
+# "start-up minus `history` bars" - use a session-anchored one instead
+ANCHORED = {'vwap': lambda: VWAP(DAY_MS)}
+
+def parse_indicator(name):
+    """'rsi14' -> (kind, factory of the streaming indicator), from indicator_registry.py."""
+    kind, _ = registry.parse(name)
+    return kind, ANCHORED.get(kind) or registry.stream(name)
+
+class MarketFeed:
+    """Quotes and indicator views for every subscribed symbol from one async ccxt exchange."""
+    def __init__(self, exchange, factories, timeframe=TIMEFRAME, interval=2.0, history=100, concurrency=4):
+        self.exchange = exchange
+        self.timeframe = timeframe
+        self.interval = interval
+        self.cache = IndicatorCache(exchange, factories, history=history)
+        self.symbols = []    # in subscription order
+        self.quotes = {}     # symbol -> Quote
+        self.views = {}      # symbol -> IndicatorView, with the forming bar at the last mid
+        self.errors = {}     # symbol -> error text of its last refresh
+        self.error = None    # error text of the last tickers request
+        self.refreshing = {}  # symbol -> refresh task in flight
+        self.concurrency = asyncio.Semaphore(concurrency)
+
+    def subscribe(self, symbol):
+        if symbol not in self.symbols:
+            self.symbols.append(symbol)
+
+    def unsubscribe(self, symbol):
+        if symbol in self.symbols:
+            self.symbols.remove(symbol)
+        for state in (self.quotes, self.views, self.errors):
+            state.pop(symbol, None)
+
+    async def poll(self):
+        """One tickers request for every symbol, then a refresh task for each symbol not already refreshing."""
+        try:
+            tickers = await self.exchange.fetch_tickers(list(self.symbols))
+            self.error = None
+        except Exception as e:
+            self.error = str(e)
+            return
+        for symbol in self.symbols:
+            ticker = tickers.get(symbol)
+            if not ticker:
+                continue
+            bid, ask, last = ticker.get('bid'), ticker.get('ask'), ticker.get('last')
+            self.quotes[symbol] = Quote(bid, ask, last, ticker.get('timestamp'))
+            price = (bid + ask) / 2 if bid and ask else last
+            if price and symbol not in self.refreshing:
+                self.refreshing[symbol] = asyncio.create_task(self.refresh(symbol, price))
+
+    async def refresh(self, symbol, price):
+        try:
+            async with self.concurrency:
+                self.views[symbol] = await self.cache.aget(symbol, self.timeframe, price=price)
+            self.errors.pop(symbol, None)
+        except Exception as e:
+            self.errors[symbol] = str(e)
+        finally:
+            del self.refreshing[symbol]
+
+    async def run(self):
+        while True:
+            started = time.monotonic()
+            await self.poll()
+            await asyncio.sleep(max(self.interval - (time.monotonic() - started), 0))
+
+    async def close(self):
+        for task in list(self.refreshing.values()):
+            task.cancel()
+        await asyncio.gather(*self.refreshing.values(), return_exceptions=True)
+        await self.exchange.close()
+
+class IndicatorMonitor(TableDashboard):
+    noun = 'symbols'
+    color_pairs = [
+        (curses.COLOR_WHITE, curses.COLOR_RED),     # SELL
+        (curses.COLOR_BLACK, curses.COLOR_GREEN),   # BUY
+        (curses.COLOR_BLACK, curses.COLOR_YELLOW),  # HOLD
+        (curses.COLOR_WHITE, curses.COLOR_BLACK),   # Default
+    ]
+
+    def __init__(self, feed, indicators, fps=4, sort_column=0, reverse=False):
+        super().__init__(fps, sort_column, reverse)
+        self.feed = feed
+        self.indicators = indicators  # [(name, kind)]
+        self.title = f"{getattr(feed.exchange, 'name', 'Exchange')} Live Monitor ({feed.timeframe})"
+        self.columns = [
+            ('Symbol', 14, lambda symbol, row: symbol),
+            ('Bid', 14, lambda symbol, row: row.quote.bid or 0.0),
+            ('Ask', 14, lambda symbol, row: row.quote.ask or 0.0),
+        ] + [(name, 18, lambda symbol, row, name=name, kind=kind: self.number(kind, row.values.get(name)))
+             for name, kind in indicators]
+
+    def rows(self):
+        feed = self.feed
+        ready = {}
+        for symbol in feed.symbols:
+            quote = feed.quotes.get(symbol)
+            if quote is not None:
+                view = feed.views.get(symbol)
+                ready[symbol] = Row(quote, view.values if view is not None else {})
+        return ready, [symbol for symbol in feed.symbols if symbol not in ready]
+
+    def number(self, kind, value):
+        """The number shown (and sorted on) for an indicator value; -inf while warming up."""
+        if value is None:
+            return float('-inf')
+        field = KINDS.get(kind, (None, None))[0]
+        return getattr(value, field) if field else value
+
+    def heading(self, pages, count):
+        stats = self.feed.cache.stats()
+        heading = (f"{self.title}  page {self.page + 1}/{pages}  {count} {self.noun}  "
+                   f"{stats['requests']} OHLCV requests, {stats['hit_rate']:.1%} cached")
+        return heading + (f"  ⚠️ {self.feed.error}" if self.feed.error else '')
+
+    def row_cells(self, symbol):
+        quote = self.feed.quotes.get(symbol)
+        if quote is None:
+            error = self.feed.errors.get(symbol)
+            return [(symbol, 4), (f"Error: {error}" if error else "Waiting...", 4)]
+        view = self.feed.views.get(symbol)
+        if view is None:
+            error = self.feed.errors.get(symbol)
+            return [(symbol, 4), (price_text(quote.bid), 4), (price_text(quote.ask), 4),
+                    (f"Error: {error}" if error else "Loading bars...", 4)]
+
+        cells = [(symbol, 4), (price_text(quote.bid), 4), (price_text(quote.ask), 4)]
+        price = quote.bid if quote.bid else quote.last
+        for name, kind in self.indicators:
+            value = view.values.get(name)
+            if value is None:
+                cells.append(('...', 4))
+                continue
+            signal = KINDS.get(kind, (None, None))[1]
+            signal = signal(value, price) if signal and price else None
+            text = price_text(self.number(kind, value)) + (f" {signal}" if signal else '')
+            cells.append((text, SIGNAL_COLORS.get(signal, 4)))
+        return cells
+
+SIGNAL_COLORS = {'SELL': 1, 'BUY': 2, 'HOLD': 3}
+
+def price_text(value):
+    return f"{value:,.6g}" if value is not None else '-'
+
+async def run_monitor(symbols, names, timeframe=TIMEFRAME, exchange_id='kraken', interval=2.0, history=100, fps=4):
+    import ccxt.async_support as ccxt_async  # only once there is something to watch: it is the slowest import
+    indicators = [(name, parse_indicator(name)) for name in names]
+    exchange = getattr(ccxt_async, exchange_id)({'enableRateLimit': True})
+    feed = MarketFeed(exchange, {name: make for name, (_, make) in indicators}, timeframe, interval, history)
+    for symbol in symbols:
+        feed.subscribe(symbol)
+    monitor = IndicatorMonitor(feed, [(name, kind) for name, (kind, _) in indicators], fps=fps)
+    task = asyncio.create_task(feed.run())
+    try:
+        await monitor.run()  # returns on 'q'
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        await feed.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('symbols', nargs='*', default=SYMBOLS, help="e.g. BTC/USD ETH/USD")
+    parser.add_argument('--indicators', default=INDICATORS, help="comma-separated, e.g. sma20,rsi14,vwap")
+    parser.add_argument('--timeframe', default=TIMEFRAME)
+    parser.add_argument('--exchange', default='kraken', help="ccxt exchange id")
+    parser.add_argument('--interval', type=float, default=2.0, help="seconds between tickers requests")
+    parser.add_argument('--history', type=int, default=100, help="closed bars kept per symbol")
+    parser.add_argument('--fps', type=float, default=4)
+    args = parser.parse_args(argv)
+    names = [name.strip() for name in args.indicators.split(',') if name.strip()]
+    asyncio.run(run_monitor(args.symbols, names, args.timeframe, args.exchange, args.interval, args.history, args.fps))
+
+if __name__ == "__main__":
+    main()
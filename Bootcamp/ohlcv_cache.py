@@ -0,0 +1,294 @@
+'''
+Incremental, gap-aware local OHLCV cache keyed by (exchange, symbol, timeframe)
+
+Replaces the old filename cache (XRP-USD-1h-100wks-data.csv), which only ever hit
+for exactly the same number of weeks, in the current directory.
+
+Every key is a folder of typed NumPy columns plus coverage metadata:
+
+    historical_data/bars/<exchange>/<BASE-QUOTE>/<timeframe>/
+        manifest.json          {"version": 7, "segments": ["seg-000007"], "coverage": [[start_ms, end_ms], ...]}
+        seg-000007/
+            timestamp.npy      int64 bar open time in epoch ms, sorted, unique
+            open/high/low/close/volume.npy   float64
+
+Coverage records which time ranges were actually asked of the exchange, including
+stretches where it had no bars, so a hole in the data is never mistaken for a range
+still to fetch (and vice versa).
+
+For each request the cache works out the missing parts of [start, end) from the
+coverage, fetches only those (all keys of a request together, through
+ohlcv_downloader), merges them into the columns and extends the coverage. A request
+that is already covered never touches the network: it is a memory-mapped load and a
+binary search. Only closed bars are cached; the one still forming is never recorded
+as covered.
+
+Segment folders are never modified once written and hold disjoint, increasing time
+ranges. A write puts the bars it adds, with the segments they overlap, in a new
+segment (append_columns: appends only rewrite the recent tail), then replaces
+manifest.json (write to .tmp, then os.replace) - the one step that switches readers
+from the old version to the new one - and only then removes the segments nobody
+lists any more. A reader therefore sees every column and the coverage
+of one version or of the other, never a mix; readers that have the old columns
+memory-mapped keep them. Columns whose lengths differ are rejected with ValueError.
+Folders in the older flat layout (columns and coverage.json straight in the key
+folder) are still read, and converted on their next write.
+
+    cache = OhlcvCache(exchange)
+    df = await cache.get('BTC/USD', '1h', start_ms, end_ms)
+'''
+import json
+import os
+import shutil
+import time
+import numpy as np
+from ohlcv_downloader import OhlcvDownloader, COLUMNS, assemble, to_frame, timeframe_to_ms
+
+cache_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'historical_data', 'bars')
+
+def merge_intervals(intervals):
+    """Sorted, non-overlapping [start, end) intervals; touching ones are joined."""
+    merged = []
+    for start, end in sorted(intervals):
+        if end <= start:
+            continue
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+def subtract_intervals(start, end, covered):
+    """The parts of [start, end) not inside any of the (merged) covered intervals."""
+    missing = []
+    for covered_start, covered_end in covered:
+        if covered_end <= start:
+            continue
+        if covered_start >= end:
+            break
+        if covered_start > start:
+            missing.append([start, covered_start])
+        start = max(start, covered_end)
+    if start < end:
+        missing.append([start, end])
+    return missing
+
+def key_folder(root, exchange_id, symbol, timeframe):
+    return os.path.join(root, exchange_id, symbol.replace('/', '-').replace(':', '-'), timeframe)
+
+MANIFEST = 'manifest.json'
+
+def read_manifest(folder):
+    """The key's current version, None if it was never written (or is still in the flat layout)."""
+    try:
+        with open(os.path.join(folder, MANIFEST)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def segment_folders(folder, manifest):
+    """The folders holding a version's columns, oldest bars first."""
+    if manifest is not None:
+        return [os.path.join(folder, segment) for segment in manifest['segments']]
+    return [folder] if os.path.isfile(os.path.join(folder, 'timestamp.npy')) else []
+
+def load_segment(folder, names, mmap_mode):
+    columns = {name: np.load(os.path.join(folder, f'{name}.npy'), mmap_mode=mmap_mode) for name in names}
+    lengths = {len(column) for column in columns.values()}
+    if len(lengths) > 1:
+        raise ValueError(f"{folder}: columns of different lengths {sorted(lengths)}")
+    return columns
+
+def load_version(folder, mmap_mode='r', names=COLUMNS, attempts=3):
+    """
+    (manifest, {column: array}) of one version of a key folder, the columns memory-mapped
+    by default and empty if it has no bars yet. The manifest is None for the flat layout.
+    Raises ValueError if the columns don't line up.
+    """
+    for attempt in range(attempts):
+        try:
+            manifest = read_manifest(folder)
+            segments = [load_segment(path, names, mmap_mode) for path in segment_folders(folder, manifest)]
+            break
+        except (FileNotFoundError, ValueError):
+            # a writer switched versions while we read (or tore a flat layout): read again
+            if attempt == attempts - 1:
+                raise
+            time.sleep(0.01)
+    if not segments:
+        return manifest, {name: np.empty(0, 'i8' if name == 'timestamp' else 'f8') for name in names}
+    if len(segments) == 1:
+        return manifest, segments[0]
+    return manifest, {name: np.concatenate([segment[name] for segment in segments]) for name in names}
+
+def load_columns(folder, mmap_mode='r', names=COLUMNS):
+    """{column: array} for a key folder (memory-mapped by default), empty arrays if it has no bars yet."""
+    return load_version(folder, mmap_mode, names)[1]
+
+def load_coverage(folder):
+    manifest = read_manifest(folder)
+    if manifest is not None:
+        return merge_intervals(manifest.get('coverage', []))
+    path = os.path.join(folder, 'coverage.json')
+    if not os.path.isfile(path):
+        return []
+    with open(path) as f:
+        return merge_intervals(json.load(f)['intervals'])
+
+def replace_file(path, write):
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        write(f)
+    os.replace(tmp, path)
+
+def new_segment(folder, version, bars):
+    """Write (n, 6) bars as the segment folder of manifest `version`; returns its name."""
+    name = f'seg-{version:06d}'
+    path = os.path.join(folder, name)
+    shutil.rmtree(path, ignore_errors=True)  # left over from a write that crashed before its switch
+    os.makedirs(path)
+    for i, column in enumerate(COLUMNS):
+        np.save(os.path.join(path, f'{column}.npy'), np.ascontiguousarray(bars[:, i], 'i8' if column == 'timestamp' else 'f8'))
+    return name
+
+def switch_version(folder, manifest, previous):
+    """
+    Make `manifest` the key's version in one atomic step, then remove what it no longer
+    uses. The previous version's segments stay one more write, for readers that have
+    just read its manifest.
+    """
+    payload = json.dumps(manifest).encode()
+    replace_file(os.path.join(folder, MANIFEST), lambda f: f.write(payload))
+    live = set(manifest['segments']) | set((previous or {}).get('segments', ()))
+    for name in os.listdir(folder):
+        try:
+            if name.startswith('seg-') and name not in live:
+                shutil.rmtree(os.path.join(folder, name))
+            elif name.endswith(('.npy', '.json')) and name != MANIFEST:
+                os.remove(os.path.join(folder, name))  # the flat layout's columns and metadata
+        except OSError:
+            pass  # still memory-mapped (Windows): removed by a later write
+
+def write_columns(folder, bars, **metadata):
+    """Save (n, 6) bars and the metadata that goes with them (coverage=...) as the key's next version."""
+    os.makedirs(folder, exist_ok=True)
+    previous = read_manifest(folder)
+    version = (previous or {}).get('version', 0) + 1
+    segments = [new_segment(folder, version, bars)] if len(bars) else []
+    switch_version(folder, {'version': version, 'segments': segments, **metadata}, previous)
+
+def segment_bars(path):
+    """A segment's columns as one (n, 6) float array."""
+    columns = load_segment(path, COLUMNS, None)
+    return np.column_stack([columns[name].astype('f8') for name in COLUMNS])
+
+def append_columns(folder, new_bars, **metadata):
+    """
+    Merge (n, 6) bars into the key as its next version, rewriting only what they touch:
+    the segments they overlap go into one new segment with them (new bars win on equal
+    timestamps), and the segments just before it are folded in while they are no bigger
+    than it. Appending in time order therefore keeps O(log n) segments and rewrites each
+    bar O(log n) times, instead of the whole series on every write.
+    """
+    os.makedirs(folder, exist_ok=True)
+    previous = read_manifest(folder)
+    version = (previous or {}).get('version', 0) + 1
+    new_bars = assemble([new_bars])
+    before, chunks, after = [], [], []  # (name, rows) of untouched segments, bars to merge, untouched names
+    if previous is None:
+        chunks = [segment_bars(path) for path in segment_folders(folder, None)]  # the flat layout, converted
+    elif not len(new_bars):
+        before = [(name, 0) for name in previous['segments']]
+    else:
+        for name in previous['segments']:
+            timestamps = np.load(os.path.join(folder, name, 'timestamp.npy'), mmap_mode='r')
+            if timestamps[-1] < new_bars[0, 0]:
+                before.append((name, len(timestamps)))
+            elif timestamps[0] > new_bars[-1, 0]:
+                after.append(name)
+            else:
+                chunks.append(segment_bars(os.path.join(folder, name)))
+
+    segment = []
+    if chunks or len(new_bars):
+        bars = assemble(chunks + [new_bars])
+        while before and before[-1][1] <= len(bars):
+            bars = np.concatenate([segment_bars(os.path.join(folder, before.pop()[0])), bars])
+        segment = [new_segment(folder, version, bars)]
+    segments = [name for name, _ in before] + segment + after
+    switch_version(folder, {'version': version, 'segments': segments, **metadata}, previous)
+
+class OhlcvCache:
+    def __init__(self, exchange, root=cache_folder, downloader=None, exchange_id=None):
+        self.exchange = exchange
+        self.root = root
+        self.exchange_id = exchange_id or getattr(exchange, 'id', 'exchange')
+        self.downloader = downloader or OhlcvDownloader(exchange)
+        self.fetched_ranges = 0  # missing ranges fetched since start, for stats
+
+    def folder(self, symbol, timeframe):
+        return key_folder(self.root, self.exchange_id, symbol, timeframe)
+
+    def coverage(self, symbol, timeframe):
+        return load_coverage(self.folder(symbol, timeframe))
+
+    def aligned(self, timeframe, start_ms, end_ms, now_ms=None):
+        """[start, end) floored to bar opens, with end capped at the bar that is still forming."""
+        step = timeframe_to_ms(timeframe)
+        forming = (now_ms or int(time.time() * 1000)) // step * step
+        return start_ms // step * step, min(-(-end_ms // step) * step, forming)
+
+    def missing(self, symbol, timeframe, start_ms, end_ms, now_ms=None):
+        start, end = self.aligned(timeframe, start_ms, end_ms, now_ms)
+        return subtract_intervals(start, end, self.coverage(symbol, timeframe))
+
+    def read(self, symbol, timeframe, start_ms, end_ms):
+        """(n, 6) cached bars with start_ms <= timestamp < end_ms."""
+        columns = load_columns(self.folder(symbol, timeframe))
+        lo, hi = np.searchsorted(columns['timestamp'], [start_ms, end_ms])
+        bars = np.empty((hi - lo, len(COLUMNS)))
+        for i, name in enumerate(COLUMNS):
+            bars[:, i] = columns[name][lo:hi]
+        return bars
+
+    def merge(self, symbol, timeframe, new_bars, fetched):
+        """Merge fetched bars into a key's columns and add the fetched intervals to its coverage."""
+        folder = self.folder(symbol, timeframe)
+        append_columns(folder, new_bars, coverage=merge_intervals(load_coverage(folder) + fetched))
+
+    async def update(self, jobs, now_ms=None):
+        """Fetch and merge whatever [(symbol, timeframe, start_ms, end_ms)] jobs are missing."""
+        fetches = []
+        for symbol, timeframe, start_ms, end_ms in jobs:
+            fetches += [(symbol, timeframe, start, end)
+                        for start, end in self.missing(symbol, timeframe, start_ms, end_ms, now_ms)]
+        if not fetches:
+            return
+        self.fetched_ranges += len(fetches)
+        fetched = await self.downloader.download_bars(fetches)
+
+        # pages that failed after every retry are not covered - the next request tries them again
+        failed = {}
+        for page in self.downloader.failed:
+            failed.setdefault((page.symbol, page.timeframe), []).append([page.since_ms, page.until_ms])
+        ranges = {}
+        for symbol, timeframe, start, end in fetches:
+            ranges.setdefault((symbol, timeframe), []).append([start, end])
+        for (symbol, timeframe), intervals in ranges.items():
+            holes = merge_intervals(failed.get((symbol, timeframe), []))
+            covered = [part for start, end in intervals for part in subtract_intervals(start, end, holes)]
+            self.merge(symbol, timeframe, fetched[(symbol, timeframe)], covered)
+
+    async def get_bars(self, symbol, timeframe, start_ms, end_ms, now_ms=None):
+        await self.update([(symbol, timeframe, start_ms, end_ms)], now_ms)
+        return self.read(symbol, timeframe, start_ms, end_ms)
+
+    async def get(self, symbol, timeframe, start_ms, end_ms, now_ms=None):
+        """DataFrame (datetime index) of every bar in [start_ms, end_ms), fetching only what's missing."""
+        return to_frame(await self.get_bars(symbol, timeframe, start_ms, end_ms, now_ms))
+
+    async def get_many(self, jobs, now_ms=None):
+        """{(symbol, timeframe): DataFrame} for many jobs, with all missing ranges fetched together."""
+        await self.update(jobs, now_ms)
+        return {(symbol, timeframe): to_frame(self.read(symbol, timeframe, start_ms, end_ms))
+                for symbol, timeframe, start_ms, end_ms in jobs}
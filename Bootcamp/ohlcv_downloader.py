@@ -0,0 +1,162 @@
+'''
+Concurrent, rate-limit-aware historical OHLCV downloader
+
+data_from_coinbase.get_historical_data used to page backwards one 200-bar request
+at a time with a fixed sleep and pd.concat every page onto the result (quadratic in
+pages). This engine instead:
+
+    - plans every page window of every job upfront (job = symbol + timeframe + range),
+    - fetches them concurrently through one token bucket sized to the exchange's
+      rate limit (shared by all jobs) and a cap on requests in flight,
+    - retries a failed page on its own, with exponential backoff, and waits out
+      rate-limit errors for everyone,
+    - assembles each job once at the end: one concatenate, deduplicated by
+      timestamp and sorted.
+
+Works with any exchange object that has ccxt's async fetch_ohlcv(symbol, timeframe,
+since, limit) - a ccxt.async_support exchange (create it with enableRateLimit=False,
+the downloader does the throttling) or fake_exchange.FakeExchange for benchmarks
+(bench_ohlcv_download.py).
+
+    async with ccxt.async_support.coinbase({'enableRateLimit': False}) as exchange:
+        downloader = OhlcvDownloader(exchange, rate=10)
+        frames = await downloader.download_many([
+            ('BTC/USD', '1h', start_ms, end_ms),
+            ('XRP/USD', '1d', start_ms, end_ms),
+        ])
+'''
+import asyncio
+import time
+from collections import namedtuple
+import numpy as np
+
+COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+# one job's page: ask for `limit` bars from since_ms, keep the ones before until_ms
+Page = namedtuple('Page', ['symbol', 'timeframe', 'since_ms', 'until_ms', 'limit'])
+
+TIMEFRAME_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+
+def timeframe_to_ms(timeframe):
+    """'15m' -> 900000, '15s', '1h', '4h', '1d', '1w' likewise."""
+    return int(timeframe[:-1]) * TIMEFRAME_UNITS[timeframe[-1]] * 1000
+
+def is_time_frame(timeframe):
+    return timeframe[:-1].isdigit() and timeframe[-1] in TIMEFRAME_UNITS
+
+def plan_pages(symbol, timeframe, start_ms, end_ms, limit=200):
+    """Every page window covering [start_ms, end_ms), aligned to the timeframe."""
+    step = timeframe_to_ms(timeframe)
+    start = start_ms // step * step
+    span = step * limit
+    return [Page(symbol, timeframe, since, min(since + span, end_ms), limit)
+            for since in range(start, end_ms, span)]
+
+def is_rate_limit_error(error):
+    # ccxt raises RateLimitExceeded / DDoSProtection; match by name so ccxt stays optional here
+    return any(cls.__name__ in ('RateLimitExceeded', 'DDoSProtection') for cls in type(error).__mro__)
+
+class TokenBucket:
+    """`rate` requests per second on average, up to `burst` at once."""
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    async def acquire(self, cost=1.0):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if now >= self.blocked_until and self.tokens >= cost:
+                self.tokens -= cost
+                return
+            await asyncio.sleep(max(self.blocked_until - now, (cost - self.tokens) / self.rate))
+
+    def back_off(self, seconds):
+        """Stop every request for a while (the exchange said slow down)."""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+
+def assemble(chunks):
+    """One (n, 6) float array from the fetched pages: concatenated once, sorted, unique by timestamp."""
+    chunks = [chunk for chunk in chunks if len(chunk)]
+    if not chunks:
+        return np.empty((0, len(COLUMNS)))
+    bars = np.concatenate(chunks)
+    # reversed so np.unique keeps the last copy of a timestamp (later pages win)
+    bars = bars[::-1]
+    _, first = np.unique(bars[:, 0], return_index=True)
+    return bars[first]
+
+def to_frame(bars):
+    """Bars as the DataFrame shape data_from_coinbase always returned (datetime index)."""
+    import pandas as pd  # only here: indicator_cache.py imports this module for timeframe_to_ms
+    df = pd.DataFrame(bars[:, 1:], columns=COLUMNS[1:])
+    df.index = pd.DatetimeIndex(pd.to_datetime(bars[:, 0].astype('int64'), unit='ms'), name='datetime')
+    return df
+
+class OhlcvDownloader:
+    def __init__(self, exchange, rate=None, burst=None, concurrency=8, limit=200, retries=5, backoff=1.0,
+                 rate_limit_pause=10.0, log=print):
+        if rate is None:
+            # ccxt exchanges advertise the minimum ms between requests
+            rate = 1000 / getattr(exchange, 'rateLimit', 1000)
+        self.exchange = exchange
+        self.limiter = TokenBucket(rate, burst)
+        self.concurrency = concurrency
+        self.limit = limit
+        self.retries = retries
+        self.backoff = backoff
+        self.rate_limit_pause = rate_limit_pause
+        self.log = log
+        self.requests = 0
+        self.failed = []  # pages that still failed after every retry, from the last download
+
+    async def fetch_page(self, page, semaphore):
+        """Fetch one page, retrying just this page. Returns an (n, 6) array, possibly empty."""
+        for attempt in range(self.retries + 1):
+            try:
+                async with semaphore:
+                    # the token is taken only once this request may run: tasks queued on the
+                    # semaphore holding tokens would all fire together when it frees up
+                    await self.limiter.acquire()
+                    self.requests += 1
+                    rows = await self.exchange.fetch_ohlcv(page.symbol, page.timeframe, since=page.since_ms,
+                                                           limit=page.limit)
+                break
+            except Exception as e:
+                if attempt == self.retries:
+                    self.log(f"⚠️ Giving up on {page.symbol} {page.timeframe} page {page.since_ms}: {e}")
+                    self.failed.append(page)
+                    return np.empty((0, len(COLUMNS)))
+                if is_rate_limit_error(e):
+                    self.limiter.back_off(self.rate_limit_pause)
+                else:
+                    await asyncio.sleep(self.backoff * 2 ** attempt)
+        bars = np.asarray(rows, dtype=float).reshape(-1, len(COLUMNS))
+        # keep the window's own bars only; neighbouring pages own the rest
+        return bars[(bars[:, 0] >= page.since_ms) & (bars[:, 0] < page.until_ms)]
+
+    async def download_bars(self, jobs):
+        """{(symbol, timeframe): (n, 6) array} for [(symbol, timeframe, start_ms, end_ms)] jobs."""
+        self.failed = []
+        pages = [page for symbol, timeframe, start_ms, end_ms in jobs
+                 for page in plan_pages(symbol, timeframe, start_ms, end_ms, self.limit)]
+        semaphore = asyncio.Semaphore(self.concurrency)
+        chunks = await asyncio.gather(*(self.fetch_page(page, semaphore) for page in pages))
+
+        by_job = {}
+        for page, chunk in zip(pages, chunks):
+            by_job.setdefault((page.symbol, page.timeframe), []).append(chunk)
+        return {(symbol, timeframe): assemble(by_job.get((symbol, timeframe), []))
+                for symbol, timeframe, _, _ in jobs}
+
+    async def download_many(self, jobs):
+        """{(symbol, timeframe): DataFrame} for [(symbol, timeframe, start_ms, end_ms)] jobs."""
+        return {key: to_frame(bars) for key, bars in (await self.download_bars(jobs)).items()}
+
+    async def download(self, symbol, timeframe, start_ms, end_ms):
+        return (await self.download_many([(symbol, timeframe, start_ms, end_ms)]))[(symbol, timeframe)]
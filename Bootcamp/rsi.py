@@ -3,9 +3,10 @@
 # RSI Indicator with Live Market Data
 import ccxt
 import time
-import pandas as pd
 import curses  # For real-time terminal UI
-from ta.momentum import RSIIndicator
+from indicators import RSI
+from indicator_registry import registry
+from indicator_cache import IndicatorCache
 
 # Initialize Kraken API
 try:
@@ -44,22 +45,38 @@ def df_rsi(symbol=SYMBOL, timeframe=TIMEFRAME, limit=LIMIT):
         if not kraken:
             return None
 
+        import pandas as pd  # only for the DataFrame version, the monitor doesn't need it
         bars = kraken.fetch_ohlcv(symbol, timeframe=timeframe, limit=limit)
         df = pd.DataFrame(bars, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
         df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
 
-        # Compute RSI
-        rsi = RSIIndicator(df['close'], window=RSI_PERIOD)
-        df['rsi'] = rsi.rsi()
+        # Compute RSI (ta's RSIIndicator, imported on first use)
+        df['rsi'] = registry.compute('rsi', df, backend='ta', period=RSI_PERIOD)
 
         # Determine RSI signal
-        df['rsi_signal'] = df['rsi'].apply(lambda x: 'BUY' if x < 30 else 'SELL' if x > 70 else 'HOLD')
+        df['rsi_signal'] = df['rsi'].apply(rsi_signal)
 
         return df
     except Exception as e:
         print(f"⚠️ Error fetching RSI: {e}")
         return None
 
+def rsi_signal(rsi):
+    return 'BUY' if rsi < 30 else 'SELL' if rsi > 70 else 'HOLD'
+
+# RSI state per symbol, refetched only when a bar closes
+rsi_cache = IndicatorCache(kraken, {'rsi': lambda: RSI(RSI_PERIOD)}, history=LIMIT) if kraken else None
+
+def latest_rsi(symbol=SYMBOL, timeframe=TIMEFRAME, price=None):
+    """RSI with the forming bar at `price`, from the cache (None on errors)."""
+    try:
+        if not rsi_cache:
+            return None
+        return rsi_cache.get(symbol, timeframe, price=price).values['rsi']
+    except Exception as e:
+        print(f"⚠️ Error fetching RSI: {e}")
+        return None
+
 # Live terminal UI using curses
 def display_rsi_monitor(stdscr):
     """Display live terminal with updated RSI and market data."""
@@ -80,31 +97,29 @@ def display_rsi_monitor(stdscr):
         stdscr.addstr(0, 0, "Kraken Live Monitor (RSI & Market Data)", curses.A_BOLD)
         stdscr.addstr(1, 0, "=" * 60)
 
+        # Fetch the latest bid/ask prices
+        ask, bid = fetch_order_book(SYMBOL)
+
         # Fetch the latest RSI and market signals
-        rsi_data = df_rsi(SYMBOL)
-        if rsi_data is None:
+        rsi_value = latest_rsi(SYMBOL, price=(ask + bid) / 2 if bid is not None else None)
+        if rsi_value is None:
             stdscr.addstr(3, 0, "⚠️ Error fetching RSI data.")
             stdscr.refresh()
             time.sleep(2)
             continue
-        
-        latest_rsi = rsi_data.iloc[-1]
-        rsi_value = latest_rsi['rsi']
-        rsi_signal = latest_rsi['rsi_signal']
 
-        # Fetch the latest bid/ask prices
-        ask, bid = fetch_order_book(SYMBOL)
+        signal = rsi_signal(rsi_value)
 
         # Determine the color for Buy/Sell signals
-        if rsi_signal == 'BUY':
+        if signal == 'BUY':
             signal_color = curses.color_pair(2)  # Black on Green for BUY
-        elif rsi_signal == 'SELL':
+        elif signal == 'SELL':
             signal_color = curses.color_pair(1)  # White on Red for SELL
         else:
             signal_color = curses.color_pair(3)  # Yellow for HOLD
 
         # Display RSI values and market signals
-        stdscr.addstr(3, 0, f"RSI ({SYMBOL}): {rsi_value:.2f} | Signal: {rsi_signal} ", signal_color)
+        stdscr.addstr(3, 0, f"RSI ({SYMBOL}): {rsi_value:.2f} | Signal: {signal} ", signal_color)
 
         # Display current ask and bid prices
         stdscr.addstr(4, 0, f"Bid: {bid:.2f} | Ask: {ask:.2f}", curses.color_pair(3))
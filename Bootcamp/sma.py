@@ -1,8 +1,9 @@
 import asyncio
 import ccxt
 import time
-import pandas as pd
 import curses  # For real-time terminal UI
+from indicators import SMA
+from indicator_cache import IndicatorCache
 
 # Initialize Kraken API
 kraken = ccxt.kraken({
@@ -25,6 +26,7 @@ def ask_bid(symbol=symbol):
 
 # Function to get SMA values and market signals
 def df_sma(symbol=symbol, timeframe='15m', limit=100, sma=20):
+    import pandas as pd  # only for the DataFrame version, the monitor doesn't need it
     bars = kraken.fetch_ohlcv(symbol, timeframe=timeframe, limit=limit)
     df_sma = pd.DataFrame(bars, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
     df_sma['timestamp'] = pd.to_datetime(df_sma['timestamp'], unit='ms')
@@ -39,6 +41,9 @@ def df_sma(symbol=symbol, timeframe='15m', limit=100, sma=20):
 
     return df_sma
 
+# sma20 state per symbol, refetched only when a 15m bar closes
+sma_cache = IndicatorCache(kraken, {'sma20': lambda: SMA(20)})
+
 # Live terminal UI using curses
 def display_monitor(stdscr):
     """Display live terminal with updated SMA, PNL, and market data."""
@@ -61,15 +66,13 @@ def display_monitor(stdscr):
         stdscr.addstr(0, 0, "Kraken Live Monitor (SMA, Position, PNL)", curses.A_BOLD)
         stdscr.addstr(1, 0, "=" * 60)
 
-        # Fetch the latest SMA and market signals
-        sma_data = df_sma(symbol)
-        latest_sma = sma_data.iloc[-1]
-        sma_signal = latest_sma['sig']
-        sma_value = latest_sma[f'sma20_15m']
-
         # Fetch the latest bid/ask prices
         ask, bid = ask_bid(symbol)
 
+        # SMA with the forming bar at the mid price and the market signal
+        sma_value = sma_cache.get(symbol, '15m', price=(ask + bid) / 2).values['sma20']
+        sma_signal = 'SELL' if sma_value > bid else 'BUY' if sma_value < bid else None
+
         # Determine the color for Buy/Sell signals
         if sma_signal == 'BUY':
             signal_color = curses.color_pair(4)  # Black on Green for BUY
@@ -6,40 +6,40 @@ talib docs - https://ta-lib.github/ta-lib-python/doc_index.html
 you can use these indicators for backtesting and for bots
 
 '''
-import talib as ta 
-import pandas as pd 
+from indicator_registry import registry  # TA-Lib only with backend='talib', NumPy otherwise
+from bar_store import BarStore
 
-# GET DATA
-df = pd.read_csv('/c:/Users/erikn/Desktop/Bootcamp/historical_data/data.csv')
+# GET DATA - memory-mapped bars from historical_data/bars (python bar_store.py import loads the old csvs)
+df = BarStore().frame('BTC/USD', '1h')
 
 # SMA 
-# df['sma'] = ta.SMA(df['close'], timeperiod=20)
+# df['sma'] = registry.compute('sma', df, period=20)
 
 # RSI
-# df['rsi'] = ta.RSI(df['close'], timeperiod=14)
+# df['rsi'] = registry.compute('rsi', df, period=14)
 
 # EMA 
-#df['ema'] = ta.EMA(df['close'], timeperiod=10)
+#df['ema'] = registry.compute('ema', df, period=10)
 
 # bollinger bands 
-#df['boll_upper'], df['boll_mid'], df['boll_lower'] = ta.BBANDS(df['close'], timeperiod=20, nbdevup=2, nbdevdn=2, matype=0)
+#df['boll_upper'], df['boll_mid'], df['boll_lower'] = registry.compute('bbands', df, period=20, devup=2, devdn=2)
 
 # MACD
-#df['macd_line'], df['macd_signal'], df['macd_hist'] = ta.MACD(df['close'], fastperiod=12, slowperiod=26, signalperiod=9)
+#df['macd_line'], df['macd_signal'], df['macd_hist'] = registry.compute('macd', df, fast=12, slow=26, signal=9)
 
 # ATR - average true range
-#df['atr_14'] = ta.ATR(df['high'], df['low'], df['close'], timeperiod=14)
+#df['atr_14'] = registry.compute('atr14', df)
 
 # stochastic oscillator
-#df['stoch_k'], df['stoch_d'] = ta.STOCH(df['high'], df['low'], df['close'], fastk_period=14, slowk_period=3, slowk_matype=0, slowd_period=3, slowd_matype=0)
+#df['stoch_k'], df['stoch_d'] = registry.compute('stoch', df, fastk=14, slowk=3, slowd=3)
 
 # commodity channel index
-#df['cci_20'] = ta.CCI(df['high'], df['low'], df['close'], timeperiod=20)
+#df['cci_20'] = registry.compute('cci20', df)
 
 # parabolic sar
-#df['sar'] = ta.SAR(df['high'], df['low'], acceleration=0.02, maximum=0.2)
+#df['sar'] = registry.compute('sar', df, acceleration=0.02, maximum=0.2)
 
 # obv - on balance volume
-# df['obv'] = ta.OBV(df['close'], df['volume'])
+# df['obv'] = registry.compute('obv', df)
 
 print(df)
\ No newline at end of file
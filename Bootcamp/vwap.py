@@ -3,8 +3,9 @@
 import ccxt
 import key_file as k
 import time
-import pandas as pd
 import curses  # For real-time terminal UI
+from indicators import DAY_MS, VWAP
+from indicator_cache import IndicatorCache
 
 # Initialize Kraken API
 try:
@@ -43,11 +44,20 @@ def get_kraken_symbol(user_symbol):
         print(f"⚠️ Error loading Kraken markets: {e}")
         return None
 
-# Dynamically fetch the correct symbol
-KRAKEN_SYMBOL = get_kraken_symbol(USER_SYMBOL)
+# Kraken's name for each symbol, looked up (load_markets) the first time it's needed, not at import
+kraken_symbols = {}
 
-def fetch_order_book(symbol=KRAKEN_SYMBOL):
+def kraken_symbol(user_symbol=USER_SYMBOL):
+    if user_symbol not in kraken_symbols:
+        symbol = get_kraken_symbol(user_symbol)
+        if symbol is None:
+            return None  # try again next time
+        kraken_symbols[user_symbol] = symbol
+    return kraken_symbols[user_symbol]
+
+def fetch_order_book(symbol=None):
     """Fetch the latest bid/ask price from Kraken order book."""
+    symbol = symbol or kraken_symbol()
     if not kraken or not symbol:
         return None, None
 
@@ -60,9 +70,11 @@ def fetch_order_book(symbol=KRAKEN_SYMBOL):
         print(f"⚠️ Error fetching order book: {e}")
         return None, None
 
-def get_df_vwap(symbol=KRAKEN_SYMBOL, timeframe=TIMEFRAME, limit=LIMIT):
+def get_df_vwap(symbol=None, timeframe=TIMEFRAME, limit=LIMIT):
     """Fetch OHLCV data and calculate VWAP."""
     try:
+        import pandas as pd  # only for the DataFrame version, the monitor doesn't need it
+        symbol = symbol or kraken_symbol()
         if not kraken or not symbol:
             return None
 
@@ -87,6 +99,20 @@ def get_df_vwap(symbol=KRAKEN_SYMBOL, timeframe=TIMEFRAME, limit=LIMIT):
         print(f"⚠️ Error fetching VWAP data for {symbol}: {e}")
         return None
 
+# VWAP state per symbol, refetched only when a bar closes. Anchored at 00:00 UTC.
+vwap_cache = IndicatorCache(kraken, {'vwap': lambda: VWAP(DAY_MS)}, history=LIMIT) if kraken else None
+
+def latest_vwap(symbol=None, timeframe=TIMEFRAME, price=None):
+    """VWAP with the forming bar at `price`, from the cache (None on errors)."""
+    try:
+        symbol = symbol or kraken_symbol()
+        if not vwap_cache or not symbol:
+            return None
+        return vwap_cache.get(symbol, timeframe, price=price).values['vwap']
+    except Exception as e:
+        print(f"⚠️ Error fetching VWAP data for {symbol}: {e}")
+        return None
+
 # Live terminal UI using curses
 def display_vwap_monitor(stdscr):
     """Display live terminal with updated VWAP and market data."""
@@ -107,20 +133,18 @@ def display_vwap_monitor(stdscr):
         stdscr.addstr(0, 0, "Kraken Live Monitor (VWAP & Market Data)", curses.A_BOLD)
         stdscr.addstr(1, 0, "=" * 60)
 
+        # Fetch the latest bid/ask prices
+        symbol = kraken_symbol()
+        ask, bid = fetch_order_book(symbol)
+
         # Fetch the latest VWAP data
-        vwap_data = get_df_vwap(KRAKEN_SYMBOL)
-        if vwap_data is None:
+        vwap_value = latest_vwap(symbol, price=(ask + bid) / 2 if bid is not None else None)
+        if vwap_value is None:
             stdscr.addstr(3, 0, "⚠️ Error fetching VWAP data.")
             stdscr.refresh()
             time.sleep(2)
             continue
 
-        latest_vwap = vwap_data.iloc[-1]
-        vwap_value = latest_vwap['VWAP']
-
-        # Fetch the latest bid/ask prices
-        ask, bid = fetch_order_book(KRAKEN_SYMBOL)
-
         # Determine VWAP trend (above/below)
         if bid is None or ask is None:
             vwap_signal = "⚠️ No Market Data"
@@ -136,7 +160,7 @@ def display_vwap_monitor(stdscr):
             vwap_signal = "HOLD"
 
         # Display VWAP values and market signals
-        stdscr.addstr(3, 0, f"VWAP ({KRAKEN_SYMBOL}): {vwap_value:.2f} | Signal: {vwap_signal} ", trend_color)
+        stdscr.addstr(3, 0, f"VWAP ({symbol}): {vwap_value:.2f} | Signal: {vwap_signal} ", trend_color)
 
         # Display current ask and bid prices
         stdscr.addstr(4, 0, f"Bid: {bid:.2f} | Ask: {ask:.2f}", curses.color_pair(3))